@@ -1,16 +1,26 @@
 """Rename audio files from metadata tags."""
 
 import sys
-from importlib import metadata
+import typing
 
 from .args import fields, parse_args
 from .batch import Batch
 from .job import Job
-from .message import job_info, stats
+from .message import incremental_state, job_info, stats
 
 fields
 
-__version__: str = metadata.version("audiorename")
+__version__: str
+
+
+def __getattr__(name: str) -> typing.Any:
+    # Reading the package metadata is slow, so the version is only looked
+    # up on demand.
+    if name == "__version__":
+        from importlib import metadata
+
+        return metadata.version("audiorename")
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 def execute(*argv: str) -> None:
@@ -25,14 +35,31 @@ def execute(*argv: str) -> None:
     try:
         args = parse_args(argv)
         job = Job(args)
+        if job.selection.show_state:
+            incremental_state(job)
+            return
+        if job.selection.serve:
+            from .server import serve
+
+            serve(job)
+            return
         job.stats.counter.reset()
         job.stats.timer.start()
         if job.cli_output.job_info:
             job_info(job)
         if job.rename.dry_run:
             job.msg.output("Dry run")
-        batch = Batch(job)
-        batch.execute()
+        if job.selection.watch:
+            from .watch import Watcher
+
+            Watcher(job).run()
+        elif job.selection.from_tags:
+            from .tags import render_tag_file
+
+            render_tag_file(job)
+        else:
+            batch = Batch(job)
+            batch.execute()
         job.stats.timer.stop()
         if job.cli_output.stats:
             stats(job)
@@ -180,11 +180,23 @@ class ArgsDefault:
     source: Optional[str] = None
     source_as_target: Optional[bool] = None
     target: Optional[str] = None
+    incremental: Optional[bool] = None
+    state: Optional[str] = None
+    reset_state: Optional[bool] = None
+    show_state: Optional[bool] = None
+    watch: Optional[bool] = None
+    watch_interval: Optional[int] = None
+    watch_settle: Optional[int] = None
+    serve: Optional[str] = None
+    from_tags: Optional[str] = None
 
     # [rename]
     backup_folder: Optional[str] = None
     best_format: Optional[bool] = None
     dry_run: Optional[bool] = None
+    plan: Optional[bool] = None
+    plan_out: Optional[str] = None
+    apply_plan: Optional[str] = None
     move_action: Union[Literal["move", "copy", "no_rename"], None] = None
     cleaning_action: Union[Literal["backup", "delete", "do_nothing"], None] = None
 
@@ -218,6 +230,22 @@ class ArgsDefault:
     # [metadata_actions]
     enrich_metadata: Optional[bool] = None
     remap_classical: Optional[bool] = None
+    mb_cache: Optional[str] = None
+    mb_cache_ttl: Optional[int] = None
+    mb_cache_size: Optional[int] = None
+    mb_threads: Optional[int] = None
+    mb_rate_limit: Optional[int] = None
+    mb_url: Optional[str] = None
+    mb_backend: Optional[Literal["online", "offline"]] = None
+    mb_store: Optional[str] = None
+
+    # [performance]
+    jobs: Optional[int] = None
+    index: Optional[str] = None
+    rebuild_index: Optional[bool] = None
+    read_threads: Optional[int] = None
+    render_threads: Optional[int] = None
+    io_threads: Optional[int] = None
 
     def __init__(self, **kwargs: Any):
         for k, v in kwargs.items():
@@ -270,7 +298,18 @@ Configuration file
     )
 
 
-def parse_args(argv: Optional[Tuple[str]]) -> ArgsDefault:
+class ArgumentParser(argparse.ArgumentParser):
+    """Build the long description (see :func:`description`) only when the
+    help is actually printed. Rendering the documentation of all fields and
+    functions is too slow for every start of the program."""
+
+    def format_help(self) -> str:
+        if self.description is None:
+            self.description = description()
+        return super().format_help()
+
+
+def parse_args(argv: Optional[Tuple[str, ...]]) -> ArgsDefault:
     """Parse the command line arguments using the python library `argparse`.
 
     :param list argv: The command line arguments specified as a list: e. g
@@ -282,9 +321,7 @@ def parse_args(argv: Optional[Tuple[str]]) -> ArgsDefault:
     if not argv:
         argv = None
 
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.RawDescriptionHelpFormatter, description=description()
-    )
+    parser = ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter)
 
     ##
     # Options without section. These options have no equivalent in the
@@ -319,10 +356,12 @@ def parse_args(argv: Optional[Tuple[str]]) -> ArgsDefault:
     # source
     selection.add_argument(
         "source",
+        nargs="?",
         help="A folder containing audio files or a single audio file. If you "
         "specify a folder, the program will search for audio files in all "
         "subfolders. If you want to rename the audio files in the current "
-        "working directory, then specify a dot (“.”).",
+        "working directory, then specify a dot (“.”). The source is optional "
+        "with --apply-plan.",
     )
 
     # target
@@ -342,6 +381,107 @@ def parse_args(argv: Optional[Tuple[str]]) -> ArgsDefault:
         default=None,
     )
 
+    # incremental
+    selection.add_argument(
+        "--incremental",
+        help="Skip the source files that are unchanged (same size, "
+        "modification time and inode) since a previous run processed them. "
+        "The files are skipped before their tags are parsed, unless the album "
+        "filters (--album-complete, --album-min) need all tracks of an album. "
+        "Dry runs and real runs keep separate records.",
+        action="store_true",
+        default=None,
+    )
+
+    # state
+    selection.add_argument(
+        "--state",
+        metavar="PATH",
+        help="The SQLite database file of the incremental mode (default: "
+        "~/.cache/audiorename/state.sqlite).",
+        default=None,
+    )
+
+    # reset_state
+    selection.add_argument(
+        "--reset-state",
+        help="Forget the files below the source that were recorded by the "
+        "incremental mode before processing the source.",
+        action="store_true",
+        default=None,
+    )
+
+    # show_state
+    selection.add_argument(
+        "--show-state",
+        help="List the files below the source that were recorded by the "
+        "incremental mode and exit.",
+        action="store_true",
+        default=None,
+    )
+
+    # watch
+    selection.add_argument(
+        "--watch",
+        help="Keep running and process the audio files that are added to the "
+        "source folder, for example an inbox folder. The files of a folder "
+        "are processed together as soon as none of them has changed for "
+        "the time given by “--watch-settle”, so albums that are still being "
+        "copied are not torn apart. Stop with Ctrl-C.",
+        action="store_true",
+        default=None,
+    )
+
+    # watch_interval
+    selection.add_argument(
+        "--watch-interval",
+        type=int,
+        metavar="SECONDS",
+        help="The seconds between two scans of the watched source folder "
+        "(default: 2). On Linux inotify wakes the watcher up earlier.",
+        default=None,
+    )
+
+    # watch_settle
+    selection.add_argument(
+        "--watch-settle",
+        type=int,
+        metavar="SECONDS",
+        help="The seconds the audio files of a folder must stay unchanged "
+        "before they are processed (default: 5).",
+        default=None,
+    )
+
+    # serve
+    selection.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="Instead of processing the source, answer where audio files "
+        "would be renamed to. ADDRESS is “HOST:PORT” on a loopback host (for "
+        "example “127.0.0.1:8765”) or a Unix socket: “unix:PATH” or a path "
+        "containing a directory separator (for example “./audiorename.sock”). "
+        'POST a JSON object like {"path": "…"} or {"tags": {…}, '
+        '"extension": "mp3"}, '
+        "or a list of such objects. Each answer contains the “target” and the "
+        "chosen “template”. The files are neither renamed nor modified. "
+        "Specify a dot (“.”) as the source.",
+        default=None,
+    )
+
+    # from_tags
+    selection.add_argument(
+        "--from-tags",
+        metavar="FILE",
+        help="Instead of processing the source, print the targets of the "
+        "rows of a tag dump without opening any audio file. FILE is a CSV "
+        "file with a header row of field names or a JSON Lines file (“-” "
+        "reads JSON Lines from the standard input). The optional column "
+        "“extension” (or “path”) gives the extension of the target. One JSON "
+        "object with the “target” and the chosen “template” (or an “error”) "
+        "is printed per row. Specify a dot (“.”) as the source.",
+        default=None,
+    )
+
     ###############################################################################
     # Rename
     ###############################################################################
@@ -381,6 +521,40 @@ def parse_args(argv: Optional[Tuple[str]]) -> ArgsDefault:
         default=None,
     )
 
+    # plan
+    rename.add_argument(
+        "--plan",
+        help="Render the targets of all source files first, then resolve \
+        the conflicts of source files with the same target in memory (using \
+        the best format if enabled) and finally execute the resulting \
+        actions sorted by target. Without this option each file is renamed \
+        right after its target has been rendered, so a conflict between two \
+        source files is only detected when the second one is renamed.",
+        action="store_true",
+        default=None,
+    )
+
+    # plan_out
+    rename.add_argument(
+        "--plan-out",
+        metavar="FILE",
+        help="Compute the plan (see --plan) and write its operations into \
+        a JSON Lines file instead of executing them. Each line contains the \
+        source, the target, the action, the file to clean up, the cleaning \
+        action and the chosen best format.",
+        default=None,
+    )
+
+    # apply_plan
+    rename.add_argument(
+        "--apply-plan",
+        metavar="FILE",
+        help="Execute the operations of a plan file written by --plan-out. \
+        No tags are read and the source is not scanned, so the source can \
+        be omitted.",
+        default=None,
+    )
+
     ##
     # Move actions
     ##
@@ -702,7 +876,170 @@ def parse_args(argv: Optional[Tuple[str]]) -> ArgsDefault:
         default=None,
     )
 
-    return cast(ArgsDefault, parser.parse_args(argv))
+    # mb_cache
+    metadata_actions.add_argument(
+        "--mb-cache",
+        metavar="PATH",
+        help="Cache the responses of the MusicBrainz API in a SQLite "
+        "database. Repeated enrichments need only one request per unique "
+        "recording, release or work.",
+        default=None,
+    )
+
+    # mb_cache_ttl
+    metadata_actions.add_argument(
+        "--mb-cache-ttl",
+        type=int,
+        metavar="DAYS",
+        help="The number of days a cached response is used (default: 30).",
+        default=None,
+    )
+
+    # mb_cache_size
+    metadata_actions.add_argument(
+        "--mb-cache-size",
+        type=int,
+        metavar="N",
+        help="The maximum number of cached responses. The oldest responses "
+        "are evicted first (default: 100000).",
+        default=None,
+    )
+
+    # mb_threads
+    metadata_actions.add_argument(
+        "--mb-threads",
+        type=int,
+        metavar="N",
+        help="Send up to N requests to the MusicBrainz API at the same time. "
+        "Together with --read-threads the entities are requested while the "
+        "tags of the next audio files are parsed (default: 0, the requests "
+        "are sent one after another).",
+        default=None,
+    )
+
+    # mb_rate_limit
+    metadata_actions.add_argument(
+        "--mb-rate-limit",
+        type=int,
+        metavar="N",
+        help="The maximum number of requests per second, if --mb-threads is "
+        "used (default: 1). The worker processes of --jobs share the limit.",
+        default=None,
+    )
+
+    # mb_url
+    metadata_actions.add_argument(
+        "--mb-url",
+        metavar="URL",
+        help="The base URL of the MusicBrainz server, if --mb-threads is used "
+        "(default: https://musicbrainz.org).",
+        default=None,
+    )
+
+    # mb_backend
+    metadata_actions.add_argument(
+        "--mb-backend",
+        choices=("online", "offline"),
+        help="“online” queries the MusicBrainz API, “offline” answers all "
+        "queries from a local store (see --mb-store) without internet access "
+        "(default: online).",
+        default=None,
+    )
+
+    # mb_store
+    metadata_actions.add_argument(
+        "--mb-store",
+        metavar="PATH",
+        help="The local store of the offline backend: A SQLite database or a "
+        "JSON file (a list of documents or one document per line). Each "
+        "document contains an entity with all its relations in the "
+        "structure of the MusicBrainz XML web service, for example "
+        '{"work": {"id": "…", "title": "…", "work-relation-list": […]}}.',
+        default=None,
+    )
+
+    ###############################################################################
+    # Performance
+    ###############################################################################
+
+    performance = parser.add_argument_group(
+        title="[performance]",
+        description="These options configure how the work is spread across the "
+        "available resources.",
+    )
+
+    # jobs
+    performance.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="Read the metadata and render the path templates in N worker "
+        "processes. 0 starts one worker process per CPU. The move, copy and "
+        "cleaning actions are always executed one after another in the "
+        "original order.",
+        default=None,
+    )
+
+    # index
+    performance.add_argument(
+        "--index",
+        metavar="PATH",
+        help="Store the metadata of the audio files in a SQLite database. The "
+        "tags of audio files whose size and modification time are unchanged "
+        "since the last run are read from this index instead of parsing the "
+        "files again. Entries of audio files that no longer exist are pruned "
+        "at the end of each run.",
+        default=None,
+    )
+
+    # rebuild_index
+    performance.add_argument(
+        "--rebuild-index",
+        help="Ignore the existing entries of the metadata index and parse all "
+        "audio files again.",
+        action="store_true",
+        default=None,
+    )
+
+    # read_threads
+    performance.add_argument(
+        "--read-threads",
+        type=int,
+        metavar="N",
+        help="Read the metadata in N threads. If this option or "
+        "--render-threads is greater than 1, scanning, reading, rendering "
+        "and renaming run as a pipeline of concurrent stages. Only a bounded "
+        "number of files is in flight at any time.",
+        default=None,
+    )
+
+    # render_threads
+    performance.add_argument(
+        "--render-threads",
+        type=int,
+        metavar="N",
+        help="Execute the metadata actions and render the path templates in N "
+        "threads (see --read-threads).",
+        default=None,
+    )
+
+    # io_threads
+    performance.add_argument(
+        "--io-threads",
+        type=int,
+        metavar="N",
+        help="Execute the file system operations of the move, copy, backup "
+        "and delete actions in N background threads, so slow targets don’t "
+        "stall the reading and rendering of the next files. The operations "
+        "in the same directory are executed in their original order. 0 "
+        "(default) executes them synchronously.",
+        default=None,
+    )
+
+    args = cast(ArgsDefault, parser.parse_args(argv))
+    if args.source is None and not args.apply_plan:
+        parser.error("the following arguments are required: source")
+    return args
 
 
 def format_fields_as_rst_table() -> str:
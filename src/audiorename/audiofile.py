@@ -1,18 +1,29 @@
 """This module contains all functionality on the level of a single audio file."""
 
-import errno
 import os
 import re
-import shutil
 import traceback
-from typing import Any, Dict, List, Literal, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 import phrydy
 from tmep import Functions, Template
 from tmep.format import asciify, delchars, deldupchars, replchars
 
-from .job import Job
-from .meta import Meta, compare_dicts
+from .job import Job, TemplateName
+from .meta import LazyFields, Meta, TagFields, compare_dicts
+from .scan import TargetIndex
+from .transfer import copy_file, move_file
 
 DestinationType = Literal["source", "target"]
 
@@ -33,6 +44,21 @@ class AudioFile:
     job: Job
     __prefix: Optional[str]
 
+    __meta: Optional[Meta]
+    """The cached metadata object, see :attr:`meta`."""
+
+    __meta_loaded: bool
+
+    __meta_error: Optional[str]
+    """The traceback of a failed parse. It is printed on the next access of
+    :attr:`meta`."""
+
+    __indexed_fields: Optional[Dict[str, Any]]
+    """The fields found in the metadata index."""
+
+    __index_current: bool
+    """The metadata index is up to date for this audio file."""
+
     def __init__(
         self,
         path: str,
@@ -45,6 +71,7 @@ class AudioFile:
         self.job = job
         self.__prefix = prefix
         self.shorten_symbol = "[…]"
+        self.invalidate_meta()
 
     @property
     def shell_friendly(self):
@@ -55,14 +82,84 @@ class AudioFile:
 
     @property
     def meta(self) -> Optional[Meta]:
+        """The metadata of the audio file. The tags are parsed only once per
+        file. The resulting object is cached until :meth:`invalidate_meta`
+        is called."""
+        self.preload_meta()
+        if self.__meta_error:
+            print(self.__meta_error)
+            self.__meta_error = None
+        return self.__meta
+
+    def preload_meta(self) -> None:
+        """Parse the tags ahead of time, for example in another thread. This
+        method doesn’t print anything: The traceback of a failed parse is
+        printed on the next access of :attr:`meta`."""
+        if not self.__meta_loaded:
+            self.__meta = self.__load_meta()
+            self.__meta_loaded = True
+
+    def preload(self) -> Optional[Mapping[str, Any]]:
+        """Look up the fields in the metadata index or parse the tags ahead
+        of time (see :meth:`preload_meta`).
+
+        :return: The unsanitized fields or ``None`` if the audio file is
+          broken.
+        """
+        index = self.job.metadata_index if self.job else None
+        if index and not self.__meta_loaded and self.__indexed_fields is None:
+            self.__indexed_fields = index.get(self.abspath, self.shell_friendly)
+        if index and not self.__meta_loaded and self.__indexed_fields is not None:
+            return self.__indexed_fields
+        self.preload_meta()
+        if not self.__meta:
+            return None
+        return self.__meta.export_lazy(sanitize=False)
+
+    def __load_meta(self) -> Optional[Meta]:
         if self.exists:
             try:
                 return Meta(self.abspath, self.shell_friendly)
             except Exception as e:
                 tb = traceback.TracebackException.from_exception(e)
-                print("".join(tb.stack.format()))
+                self.__meta_error = "".join(tb.stack.format())
         return None
 
+    @property
+    def fields(self) -> Optional[Mapping[str, Any]]:
+        """All fields of :attr:`meta` exported as an unsanitized mapping (see
+        :meth:`audiorename.meta.Meta.export_lazy`). The values are computed
+        on the first access. If the job uses a metadata index, the fields of
+        unchanged audio files are taken from the index without parsing the
+        tags."""
+        index = self.job.metadata_index if self.job else None
+        if index and not self.__meta_loaded:
+            if self.__indexed_fields is None:
+                self.__indexed_fields = index.get(self.abspath, self.shell_friendly)
+            if self.__indexed_fields is not None:
+                self.__index_current = True
+                return self.__indexed_fields
+        meta = self.meta
+        if not meta:
+            return None
+        if index and not self.__index_current:
+            # Only freshly parsed and unmodified metadata is indexed.
+            fields = meta.export_dict(sanitize=False)
+            index.put(self.abspath, fields, self.shell_friendly)
+            self.__index_current = True
+            return fields
+        return meta.export_lazy(sanitize=False)
+
+    def invalidate_meta(self) -> None:
+        """Discard the cached metadata. The tags are parsed again on the
+        next access of :attr:`meta`. This method has to be called after the
+        audio file has been moved, copied or saved."""
+        self.__meta = None
+        self.__meta_loaded = False
+        self.__meta_error = None
+        self.__indexed_fields = None
+        self.__index_current = False
+
     @property
     def abspath(self) -> str:
         """The absolute path of the audio file."""
@@ -123,10 +220,17 @@ class MBTrackListing:
 mb_track_listing = MBTrackListing()
 
 
-def find_target_path(target: str, extensions: List[str]) -> Optional[str]:
+def find_target_path(
+    target: str, extensions: List[str], index: Optional[TargetIndex] = None
+) -> Optional[str]:
     """Get the path of a existing audio file target. Search for audio files
     with different extensions.
+
+    :param index: Look the target up in the index of the target tree
+      instead of probing the file system once per extension.
     """
+    if index is not None:
+        return index.find(target, extensions)
     target = os.path.splitext(target)[0]
     for extension in extensions:
         audio_file = target + "." + extension
@@ -191,16 +295,28 @@ def detect_best_format(source: Meta, target: Meta, job: Job) -> DestinationType:
         return best
 
 
-def process_target_path(meta: Meta, format_string: str, shell_friendly: bool = True):
+def process_target_path(
+    meta: Mapping[str, Any],
+    format_string: Union[str, Template],
+    shell_friendly: bool = True,
+):
     """
-    :param dict meta: The to a dictionary converted attributes of a
+    :param meta: The to a dictionary (or a mapping, see
+        :class:`audiorename.meta.LazyFields`) converted attributes of a
         meta object :class:`audiorename.meta.Meta`.
-    :param string format_string:
+    :param format_string: A path template string or an already compiled
+        template, see :meth:`audiorename.job.Job.compiled_template`.
     :param boolean shell_friendly:
     """
-    template = Template(format_string)
-    functions = Functions(meta)
-    target = template.substitute(meta, functions.get())
+    if isinstance(format_string, Template):
+        template = format_string
+    else:
+        template = Template(format_string)
+    # tmep only reads the values, so a lazy mapping is passed on as it is
+    # instead of computing all fields for a dictionary.
+    values = cast(Dict[str, Any], meta)
+    functions = Functions(values)
+    target = template.substitute(values, functions.get())
 
     if isinstance(target, str):
         if shell_friendly:
@@ -247,37 +363,113 @@ class Action:
         self.job.msg.action_two_path("Backup", audio_file, backup_file)
         self.count("backup")
         if not self.dry_run:
-            self.create_dir(backup_file)
-            shutil.move(audio_file.abspath, backup_file.abspath)
 
-    def copy(self, source: AudioFile, target: AudioFile):
+            def backup() -> None:
+                self.create_dir(backup_file)
+                self.count("via_" + move_file(audio_file.abspath, backup_file.abspath))
+
+            self.execute("backup", backup, audio_file, backup_file)
+            audio_file.invalidate_meta()
+            self.job.target_index.remove(audio_file.abspath)
+            self.job.target_index.add(backup_file.abspath)
+
+    def copy(
+        self,
+        source: AudioFile,
+        target: AudioFile,
+        replaced: Optional[AudioFile] = None,
+    ):
+        """:param replaced: An existing target that is cleaned up to make
+        room for this one. The copy is skipped if its cleanup fails."""
         self.job.msg.action_two_path("Copy", source, target)
         self.count("copy")
         if not self.dry_run:
-            self.create_dir(target)
-            shutil.copy2(source.abspath, target.abspath)
 
-    def create_dir(self, audio_file: AudioFile):
-        path = os.path.dirname(audio_file.abspath)
+            def copy() -> None:
+                self.create_dir(target)
+                self.count("via_" + copy_file(source.abspath, target.abspath))
 
-        try:
-            os.makedirs(path)
-        except OSError as exception:
-            if exception.errno != errno.EEXIST:
-                raise
+            dependencies = [replaced] if replaced else []
+            self.execute("copy", copy, source, target, *dependencies)
+            target.invalidate_meta()
+            self.job.target_index.add(target.abspath)
+
+    def create_dir(self, audio_file: AudioFile):
+        # The target index remembers the directories that already exist.
+        self.job.target_index.makedirs(os.path.dirname(audio_file.abspath))
 
     def delete(self, audio_file: AudioFile):
         self.job.msg.action_one_path("Delete", audio_file)
         self.count("delete")
         if not self.dry_run:
-            os.remove(audio_file.abspath)
+            self.execute("delete", lambda: os.remove(audio_file.abspath), audio_file)
+            audio_file.invalidate_meta()
+            self.job.target_index.remove(audio_file.abspath)
 
-    def move(self, source: AudioFile, target: AudioFile):
+    def move(
+        self,
+        source: AudioFile,
+        target: AudioFile,
+        replaced: Optional[AudioFile] = None,
+    ):
+        """:param replaced: An existing target that is cleaned up to make
+        room for this one. The move is skipped if its cleanup fails."""
         self.job.msg.action_two_path("Move", source, target)
         self.count("move")
         if not self.dry_run:
-            self.create_dir(target)
-            shutil.move(source.abspath, target.abspath)
+
+            def move() -> None:
+                self.create_dir(target)
+                self.count("via_" + move_file(source.abspath, target.abspath))
+
+            dependencies = [replaced] if replaced else []
+            self.execute("move", move, source, target, *dependencies)
+            source.invalidate_meta()
+            target.invalidate_meta()
+            self.job.target_index.remove(source.abspath)
+            self.job.target_index.add(target.abspath)
+
+    def execute(
+        self, name: str, operation: Callable[[], None], *audio_files: AudioFile
+    ) -> None:
+        """Execute the file system operation of an action, either directly
+        or in the background (``--io-threads``). The background operations
+        are ordered per directory of the involved audio files and skipped if
+        an earlier operation on one of the audio files has failed.
+
+        :param name: The name of the action.
+        :param operation: The file system operation.
+        :param audio_files: The audio files the operation reads or writes.
+        """
+        executor = self.job.io_executor
+        if not executor:
+            operation()
+            return
+        executor.submit(
+            name,
+            [os.path.dirname(audio_file.abspath) for audio_file in audio_files],
+            operation,
+            [audio_file.abspath for audio_file in audio_files],
+        )
+        self.report_failures()
+
+    def wait(self) -> None:
+        """Wait for the background operations to finish and report their
+        failures."""
+        if self.job.io_executor:
+            self.job.io_executor.wait()
+            self.report_failures()
+
+    def report_failures(self) -> None:
+        """Report the failed background operations. They are counted with
+        the suffix ``_failed``, for example ``move_failed``."""
+        if not self.job.io_executor:
+            return
+        for name, error in self.job.io_executor.failures():
+            self.job.msg.status(
+                "{} failed: {}".format(name.capitalize(), error), status="error"
+            )
+            self.count(name + "_failed")
 
     def metadata(
         self, audio_file: AudioFile, enrich: bool = False, remap: bool = False
@@ -304,6 +496,7 @@ class Action:
                 self.job.msg.diff(change[0], change[1], change[2])
 
         if enrich:
+            self.job.setup_musicbrainz()
             single_action(meta, "enrich_metadata", "Enrich metadata")
         if remap:
             single_action(meta, "remap_classical", "Remap classical")
@@ -313,46 +506,130 @@ class Action:
 
         if not self.dry_run and diff:
             meta.save()
+            audio_file.invalidate_meta()
+
+
+def is_classical(fields: Mapping[str, Any], job: Job) -> bool:
+    """Check if the genre is one of the classical genres (``--genre-classical``)."""
+    genre = fields.get("genre")
+    return genre is not None and genre.lower() in job.filters.genre_classical
+
 
+def select_template(fields: Mapping[str, Any], job: Job) -> TemplateName:
+    """Select the path template for the fields of an audio file.
+
+    :param fields: The unsanitized fields of the audio file.
+    :param job: The `job` object.
+    """
+    if is_classical(fields, job):
+        return "classical"
+    elif fields.get("ar_combined_soundtrack"):
+        if job.template_settings.no_soundtrack and fields.get("comp"):
+            return "compilation"
+        return "soundtrack"
+    elif fields.get("comp"):
+        return "compilation"
+    return "default"
+
+
+def render_target(
+    fields: Mapping[str, Any],
+    job: Job,
+    template_name: TemplateName,
+    extension: Optional[str] = None,
+) -> str:
+    """Render the absolute path of the desired target.
+
+    :param fields: The unsanitized fields of the audio file.
+    :param job: The `job` object.
+    :param template_name: The name of the path template, see
+      :func:`select_template`.
+    :param extension: The extension of the audio file without the dot.
+    """
+    # Only the fields the template refers to are computed and sanitized.
+    desired_target_path = process_target_path(
+        LazyFields(fields.get, job.template_fields(template_name), sanitize=True),
+        job.compiled_template(template_name),
+        job.template_settings.shell_friendly,
+    )
+
+    # Remove the leading path separator to prevent the audio files from
+    # ending up in a folder other than the target folder.
+    desired_target_path = re.sub(r"^" + os.path.sep + r"+", "", desired_target_path)
+    if extension:
+        desired_target_path += "." + extension
+    return os.path.join(job.selection.target, desired_target_path)
+
+
+def render_tags(
+    tags: Mapping[str, Any], job: Job, extension: Optional[str] = None
+) -> Tuple[TemplateName, str]:
+    """Render the desired target from a plain mapping of raw tags (see
+    :class:`audiorename.meta.TagFields`) without opening any audio file.
+    Like :func:`find_desired_target` the classical audio files are remapped
+    (in memory only). The metadata is not enriched.
+
+    :param tags: The raw tags keyed by the field names of phrydy.
+    :param job: The `job` object.
+    :param extension: The extension of the audio file without the dot.
+
+    :return: The name of the chosen template and the absolute path of the
+      desired target.
+    """
+    tag_fields = TagFields(tags, job.template_settings.shell_friendly)
+    fields = tag_fields.export_lazy(sanitize=False)
+    if job.metadata_actions.remap_classical or is_classical(fields, job):
+        tag_fields.remap_classical()
+        fields = tag_fields.export_lazy(sanitize=False)
+    template_name = select_template(fields, job)
+    return template_name, render_target(fields, job, template_name, extension)
+
+
+def find_desired_target(source: AudioFile, job: Job) -> Optional[str]:
+    """Run the skips, the output only modes and the metadata actions and then
+    render the path of the desired target. This step only reads and writes
+    the source file itself, so it can be executed in parallel for different
+    source files.
+
+    :param source: The source audio file.
+    :param job: The `job` object.
+
+    :return: The absolute path of the desired target or ``None`` if there is
+      nothing left to rename.
+    """
 
-def do_job_on_audiofile(source_path: str, job: Job):
     def count(key: str):
         job.stats.counter.count(key)
 
-    skip = False
-
     action = Action(job)
 
-    source = AudioFile(source_path, job=job, prefix=os.getcwd(), file_type="source")
     if not job.cli_output.mb_track_listing:
         job.msg.next_file(source)
 
-    if not source.meta:
-        skip = True
+    fields = source.fields
 
     ##
     # Skips
     ##
 
-    if skip:
+    if fields is None:
         job.msg.status("Broken file", status="error")
         count("broken_file")
-        return
+        return None
 
     ##
     # Output only
     ##
 
-    if not source.meta:
-        raise Exception("source.meta must not be empty.")
-
     if job.cli_output.mb_track_listing:
+        if not source.meta:
+            raise Exception("source.meta must not be empty.")
         print(
             mb_track_listing.format_audiofile(
                 source.meta.album, source.meta.title, source.meta.length
             )
         )
-        return
+        return None
 
     if job.cli_output.debug:
         phrydy.print_debug(
@@ -361,15 +638,12 @@ def do_job_on_audiofile(source_path: str, job: Job):
             Meta.fields,
             job.cli_output.color,
         )
-        return
+        return None
 
-    if job.filters.field_skip and (
-        not hasattr(source.meta, job.filters.field_skip)
-        or not getattr(source.meta, job.filters.field_skip)
-    ):
+    if job.filters.field_skip and not fields.get(job.filters.field_skip):
         job.msg.status("No field", status="error")
         count("no_field")
-        return
+        return None
 
     ##
     # Metadata actions
@@ -381,95 +655,112 @@ def do_job_on_audiofile(source_path: str, job: Job):
             job.metadata_actions.enrich_metadata,
             job.metadata_actions.remap_classical,
         )
+        fields = source.fields
 
-    if (
-        source.meta.genre is not None
-        and getattr(source.meta, "genre", "").lower() in job.filters.genre_classical
-    ):
+    if fields is not None and is_classical(fields, job):
         if not job.metadata_actions.remap_classical:
             action.metadata(source, job.metadata_actions.enrich_metadata, True)
+            fields = source.fields
+
+    if fields is None:
+        raise Exception("The fields of the source file must not be empty.")
 
     ##
     # Rename action
     ##
 
-    if job.rename.move_action != "no_rename":
-        if (
-            source.meta.genre is not None
-            and getattr(source.meta, "genre", "").lower() in job.filters.genre_classical
-        ):
-            format_string = job.path_templates.classical
-        elif source.meta.ar_combined_soundtrack:
-            if job.args.no_soundtrack and source.meta.comp:
-                format_string = job.path_templates.compilation
-            else:
-                format_string = job.path_templates.soundtrack
-        elif source.meta.comp:
-            format_string = job.path_templates.compilation
-        else:
-            format_string = job.path_templates.default
+    if job.rename.move_action == "no_rename":
+        return None
 
-        meta_dict = source.meta.export_dict()
+    return render_target(fields, job, select_template(fields, job), source.extension)
 
-        desired_target_path = process_target_path(
-            meta_dict, format_string, job.template_settings.shell_friendly
-        )
 
-        # Remove the leading path separator to prevent the audio files from
-        # ending up in a folder other than the target folder.
-        desired_target_path = re.sub(r"^" + os.path.sep + r"+", "", desired_target_path)
-        desired_target_path = os.path.join(
-            job.selection.target, desired_target_path + "." + source.extension
-        )
+def rename_to_target(source: AudioFile, desired_target_path: str, job: Job) -> None:
+    """Compare the desired target with the already existing audio files and
+    execute the move, copy and cleaning actions. This step must be executed
+    strictly one file after another to avoid two source files racing to the
+    same target.
 
-        desired_target = AudioFile(
-            desired_target_path,
-            job=job,
-            prefix=job.selection.target,
-            file_type="target",
+    :param source: The source audio file.
+    :param desired_target_path: The path returned by
+      :func:`find_desired_target`.
+    :param job: The `job` object.
+    """
+
+    def count(key: str):
+        job.stats.counter.count(key)
+
+    action = Action(job)
+
+    desired_target = AudioFile(
+        desired_target_path,
+        job=job,
+        prefix=job.selection.target,
+        file_type="target",
+    )
+
+    # Do nothing
+    if source.abspath == desired_target.abspath:
+        job.msg.status("Renamed", status="ok")
+        count("renamed")
+        return
+
+    # Search existing target
+    target: Optional[AudioFile] = None
+    replaced: Optional[AudioFile] = None
+    target_path = find_target_path(
+        desired_target.abspath, job.filters.extension, job.target_index
+    )
+    if target_path:
+        target = AudioFile(
+            target_path, job=job, prefix=job.selection.target, file_type="target"
         )
 
-        # Do nothing
-        if source.abspath == desired_target.abspath:
-            job.msg.status("Renamed", status="ok")
-            count("renamed")
-            return
+    # Both file exist
+    if target:
+        # The target may still be written in the background.
+        action.wait()
+        if not source.meta:
+            raise Exception("source.meta must not be empty.")
+        if not target.meta:
+            raise Exception("target.meta must not be empty.")
+        best = detect_best_format(source.meta, target.meta, job)
 
-        # Search existing target
-        target = False
-        target_path = find_target_path(desired_target.abspath, job.filters.extension)
-        if target_path:
-            target = AudioFile(
-                target_path, job=job, prefix=job.selection.target, file_type="target"
-            )
+        if job.rename.cleaning_action:
+            # delete source
+            if not job.rename.best_format or (
+                job.rename.best_format and best == "target"
+            ):
+                action.cleanup(source)
 
-        # Both file exist
-        if target:
-            if not target.meta:
-                raise Exception("target.meta must not be empty.")
-            best = detect_best_format(source.meta, target.meta, job)
+            # delete target
+            if job.rename.best_format and best == "source":
+                action.cleanup(target)
+                replaced = target
 
-            if job.rename.cleaning_action:
-                # delete source
-                if not job.rename.best_format or (
-                    job.rename.best_format and best == "target"
-                ):
-                    action.cleanup(source)
+                # Unset target object to trigger copy or move actions.
+                target = None
 
-                # delete target
-                if job.rename.best_format and best == "source":
-                    action.cleanup(target)
+    if target:
+        job.msg.status("Exists", status="error")
 
-                    # Unset target object to trigger copy or move actions.
-                    target = None
+    # copy
+    elif job.rename.move_action == "copy":
+        action.copy(source, desired_target, replaced)
 
-        if target:
-            job.msg.status("Exists", status="error")
+    # move
+    elif job.rename.move_action == "move":
+        action.move(source, desired_target, replaced)
 
-        # copy
-        elif job.rename.move_action == "copy":
-            action.copy(source, desired_target)
 
-        # move
-        elif job.rename.move_action == "move":
-            action.move(source, desired_target)
+def do_job_on_audiofile(source: Union[str, AudioFile], job: Job):
+    """
+    :param source: The path of the source file or an already opened source
+      audio file whose cached metadata is reused.
+    :param job: The `job` object.
+    """
+    if isinstance(source, str):
+        source = AudioFile(source, job=job, prefix=os.getcwd(), file_type="source")
+    desired_target_path = find_desired_target(source, job)
+    if desired_target_path:
+        rename_to_target(source, desired_target_path, job)
@@ -1,12 +1,27 @@
 """Batch processing of the audio files."""
 
+import collections
+import concurrent.futures
+import contextlib
+import io
 import os
 import typing
 
-from phrydy.mediafile_extended import MediaFileExtended
-
-from .audiofile import do_job_on_audiofile, mb_track_listing
+from . import musicbrainz
+from .args import ArgsDefault
+from .audiofile import (
+    Action,
+    AudioFile,
+    do_job_on_audiofile,
+    find_desired_target,
+    mb_track_listing,
+    rename_to_target,
+)
 from .job import Job
+from .pipeline import Pipeline, Stage
+from .plan import Plan
+from .scan import normalize_extensions, scan
+from .state import IncrementalState
 
 
 class VirtualAlbum:
@@ -14,10 +29,67 @@ class VirtualAlbum:
     track: int
     path: str
 
-    def __init__(self, title: str, track: int, path: str) -> None:
+    source: AudioFile
+    """The source audio file. Its metadata has already been parsed to
+    determine the album and the track, so it is reused when the file is
+    processed."""
+
+    def __init__(self, title: str, track: int, source: AudioFile) -> None:
         self.title = title
         self.track = track
+        self.path = source.abspath
+        self.source = source
+
+
+class PreparedFile:
+    """The result of :func:`find_desired_target` executed in a worker
+    process."""
+
+    path: str
+
+    target: typing.Optional[str]
+    """The path of the desired target."""
+
+    output: str
+    """The captured standard output of the worker process."""
+
+    counters: typing.Dict[str, int]
+    """The exported counters of the worker process."""
+
+    def __init__(
+        self,
+        path: str,
+        target: typing.Optional[str],
+        output: str,
+        counters: typing.Dict[str, int],
+    ) -> None:
         self.path = path
+        self.target = target
+        self.output = output
+        self.counters = counters
+
+
+worker_job: typing.Optional[Job] = None
+"""The job of a worker process, see :func:`init_worker`."""
+
+
+def init_worker(args: ArgsDefault) -> None:
+    global worker_job
+    worker_job = Job(args)
+
+
+def prepare_in_worker(path: str) -> PreparedFile:
+    """Read the metadata and render the desired target of a source file
+    inside a worker process."""
+    if not worker_job:
+        raise Exception("The worker process has not been initialized.")
+    job = worker_job
+    job.stats.counter.reset()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        source = AudioFile(path, job=job, prefix=os.getcwd(), file_type="source")
+        target = find_desired_target(source, job)
+    return PreparedFile(path, target, output.getvalue(), job.stats.counter.export())
 
 
 class Batch:
@@ -38,23 +110,57 @@ class Batch:
 
     bundle_filter: bool
 
-    def __init__(self, job: Job):
+    extensions: typing.Tuple[str, ...]
+    """The dotted, lower case extensions of the files to process."""
+
+    jobs: int
+    """The number of worker processes."""
+
+    pipeline: bool
+    """Process the files in a pipeline of concurrent stages (see
+    :mod:`audiorename.pipeline`)."""
+
+    plan: typing.Optional[Plan]
+    """The plan of the planning mode (``--plan``). The renaming is deferred
+    until all targets are rendered."""
+
+    state: typing.Optional[IncrementalState]
+    """The state of the incremental mode (``--incremental``)."""
+
+    pool: "typing.Optional[concurrent.futures.ProcessPoolExecutor]" = None
+
+    pending: "collections.deque[concurrent.futures.Future[PreparedFile]]"
+    """The files submitted to the worker processes in the order of the
+    submission."""
+
+    paths: typing.Optional[typing.Sequence[str]]
+    """The paths of the files to process instead of the files of the source
+    (see :mod:`audiorename.watch`)."""
+
+    def __init__(self, job: Job, paths: typing.Optional[typing.Sequence[str]] = None):
         self.job = job
+        self.paths = paths
         self.bundle_filter = job.filters.album_complete or isinstance(
             job.filters.album_min, int
         )
+        self.jobs = job.performance.jobs
+        # The numbering of the track listing needs the original order.
+        if job.cli_output.mb_track_listing:
+            self.jobs = 1
+        self.pipeline = not job.cli_output.mb_track_listing and (
+            job.performance.read_threads > 1 or job.performance.render_threads > 1
+        )
+        self.pending = collections.deque()
+        self.extensions = normalize_extensions(job.filters.extension)
+        self.state = job.incremental_state if job.selection.incremental else None
+        self.plan = Plan(job) if job.rename.plan or job.rename.plan_out else None
 
     def check_extension(self, path: str) -> bool:
         """Check the extension of the track.
 
         :params str path: The path of the tracks.
         """
-        extension = self.job.filters.extension
-        extension = ["." + e for e in extension]
-        if path.lower().endswith(tuple(extension)):
-            return True
-        else:
-            return False
+        return path.lower().endswith(self.extensions)
 
     def check_quantity(self):
         """Compare the number of tracks in an album with the minimal track
@@ -90,49 +196,297 @@ class Batch:
 
         if quantity and completeness:
             for album in self.virtual_album:
-                do_job_on_audiofile(album.path, job=self.job)
+                if not self.is_unchanged(album.source.abspath):
+                    self.process_file(album.source)
 
         self.virtual_album = []
 
-    def make_bundles(self, path: str = ""):
+    def make_bundles(self, path: typing.Union[str, AudioFile] = ""):
         """
-        :params str path: The path of the tracks.
+        :params path: The path of the tracks or an already opened audio file.
         """
         if not path:
             self.process_album()
             return
 
         try:
-            media = MediaFileExtended(path)
-            album = VirtualAlbum(media.album, media.track, path)
-            if not self.current_album_title or self.current_album_title != media.album:
-                self.current_album_title = media.album
+            if isinstance(path, AudioFile):
+                source = path
+            else:
+                source = AudioFile(
+                    path, job=self.job, prefix=os.getcwd(), file_type="source"
+                )
+            # Broken files are skipped silently while bundling.
+            with contextlib.redirect_stdout(io.StringIO()):
+                fields = source.fields
+            if fields is None:
+                return
+            title: str = fields.get("album") or ""
+            track: int = fields.get("track") or 0
+            album = VirtualAlbum(title, track, source)
+            if not self.current_album_title or self.current_album_title != title:
+                self.current_album_title = title
                 self.process_album()
             self.virtual_album.append(album)
         except Exception:
             pass
 
+    def process_file(self, source: typing.Union[str, AudioFile]) -> None:
+        """Process a single audio file, either directly or by submitting it
+        to the worker processes.
+
+        :params source: The path of the track or an already opened audio
+          file (see :class:`VirtualAlbum`).
+        """
+        if not self.pool:
+            with self.report_errors():
+                if self.plan:
+                    if isinstance(source, str):
+                        source = AudioFile(
+                            source, job=self.job, prefix=os.getcwd(), file_type="source"
+                        )
+                    self.rename(source, find_desired_target(source, self.job))
+                else:
+                    do_job_on_audiofile(source, job=self.job)
+                    self.record(source)
+            return
+
+        # Only the path is sent to the worker processes. Use an index
+        # (``--index``) to avoid parsing the bundled files twice.
+        if isinstance(source, AudioFile):
+            source = source.abspath
+        self.pending.append(self.pool.submit(prepare_in_worker, source))
+        # Keep the number of files in flight bounded.
+        while len(self.pending) > self.jobs * 4:
+            self.finish_pending()
+
+    def finish_pending(self) -> None:
+        """Rename the oldest file submitted to the worker processes. The
+        results are collected in the order of the submission, so the output
+        and the rename actions are the same as in a run without workers."""
+        prepared = self.pending.popleft().result()
+        print(prepared.output, end="")
+        self.job.stats.counter.merge(prepared.counters)
+        self.rename(prepared.path, prepared.target)
+
+    def rename(
+        self, source: typing.Union[str, AudioFile], target: typing.Optional[str]
+    ) -> None:
+        """Rename a source file to its desired target or add it to the plan
+        in the planning mode.
+
+        :param source: The path of the source file or the already opened
+          source file.
+        :param target: The path of the desired target, see
+          :func:`find_desired_target`.
+        """
+        if self.plan:
+            if target:
+                self.plan.add(source, target)
+            else:
+                self.record(source)
+            return
+        with self.report_errors():
+            if target:
+                if isinstance(source, str):
+                    source = AudioFile(
+                        source, job=self.job, prefix=os.getcwd(), file_type="source"
+                    )
+                rename_to_target(source, target, self.job)
+            self.record(source)
+
+    @contextlib.contextmanager
+    def report_errors(self) -> typing.Iterator[None]:
+        """Report the error of a single file and continue with the next file
+        if the files are processed for the watch mode. Otherwise the error is
+        raised. A failed file is not recorded in the incremental state."""
+        if self.paths is None:
+            yield
+            return
+        try:
+            yield
+        except Exception as error:
+            self.job.msg.status("Error: {}".format(error), status="error")
+
+    def record(self, source: typing.Union[str, AudioFile]) -> None:
+        """Record a processed file in the state of the incremental mode.
+        With background operations (``--io-threads``) the file is recorded
+        after the operations in its directory, and only if none of the
+        operations on the file failed."""
+        state = self.state
+        if not state:
+            return
+        if isinstance(source, AudioFile):
+            source = source.abspath
+        path = os.path.abspath(source)
+        executor = self.job.io_executor
+        if executor:
+            executor.submit(
+                "record",
+                [os.path.dirname(path)],
+                lambda: state.record(path),
+                [path],
+            )
+        else:
+            state.record(path)
+
     def execute(self):
         """Process all files of a given path or process a single file."""
 
-        mb_track_listing.counter = 0
-        if os.path.isdir(self.job.selection.source):
-            for path, dirs, files in os.walk(self.job.selection.source):
-                dirs.sort()
-                files.sort()
-                for file_name in files:
-                    p = os.path.join(path, file_name)
-                    if self.check_extension(p):
-                        if self.bundle_filter:
-                            self.make_bundles(p)
-                        else:
-                            do_job_on_audiofile(p, job=self.job)
+        if self.job.rename.apply_plan:
+            for path in Plan(self.job).apply(self.job.rename.apply_plan):
+                self.record(path)
+            Action(self.job).wait()
+            if self.state:
+                self.state.commit()
+            return
+
+        # Each batch of the watch mode starts with an empty memo, the
+        # persistent caches stay warm.
+        musicbrainz.clear_memo()
+        if self.paths is None:
+            mb_track_listing.counter = 0
+            if self.job.selection.reset_state and self.job.incremental_state:
+                self.job.incremental_state.reset(self.job.selection.source)
+        self.job.target_index.clear()
+        if self.jobs > 1:
+            self.process_source_in_workers()
+        elif self.pipeline:
+            self.process_source_in_pipeline()
+        else:
+            self.process_source()
+
+        if self.plan:
+            if self.job.rename.plan_out:
+                self.plan.write(self.job.rename.plan_out)
+            else:
+                for path in self.plan.execute():
+                    self.record(path)
+
+        # Let the background operations of the actions finish.
+        Action(self.job).wait()
+        if self.job.metadata_index and self.paths is None:
+            self.job.metadata_index.prune(self.job.selection.source)
+        if self.state:
+            self.state.commit()
+
+    def process_source_in_workers(self):
+        """Process the source with the help of the worker processes."""
+        pool = concurrent.futures.ProcessPoolExecutor(
+            self.jobs, initializer=init_worker, initargs=(self.job.args,)
+        )
+        self.pool = pool
+        try:
+            self.process_source()
+            while self.pending:
+                self.finish_pending()
+        finally:
+            self.pool = None
+            self.pending.clear()
+            pool.shutdown(cancel_futures=True)
+
+    def read(self, path: str) -> AudioFile:
+        """The read stage of the pipeline: Parse the metadata (or look it
+        up in the index)."""
+        source = AudioFile(path, job=self.job, prefix=os.getcwd(), file_type="source")
+        fields = source.preload()
+        if fields and musicbrainz.client and self.job.metadata_actions.enrich_metadata:
+            musicbrainz.client.prefetch(
+                fields.get("mb_trackid"),
+                fields.get("mb_albumid"),
+                fields.get("mb_workid"),
+            )
+        return source
+
+    def render(
+        self, source: AudioFile
+    ) -> typing.Tuple[AudioFile, typing.Optional[str]]:
+        """The render stage of the pipeline: Execute the metadata actions
+        and render the desired target path."""
+        return source, find_desired_target(source, self.job)
+
+    def process_source_in_pipeline(self):
+        """Process the source in a pipeline of concurrent stages: scan, read
+        the metadata, render the target path and rename. The renaming is
+        executed one file after another in the original order. In the bundle
+        mode the rendering is executed in the order of the bundles."""
+        performance = self.job.performance
+        bundle = self.bundle
+        stages = [Stage("read", self.read, performance.read_threads)]
+        if not bundle:
+            stages.append(Stage("render", self.render, performance.render_threads))
+        self.job.open_metadata_index()
+        if self.job.metadata_actions.enrich_metadata:
+            self.job.setup_musicbrainz()
+        pipeline = Pipeline(
+            stages, capacity=(performance.read_threads + performance.render_threads) * 4
+        )
+        for result in pipeline.run(self.scan_source()):
+            print(result.output, end="")
+            if bundle:
+                self.make_bundles(result.value)
+            else:
+                self.rename(*result.value)
+
+        # Process the last bundle left over
+        if bundle:
+            self.make_bundles()
+
+    @property
+    def is_directory(self) -> bool:
+        """Whether a directory is processed and not a single file."""
+        return self.paths is not None or os.path.isdir(self.job.selection.source)
+
+    @property
+    def bundle(self) -> bool:
+        """Whether the files are bundled to albums for the album filters."""
+        return self.bundle_filter and self.is_directory
+
+    def is_unchanged(self, path: str) -> bool:
+        """Check if a file is skipped in the incremental mode and count it."""
+        if self.state and self.state.is_unchanged(os.path.abspath(path)):
+            self.job.stats.counter.count("unchanged")
+            return True
+        return False
+
+    def scan_source(self) -> typing.Iterator[str]:
+        """Yield the paths of all files with matching extensions. In the
+        incremental mode the unchanged files are skipped here, before their
+        tags are parsed. The album filters need all tracks of an album, so
+        in the bundle mode they are skipped after the bundling (see
+        :meth:`process_album`)."""
+        if self.paths is not None:
+            paths: typing.Iterable[str] = self.paths
+        elif os.path.isdir(self.job.selection.source):
+            paths = scan(
+                self.job.selection.source,
+                self.extensions,
+                ignore=(self.job.rename.backup_folder,),
+            )
+        elif self.check_extension(self.job.selection.source):
+            paths = (self.job.selection.source,)
+        else:
+            return
+        bundle = self.bundle
+        for path in paths:
+            if not bundle and self.is_unchanged(path):
+                continue
+            yield path
+
+    def process_source(self):
+        """Walk through the source and process all files with matching
+        extensions."""
+        if self.is_directory:
+            for p in self.scan_source():
+                if self.bundle_filter:
+                    self.make_bundles(p)
+                else:
+                    self.process_file(p)
 
             # Process the last bundle left over
             if self.bundle_filter:
                 self.make_bundles()
 
         else:
-            p = self.job.selection.source
-            if self.check_extension(p):
-                do_job_on_audiofile(p, job=self.job)
+            for p in self.scan_source():
+                self.process_file(p)
@@ -0,0 +1,556 @@
+"""The derived fields (``ar_*``) of audiorename.
+
+The fields are computed from the raw tags only, so the same code serves the
+metadata of audio files (:class:`audiorename.meta.Meta`) and plain mappings
+of tags (:class:`audiorename.meta.TagFields`), for example the rows of a
+tag dump.
+"""
+
+import re
+from typing import Any, List, Optional
+
+from tmep import Functions
+
+PerformerRaw = List[List[str]]
+
+
+class DerivedFields:
+    """Compute the derived fields from the raw tags. The raw tags (for
+    example ``album`` or ``track``) are read as attributes of the subclass.
+    """
+
+    shell_friendly: bool
+
+    # The raw tags the derived fields are computed from. They are provided
+    # by the subclass and typed like in :class:`phrydy.MediaFileExtended`.
+    album: Optional[str]
+    albumartist: Optional[str]
+    albumartist_credit: Optional[str]
+    albumartist_sort: Optional[str]
+    albumtype: Optional[str]
+    albumtypes: Optional[List[str]]
+    artist: Optional[str]
+    artist_credit: Optional[str]
+    artist_sort: Optional[str]
+    comments: Optional[str]
+    composer: Optional[str]
+    composer_sort: Optional[str]
+    disc: Optional[int]
+    disctotal: Optional[int]
+    original_year: Optional[int]
+    releasegroup_types: Optional[str]
+    title: Optional[str]
+    track: Optional[int]
+    tracktotal: Optional[int]
+    work: Optional[str]
+    work_hierarchy: Optional[str]
+    year: Optional[int]
+
+    @classmethod
+    def field_names(cls) -> List[str]:
+        """The names of the derived fields in alphabetical order."""
+        return sorted(
+            name
+            for name, value in DerivedFields.__dict__.items()
+            if isinstance(value, property)
+        )
+
+    def remap_classical(self) -> None:
+        """Remap some fields to fit better for classical music:
+        ``composer`` becomes ``artist``, ``work`` becomes ``album``, from the
+        ``title`` the work prefix is removed (``Symphonie No. 9: I. Allegro``
+        -> ``I. Allegro``) and ``track`` becomes the movement number. All
+        overwritten fields are safed in the ``comments`` field. No combined
+        properties (like ``ar_combined_composer``) are used and therefore some
+        code duplications are done on purpose to avoid circular endless loops.
+        """
+        safe: List[List[str]] = []
+
+        if self.title:
+            safe.append(["title", self.title])
+            self.title = re.sub(r"^[^:]*: ?", "", self.title)
+
+            roman = re.findall(r"^([IVXLCDM]*)\.", self.title)
+            if roman:
+                safe.append(["track", str(self.track)])
+                self.track = self._roman_to_int(roman[0])
+
+        if self.composer:
+            safe.append(["artist", self.artist])
+            self.artist = self.composer
+
+        if self.ar_combined_work_top:
+            safe.append(["album", self.album])
+            self.ar_performer_short
+            album = self.ar_combined_work_top
+            if self.ar_performer_short:
+                album += " (" + self.ar_performer_short + ")"
+            self.album = album
+
+        if safe:
+            comments = "Original metadata: "
+            for safed in safe:
+                comments = comments + str(safed[0]) + ": " + str(safed[1]) + "; "
+
+            self.comments = comments
+
+    ###############################################################################
+    # Static methods
+    ###############################################################################
+
+    @staticmethod
+    def _find_initials(value: str) -> str:
+        """
+        Find the first character of a string.
+
+        :param str value: A string to extract the initials.
+
+        :return: A single character in lowercase. The possible return values
+            are lowercase letters from the ASCII alphabet (``a-z``), the digit
+            ``0`` and the underscore character (``_``).
+        """
+        # To avoid ae -> a
+        value = Functions.fn_asciify(value)
+        # To avoid “!K7-Compilations” -> “!”
+        value = re.sub(r"^\W*", "", value)
+        initial = value[0:1].lower()
+
+        if re.match(r"\d", initial):
+            return "0"
+
+        if initial == "":
+            return "_"
+
+        return initial
+
+    @staticmethod
+    def _normalize_performer(ar_performer: List[str]) -> PerformerRaw:
+        """
+        :param ar_performer: A list of raw ar_performer strings like
+
+        .. code-block:: python
+
+            ['John Lennon (vocals)', 'Ringo Starr (drums)']
+
+        :return: A list
+
+        .. code-block:: python
+
+            [
+                ['vocals', 'John Lennon'],
+                ['drums', 'Ringo Starr'],
+            ]
+        """
+        out: PerformerRaw = []
+        for value in ar_performer:
+            value = value[:-1]
+            performers: List[str] = value.split(" (")
+            if len(performers) == 2:
+                out.append([performers[1], performers[0]])
+        return out
+
+    @staticmethod
+    def _roman_to_int(n: str) -> int:
+        numeral_map = tuple(
+            zip(
+                (1000, 900, 500, 400, 100, 90, 50, 40, 10, 9, 5, 4, 1),
+                ("M", "CM", "D", "CD", "C", "XC", "L", "XL", "X", "IX", "V", "IV", "I"),
+            )
+        )
+        i = result = 0
+        for integer, numeral in numeral_map:
+            while n[i : i + len(numeral)] == numeral:
+                result += integer
+                i += len(numeral)
+        return result
+
+    @staticmethod
+    def _shorten_performer(
+        ar_performer: str,
+        length: int = 3,
+        separator: str = " ",
+        abbreviation: str = ".",
+    ) -> str:
+        out = ""
+        count = 0
+        for s in ar_performer.split(" "):
+            if count < 3:
+                if len(s) > length:
+                    part = s[:length] + abbreviation
+                else:
+                    part = s
+                out = out + separator + part
+            count = count + 1
+
+        return out[len(separator) :]
+
+    @staticmethod
+    def _uniquify_list(sequence: List[Any]) -> List[Any]:
+        """https://www.peterbe.com/plog/uniqifiers-benchmark"""
+        unique: List[Any] = []
+
+        for element in sequence:
+            if not unique.count(element):
+                unique.append(element)
+
+        return unique
+
+    ###############################################################################
+    # Properties
+    ###############################################################################
+
+    @property
+    def ar_classical_album(self) -> Optional[str]:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.work``
+
+        Examples:
+
+        * ``Horn Concerto: I. Allegro`` → ``Horn Concerto``
+        * ``Die Meistersinger von Nürnberg``
+        """
+        if self.work:
+            return re.sub(r":.*$", "", (str(self.work)))
+        return None
+
+    @property
+    def ar_combined_album(self) -> Optional[str]:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.album``
+
+        Example:
+
+        * ``Just Friends (Disc 2)`` → ``Just Friends``
+        """
+        if self.album:
+            return re.sub(r" ?\([dD]is[ck].*\)$", "", str(self.album))
+        return None
+
+    @property
+    def ar_initial_album(self) -> Optional[str]:
+        """Uses:
+
+        * :class:`audiorename.derived.DerivedFields.ar_combined_album`
+
+        Examples:
+
+        * ``Just Friends`` → ``j``
+        * ``Die Meistersinger von Nürnberg``  → ``d``
+        """
+        if self.ar_combined_album:
+            return self._find_initials(self.ar_combined_album)
+        return None
+
+    @property
+    def ar_initial_artist(self) -> str:
+        """Uses:
+
+        * :class:`audiorename.derived.DerivedFields.ar_combined_artist_sort`
+
+        Examples:
+
+        * ``Just Friends`` → ``j``
+        * ``Die Meistersinger von Nürnberg``  → ``d``
+        """
+        return self._find_initials(self.ar_combined_artist_sort)
+
+    @staticmethod
+    def __remove_feat_vs_second_artist(artist: str) -> str:
+        """Give only the first artist, remove the second after ``feat.``,
+        ``ft.`` or ``vs.``"""
+        return re.sub(r"\s+(feat|ft|vs)\.?\s.*", "", artist, flags=re.IGNORECASE)
+
+    @property
+    def ar_combined_artist(self) -> str:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.albumartist``
+        * ``phrydy.mediafile.MediaFile.artist``
+        * ``phrydy.mediafile.MediaFile.albumartist_credit``
+        * ``phrydy.mediafile.MediaFile.artist_credit``
+        * ``phrydy.mediafile.MediaFile.albumartist_sort``
+        * ``phrydy.mediafile.MediaFile.artist_sort``
+
+        Removes the second artist after ``feat.``, ``ft.`` or ``vs.``.
+        """
+        out: str
+        if self.albumartist:
+            out = self.albumartist
+        elif self.artist:
+            out = self.artist
+        elif self.albumartist_credit:
+            out = self.albumartist_credit
+        elif self.artist_credit:
+            out = self.artist_credit
+        # Same as aristsafe_sort
+        elif self.albumartist_sort:
+            out = self.albumartist_sort
+        elif self.artist_sort:
+            out = self.artist_sort
+        else:
+            out = "Unknown"
+
+        return DerivedFields.__remove_feat_vs_second_artist(out)
+
+    @property
+    def ar_combined_artist_sort(self) -> str:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.albumartist_sort``
+        * ``phrydy.mediafile.MediaFile.artist_sort``
+        * ``phrydy.mediafile.MediaFile.albumartist``
+        * ``phrydy.mediafile.MediaFile.artist``
+        * ``phrydy.mediafile.MediaFile.albumartist_credit``
+        * ``phrydy.mediafile.MediaFile.artist_credit``
+
+        Removes the second artist after ``feat.``, ``ft.`` or ``vs.``.
+        """
+        out: str
+        if self.albumartist_sort:
+            out = self.albumartist_sort
+        elif self.artist_sort:
+            out = self.artist_sort
+        # Same as ar_combined_artist
+        elif self.albumartist:
+            out = self.albumartist
+        elif self.artist:
+            out = self.artist
+        elif self.albumartist_credit:
+            out = self.albumartist_credit
+        elif self.artist_credit:
+            out = self.artist_credit
+        else:
+            out = "Unknown"
+
+        out = DerivedFields.__remove_feat_vs_second_artist(out)
+
+        if self.shell_friendly:
+            out = out.replace(", ", "_")
+
+        return out
+
+    @property
+    def ar_initial_composer(self) -> str:
+        """Uses:
+
+        * :class:`audiorename.derived.DerivedFields.ar_combined_composer`
+        """
+        return self._find_initials(self.ar_combined_composer)
+
+    @property
+    def ar_combined_composer(self) -> str:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.composer_sort``
+        * ``phrydy.mediafile.MediaFile.composer``
+        * :class:`audiorename.derived.DerivedFields.ar_combined_artist`
+        """
+        out: str = ""
+        if self.composer_sort:
+            out = self.composer_sort
+        elif self.composer:
+            out = self.composer
+        else:
+            out = self.ar_combined_artist
+
+        if self.shell_friendly:
+            out = out.replace(", ", "_")
+
+        # e. g. 'Mozart, Wolfgang Amadeus/Süßmeyer, Franz Xaver'
+        return re.sub(r" ?/.*", "", out)
+
+    @property
+    def ar_combined_disctrack(self) -> Optional[str]:
+        """
+        Generate a combination of track and disc number, e. g.: ``1-04``,
+        ``3-06``.
+
+        Uses:
+
+        * ``phrydy.mediafile.MediaFile.disctotal``
+        * ``phrydy.mediafile.MediaFile.disc``
+        * ``phrydy.mediafile.MediaFile.tracktotal``
+        * ``phrydy.mediafile.MediaFile.track``
+        """
+
+        if not self.track:
+            return None
+
+        if self.disctotal and int(self.disctotal) > 99:
+            disk = str(self.disc).zfill(3)
+        elif self.disctotal and int(self.disctotal) > 9:
+            disk = str(self.disc).zfill(2)
+        else:
+            disk = str(self.disc)
+
+        if self.tracktotal and int(self.tracktotal) > 99:
+            track = str(self.track).zfill(3)
+        else:
+            track = str(self.track).zfill(2)
+
+        if self.disc and self.disctotal and int(self.disctotal) > 1:
+            out = disk + "-" + track
+        elif self.disc and not self.disctotal:
+            out = disk + "-" + track
+        else:
+            out = track
+
+        return out
+
+    @property
+    def ar_performer(self) -> str:
+        """Uses:
+
+        * :class:`audiorename.derived.DerivedFields.ar_performer_raw`
+        """
+        out: str = ""
+        for ar_performer in self.ar_performer_raw:
+            out = out + ", " + ar_performer[1]
+
+        out = out[2:]
+
+        return out
+
+    @property
+    def ar_classical_performer(self) -> str:
+        """http://musicbrainz.org/doc/Style/Classical/Release/Artist
+
+        Uses:
+
+        * :class:`audiorename.derived.DerivedFields.ar_performer_short`
+        * ``phrydy.mediafile.MediaFile.albumartist``
+        """
+        if len(self.ar_performer_short) > 0:
+            out = self.ar_performer_short
+        elif self.albumartist:
+            out = re.sub(r"^.*; ?", "", self.albumartist)
+        else:
+            out = ""
+
+        return out
+
+    @property
+    def ar_performer_raw(self) -> PerformerRaw:
+        """The performers as a list of roles and names:
+
+        .. code-block:: python
+
+            [
+                ['conductor', 'Herbert von Karajan'],
+                ['violin', 'Anne-Sophie Mutter'],
+            ]
+
+        The performers are no regular tag, so each subclass reads them in its
+        own way.
+        """
+        return []
+
+    @property
+    def ar_performer_short(self):
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.ar_performer_raw``
+        """
+        out: List[str] = []
+
+        performers = self.ar_performer_raw
+        picked: PerformerRaw = []
+        for performer in performers:
+            if performer[0] == "conductor" or performer[0] == "orchestra":
+                picked.append(performer)
+
+        if len(picked) > 0:
+            performers = picked
+
+        for performer in performers:
+            if (
+                performer[0] == "producer"
+                or performer[0] == "executive producer"
+                or performer[0] == "balance engineer"
+            ):
+                pass
+            elif (
+                performer[0] == "orchestra"
+                or performer[0] == "choir vocals"
+                or performer[0] == "string quartet"
+            ):
+                out.append(
+                    self._shorten_performer(performer[1], separator="", abbreviation="")
+                )
+            else:
+                out.append(performer[1].split(" ")[-1])
+
+        return ", ".join(out)
+
+    @property
+    def ar_combined_soundtrack(self) -> bool:
+        if self.releasegroup_types and "soundtrack" in self.releasegroup_types.lower():
+            return True
+
+        if self.albumtype and "soundtrack" in self.albumtype.lower():
+            return True
+
+        if self.albumtypes:
+            for type in self.albumtypes:
+                if "soundtrack" in type.lower():
+                    return True
+
+        return False
+
+    @property
+    def ar_classical_title(self) -> Optional[str]:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.title``
+
+        Example:
+
+        * ``Horn Concerto: I. Allegro``
+        """
+        if self.title:
+            return re.sub(r"^[^:]*: ?", "", self.title)
+        return None
+
+    @property
+    def ar_classical_track(self) -> Optional[str]:
+        """Uses:
+
+        * :class:`audiorename.derived.DerivedFields.ar_classical_title`
+        * :class:`audiorename.derived.DerivedFields.ar_combined_disctrack`
+        """
+        roman = None
+        if self.ar_classical_title:
+            roman = re.findall(r"^([IVXLCDM]*)\.", self.ar_classical_title)
+        if roman:
+            return str(self._roman_to_int(roman[0])).zfill(2)
+        elif self.ar_combined_disctrack:
+            return self.ar_combined_disctrack
+        return None
+
+    @property
+    def ar_combined_work_top(self) -> Optional[str]:
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.work_hierarchy``
+        * ``phrydy.mediafile.MediaFile.work``
+
+        """
+        if self.work_hierarchy:
+            return self.work_hierarchy.split(" -> ")[0]
+        elif self.ar_classical_album:
+            return self.ar_classical_album
+        return None
+
+    @property
+    def ar_combined_year(self):
+        """Uses:
+
+        * ``phrydy.mediafile.MediaFile.original_year``
+        * ``phrydy.mediafile.MediaFile.year``
+        """
+        if self.original_year:
+            return self.original_year
+        elif self.year:
+            return self.year
@@ -0,0 +1,149 @@
+"""A persistent index of the metadata of the audio files.
+
+The index is a SQLite database. It stores the fields exported by
+:meth:`audiorename.meta.Meta.export_dict` for each audio file. An entry is
+only used as long as the size and the modification time of the audio file
+are unchanged, so unchanged files don’t have to be parsed by mutagen again.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import typing
+
+Fields = typing.Dict[str, typing.Any]
+
+
+class MetadataIndex:
+    """
+    :param path: The path of the SQLite database file. The file is created
+      if it doesn’t exist.
+    :param rebuild: Ignore all existing entries. The entries are overwritten
+      by newly parsed metadata.
+    """
+
+    path: str
+
+    rebuild: bool
+
+    __connection: sqlite3.Connection
+
+    __lock: threading.Lock
+
+    def __init__(self, path: str, rebuild: bool = False) -> None:
+        self.path = path
+        self.rebuild = rebuild
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Multiple worker processes may write into the same database. Within
+        # a process the connection is shared by the threads of the pipeline.
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            "path TEXT PRIMARY KEY, "
+            "size INTEGER NOT NULL, "
+            "mtime INTEGER NOT NULL, "
+            "shell_friendly INTEGER NOT NULL, "
+            "fields TEXT NOT NULL)"
+        )
+        self.__connection.commit()
+
+    @staticmethod
+    def __stat(path: str) -> typing.Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def get(self, path: str, shell_friendly: bool = False) -> typing.Optional[Fields]:
+        """Get the indexed fields of an audio file.
+
+        :param path: The absolute path of the audio file.
+        :param shell_friendly: Some fields (for example
+          ``ar_combined_artist_sort``) depend on this setting.
+
+        :return: The fields or ``None`` if the audio file is not indexed or
+          has been changed since it was indexed.
+        """
+        if self.rebuild:
+            return None
+        stat = self.__stat(path)
+        if not stat:
+            return None
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT size, mtime, shell_friendly, fields FROM metadata "
+                "WHERE path = ?",
+                (path,),
+            ).fetchone()
+        if (
+            not row
+            or row[0] != stat.st_size
+            or row[1] != stat.st_mtime_ns
+            or bool(row[2]) != shell_friendly
+        ):
+            return None
+        return json.loads(row[3])
+
+    def put(self, path: str, fields: Fields, shell_friendly: bool = False) -> None:
+        """Store the fields of an audio file in the index.
+
+        :param path: The absolute path of the audio file.
+        :param fields: The fields exported by
+          :meth:`audiorename.meta.Meta.export_dict` with ``sanitize=False``.
+        :param shell_friendly: The setting the fields were exported with.
+        """
+        stat = self.__stat(path)
+        if not stat:
+            return
+        # Values like datetime.date are stored as strings. The sanitized
+        # string representation stays the same.
+        serialized = json.dumps(fields, default=str)
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)",
+                (
+                    path,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    int(shell_friendly),
+                    serialized,
+                ),
+            )
+            self.__connection.commit()
+
+    def prune(self, prefix: str) -> int:
+        """Remove the entries of all audio files below a path that no longer
+        exist.
+
+        :param prefix: A directory or a file path.
+
+        :return: The number of removed entries.
+        """
+        prefix = os.path.abspath(prefix)
+        stale: typing.List[typing.Tuple[str]] = []
+        with self.__lock:
+            for (path,) in self.__connection.execute(
+                "SELECT path FROM metadata WHERE path = ? OR substr(path, 1, ?) = ?",
+                (prefix, len(prefix) + 1, os.path.join(prefix, "")),
+            ).fetchall():
+                if not os.path.exists(path):
+                    stale.append((path,))
+            self.__connection.executemany("DELETE FROM metadata WHERE path = ?", stale)
+            self.__connection.commit()
+        return len(stale)
+
+    def count(self) -> int:
+        """The number of indexed audio files."""
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM metadata"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        self.__connection.close()
@@ -2,11 +2,21 @@
 
 import configparser
 import os
+import threading
 import time
 import typing
 
+from tmep import Template
+
+from . import musicbrainz
 from .args import ArgsDefault
+from .index import MetadataIndex
 from .message import Message
+from .meta import find_template_fields
+from .musicbrainz import Client, OfflineStore, ResponseCache, WorkGraph
+from .scan import TargetIndex
+from .state import IncrementalState
+from .transfer import Executor
 
 
 class Timer:
@@ -27,6 +37,8 @@ class Timer:
 class Counter:
     def __init__(self) -> None:
         self._counters: typing.Dict[str, int] = {}
+        # The counter is shared by the threads of the pipeline.
+        self.__lock = threading.Lock()
 
     def reset(self) -> None:
         self._counters = {}
@@ -38,10 +50,11 @@ class Counter:
 
         :return: None
         """
-        if counter in self._counters:
-            self._counters[counter] += 1
-        else:
-            self._counters[counter] = 1
+        with self.__lock:
+            if counter in self._counters:
+                self._counters[counter] += 1
+            else:
+                self._counters[counter] = 1
 
     def get(self, counter: str) -> int:
         """Get the counter identify by a string.
@@ -57,6 +70,20 @@ class Counter:
         else:
             return 0
 
+    def export(self) -> typing.Dict[str, int]:
+        """Export all counters into a dictionary, for example to transfer them
+        from a worker process to the main process."""
+        return dict(self._counters)
+
+    def merge(self, counters: typing.Dict[str, int]) -> None:
+        """Add the numbers of an exported counter to this counter.
+
+        :param counters: A dictionary generated by :meth:`export`.
+        """
+        with self.__lock:
+            for counter, value in counters.items():
+                self._counters[counter] = self.get(counter) + value
+
     def result(self) -> str:
         out: typing.List[str] = []
         for counter, value in sorted(self._counters.items()):
@@ -75,6 +102,8 @@ class Statistic:
 
 IniDataTypes = typing.Literal["boolean", "integer", "string"]
 
+SettingsType = typing.TypeVar("SettingsType", bound=typing.NamedTuple)
+
 
 class Config:
     """The class ``Config`` is used to combine the two sources of settings
@@ -106,6 +135,15 @@ class Config:
             if value is not None:
                 setattr(self, "_" + key, value)
 
+    def freeze(self, settings: typing.Type[SettingsType]) -> SettingsType:
+        """Resolve all settings of the section once and store them in an
+        immutable snapshot.
+
+        :param settings: A named tuple whose fields correspond to the
+          properties of the subclass.
+        """
+        return settings(*(getattr(self, field) for field in settings._fields))
+
     def __get_value_from_config(
         self,
         config: configparser.ConfigParser,
@@ -129,6 +167,15 @@ class SelectionConfig(Config):
     _source: typing.Optional[str]
     _target: typing.Optional[str]
     _source_as_target: typing.Optional[bool]
+    _incremental: typing.Optional[bool]
+    _state: typing.Optional[str]
+    _reset_state: typing.Optional[bool]
+    _show_state: typing.Optional[bool]
+    _watch: typing.Optional[bool]
+    _watch_interval: typing.Optional[int]
+    _watch_settle: typing.Optional[int]
+    _serve: typing.Optional[str]
+    _from_tags: typing.Optional[str]
 
     @property
     def source(self) -> str:
@@ -168,6 +215,96 @@ class SelectionConfig(Config):
             return self._source_as_target
         return False
 
+    @property
+    def incremental(self) -> bool:
+        """Skip the source files that are unchanged since they were
+        processed by a previous run."""
+        if hasattr(self, "_incremental") and isinstance(self._incremental, bool):
+            return self._incremental
+        return False
+
+    @property
+    def state(self) -> str:
+        """The path of the SQLite database file of the incremental mode."""
+        if hasattr(self, "_state") and isinstance(self._state, str) and self._state:
+            return os.path.abspath(os.path.expanduser(self._state))
+        return os.path.expanduser(
+            os.path.join("~", ".cache", "audiorename", "state.sqlite")
+        )
+
+    @property
+    def reset_state(self) -> bool:
+        if hasattr(self, "_reset_state") and isinstance(self._reset_state, bool):
+            return self._reset_state
+        return False
+
+    @property
+    def show_state(self) -> bool:
+        if hasattr(self, "_show_state") and isinstance(self._show_state, bool):
+            return self._show_state
+        return False
+
+    @property
+    def watch(self) -> bool:
+        """Keep running and process the new files in the source directory."""
+        if hasattr(self, "_watch") and isinstance(self._watch, bool):
+            return self._watch
+        return False
+
+    @property
+    def watch_interval(self) -> int:
+        """The seconds between two scans of the watched source directory."""
+        if hasattr(self, "_watch_interval") and isinstance(self._watch_interval, int):
+            return max(self._watch_interval, 1)
+        return 2
+
+    @property
+    def watch_settle(self) -> int:
+        """The seconds the files of a directory must stay unchanged before
+        they are processed."""
+        if hasattr(self, "_watch_settle") and isinstance(self._watch_settle, int):
+            return max(self._watch_settle, 0)
+        return 5
+
+    @property
+    def serve(self) -> typing.Optional[str]:
+        """The address of the target server: ``HOST:PORT`` or the path of a
+        Unix socket."""
+        if hasattr(self, "_serve") and isinstance(self._serve, str) and self._serve:
+            return self._serve
+        return None
+
+    @property
+    def from_tags(self) -> typing.Optional[str]:
+        """The path of a tag dump (CSV or JSON Lines) or ``-`` for the
+        standard input."""
+        if (
+            hasattr(self, "_from_tags")
+            and isinstance(self._from_tags, str)
+            and self._from_tags
+        ):
+            if self._from_tags == "-":
+                return "-"
+            return os.path.abspath(os.path.expanduser(self._from_tags))
+        return None
+
+
+class SelectionSettings(typing.NamedTuple):
+    """The resolved settings of :class:`SelectionConfig`."""
+
+    source: str
+    target: typing.Optional[str]
+    source_as_target: bool
+    incremental: bool
+    state: str
+    reset_state: bool
+    show_state: bool
+    watch: bool
+    watch_interval: int
+    watch_settle: int
+    serve: typing.Optional[str]
+    from_tags: typing.Optional[str]
+
 
 MoveAction = typing.Literal["move", "copy", "no_rename"]
 CleaningAction = typing.Literal["backup", "delete", "do_nothing"]
@@ -177,6 +314,9 @@ class RenameConfig(Config):
     _backup_folder: typing.Optional[str]
     _best_format: typing.Optional[bool]
     _dry_run: typing.Optional[bool]
+    _plan: typing.Optional[bool]
+    _plan_out: typing.Optional[str]
+    _apply_plan: typing.Optional[str]
     _move_action: typing.Optional[MoveAction]
     _cleaning_action: typing.Optional[CleaningAction]
 
@@ -198,6 +338,30 @@ class RenameConfig(Config):
             return self._dry_run
         return False
 
+    @property
+    def plan(self) -> bool:
+        """Render all targets first and then execute a conflict-free plan
+        (see :mod:`audiorename.plan`)."""
+        if hasattr(self, "_plan") and isinstance(self._plan, bool):
+            return self._plan
+        return False
+
+    @property
+    def plan_out(self) -> typing.Optional[str]:
+        """Write the plan into this JSON Lines file instead of executing
+        it."""
+        if hasattr(self, "_plan_out") and isinstance(self._plan_out, str):
+            return os.path.abspath(os.path.expanduser(self._plan_out))
+        return None
+
+    @property
+    def apply_plan(self) -> typing.Optional[str]:
+        """Apply the plan of this JSON Lines file instead of processing the
+        source."""
+        if hasattr(self, "_apply_plan") and isinstance(self._apply_plan, str):
+            return os.path.abspath(os.path.expanduser(self._apply_plan))
+        return None
+
     @property
     def move_action(self) -> MoveAction:
         if hasattr(self, "_move_action") and self._move_action in [
@@ -219,6 +383,19 @@ class RenameConfig(Config):
         return "do_nothing"
 
 
+class RenameSettings(typing.NamedTuple):
+    """The resolved settings of :class:`RenameConfig`."""
+
+    backup_folder: str
+    best_format: bool
+    dry_run: bool
+    plan: bool
+    plan_out: typing.Optional[str]
+    apply_plan: typing.Optional[str]
+    move_action: MoveAction
+    cleaning_action: CleaningAction
+
+
 class FiltersConfig(Config):
     _album_complete: typing.Optional[bool]
     _album_min: typing.Optional[int]
@@ -263,6 +440,16 @@ class FiltersConfig(Config):
         return None
 
 
+class FiltersSettings(typing.NamedTuple):
+    """The resolved settings of :class:`FiltersConfig`."""
+
+    album_complete: bool
+    album_min: typing.Optional[int]
+    extension: typing.List[str]
+    genre_classical: typing.List[str]
+    field_skip: typing.Optional[str]
+
+
 class TemplateSettingsConfig(Config):
     _classical: typing.Optional[bool]
     _shell_friendly: typing.Optional[bool]
@@ -287,6 +474,17 @@ class TemplateSettingsConfig(Config):
         return False
 
 
+class TemplateSettings(typing.NamedTuple):
+    """The resolved settings of :class:`TemplateSettingsConfig`."""
+
+    classical: bool
+    shell_friendly: bool
+    no_soundtrack: bool
+
+
+TemplateName = typing.Literal["default", "compilation", "soundtrack", "classical"]
+
+
 class PathTemplatesConfig(Config):
     """A class to store the selected or configured path templates. This class
     can be accessed under the attibute path_templates of the Job class."""
@@ -369,6 +567,15 @@ class PathTemplatesConfig(Config):
         )
 
 
+class PathTemplatesSettings(typing.NamedTuple):
+    """The resolved settings of :class:`PathTemplatesConfig`."""
+
+    default: str
+    compilation: str
+    soundtrack: str
+    classical: str
+
+
 class CliOutputConfig(Config):
     _color: typing.Optional[bool]
     _debug: typing.Optional[bool]
@@ -423,9 +630,32 @@ class CliOutputConfig(Config):
         return False
 
 
+class CliOutputSettings(typing.NamedTuple):
+    """The resolved settings of :class:`CliOutputConfig`."""
+
+    color: bool
+    debug: bool
+    job_info: bool
+    mb_track_listing: bool
+    one_line: bool
+    stats: bool
+    verbose: bool
+
+
+MusicBrainzBackend = typing.Literal["online", "offline"]
+
+
 class MetadataActionsConfig(Config):
     _enrich_metadata: typing.Optional[bool]
     _remap_classical: typing.Optional[bool]
+    _mb_cache: typing.Optional[str]
+    _mb_cache_ttl: typing.Optional[int]
+    _mb_cache_size: typing.Optional[int]
+    _mb_threads: typing.Optional[int]
+    _mb_rate_limit: typing.Optional[int]
+    _mb_url: typing.Optional[str]
+    _mb_backend: typing.Optional[MusicBrainzBackend]
+    _mb_store: typing.Optional[str]
 
     @property
     def enrich_metadata(self) -> bool:
@@ -443,6 +673,161 @@ class MetadataActionsConfig(Config):
             return self._remap_classical
         return False
 
+    @property
+    def mb_cache(self) -> typing.Optional[str]:
+        """The path of the SQLite database file caching the responses of
+        the MusicBrainz API."""
+        if (
+            hasattr(self, "_mb_cache")
+            and isinstance(self._mb_cache, str)
+            and self._mb_cache
+        ):
+            return os.path.abspath(os.path.expanduser(self._mb_cache))
+        return None
+
+    @property
+    def mb_cache_ttl(self) -> int:
+        """The time to live of the cached responses in days."""
+        if hasattr(self, "_mb_cache_ttl") and isinstance(self._mb_cache_ttl, int):
+            return max(self._mb_cache_ttl, 0)
+        return 30
+
+    @property
+    def mb_cache_size(self) -> int:
+        """The maximum number of cached responses."""
+        if hasattr(self, "_mb_cache_size") and isinstance(self._mb_cache_size, int):
+            return max(self._mb_cache_size, 1)
+        return 100000
+
+    @property
+    def mb_threads(self) -> int:
+        """The number of concurrent requests to the MusicBrainz API. ``0``
+        sends the requests one after another using ``musicbrainzngs``."""
+        if hasattr(self, "_mb_threads") and isinstance(self._mb_threads, int):
+            return max(self._mb_threads, 0)
+        return 0
+
+    @property
+    def mb_rate_limit(self) -> int:
+        """The maximum number of requests per second (see
+        :attr:`mb_threads`)."""
+        if hasattr(self, "_mb_rate_limit") and isinstance(self._mb_rate_limit, int):
+            return max(self._mb_rate_limit, 1)
+        return 1
+
+    @property
+    def mb_url(self) -> str:
+        """The base URL of the MusicBrainz server (see :attr:`mb_threads`)."""
+        if hasattr(self, "_mb_url") and isinstance(self._mb_url, str) and self._mb_url:
+            return self._mb_url
+        return "https://musicbrainz.org"
+
+    @property
+    def mb_backend(self) -> MusicBrainzBackend:
+        """``online`` queries the MusicBrainz API, ``offline`` answers the
+        queries from a local store (see :attr:`mb_store`)."""
+        if hasattr(self, "_mb_backend") and self._mb_backend in ("online", "offline"):
+            return self._mb_backend
+        return "online"
+
+    @property
+    def mb_store(self) -> typing.Optional[str]:
+        """The path of the local store of the offline backend: a SQLite
+        database or a JSON file (see
+        :class:`audiorename.musicbrainz.OfflineStore`)."""
+        if (
+            hasattr(self, "_mb_store")
+            and isinstance(self._mb_store, str)
+            and self._mb_store
+        ):
+            return os.path.abspath(os.path.expanduser(self._mb_store))
+        return None
+
+
+class MetadataActionsSettings(typing.NamedTuple):
+    """The resolved settings of :class:`MetadataActionsConfig`."""
+
+    enrich_metadata: bool
+    remap_classical: bool
+    mb_cache: typing.Optional[str]
+    mb_cache_ttl: int
+    mb_cache_size: int
+    mb_threads: int
+    mb_rate_limit: int
+    mb_url: str
+    mb_backend: MusicBrainzBackend
+    mb_store: typing.Optional[str]
+
+
+class PerformanceConfig(Config):
+    _jobs: typing.Optional[int]
+    _index: typing.Optional[str]
+    _rebuild_index: typing.Optional[bool]
+    _read_threads: typing.Optional[int]
+    _render_threads: typing.Optional[int]
+    _io_threads: typing.Optional[int]
+
+    @property
+    def jobs(self) -> int:
+        """The number of worker processes. ``0`` starts one worker process
+        per CPU."""
+        if hasattr(self, "_jobs") and isinstance(self._jobs, int):
+            if self._jobs == 0:
+                return os.cpu_count() or 1
+            if self._jobs > 0:
+                return self._jobs
+        return 1
+
+    @property
+    def metadata_index(self) -> typing.Optional[str]:
+        """The path of the SQLite database file of the metadata index."""
+        if hasattr(self, "_index") and isinstance(self._index, str) and self._index:
+            return os.path.abspath(os.path.expanduser(self._index))
+        return None
+
+    @property
+    def rebuild_index(self) -> bool:
+        if hasattr(self, "_rebuild_index") and isinstance(self._rebuild_index, bool):
+            return self._rebuild_index
+        return False
+
+    @property
+    def read_threads(self) -> int:
+        """The number of threads reading the metadata in the pipeline (see
+        :mod:`audiorename.pipeline`)."""
+        if hasattr(self, "_read_threads") and isinstance(self._read_threads, int):
+            return max(self._read_threads, 1)
+        return 1
+
+    @property
+    def render_threads(self) -> int:
+        """The number of threads rendering the target paths in the
+        pipeline."""
+        if hasattr(self, "_render_threads") and isinstance(self._render_threads, int):
+            return max(self._render_threads, 1)
+        return 1
+
+    @property
+    def io_threads(self) -> int:
+        """The number of threads executing the file system operations of the
+        actions. ``0`` executes them synchronously."""
+        if hasattr(self, "_io_threads") and isinstance(self._io_threads, int):
+            return max(self._io_threads, 0)
+        return 0
+
+
+class PerformanceSettings(typing.NamedTuple):
+    """The resolved settings of :class:`PerformanceConfig`."""
+
+    jobs: int
+    metadata_index: typing.Optional[str]
+    """The path of the metadata index (``--index``). The field isn’t named
+    ``index`` to not shadow :meth:`tuple.index`."""
+    rebuild_index: bool
+    read_threads: int
+    render_threads: int
+    io_threads: int
+
 
 class Job:
     """Holds informations of one job which can handle multiple files.
@@ -450,8 +835,9 @@ class Job:
     A jobs represents one call of the program on the command line. This class
     unifies and processes the data of the `argparse` and the `configparser`
     call. It groups the `argparse` and the `configparser` key-value pairs into
-    parent properties. The properties of this class for example can be used to
-    display easily an overview message of the job.
+    parent attributes, one immutable snapshot per section. The attributes of
+    this class for example can be used to display easily an overview message
+    of the job.
     """
 
     stats = Statistic()
@@ -459,48 +845,77 @@ class Job:
     args: ArgsDefault
     config: typing.Optional[typing.List[configparser.ConfigParser]] = None
 
+    selection: SelectionSettings
+    rename: RenameSettings
+    filters: FiltersSettings
+    template_settings: TemplateSettings
+    path_templates: PathTemplatesSettings
+    cli_output: CliOutputSettings
+    metadata_actions: MetadataActionsSettings
+    performance: PerformanceSettings
+
+    __metadata_index: typing.Optional[MetadataIndex] = None
+
+    __musicbrainz_cache: typing.Optional[ResponseCache] = None
+
+    __musicbrainz_client: typing.Optional[Client] = None
+
+    __musicbrainz_store: typing.Optional[OfflineStore] = None
+
+    __work_graph: typing.Optional[WorkGraph] = None
+
+    __incremental_state: typing.Optional[IncrementalState] = None
+
+    __target_index: typing.Optional[TargetIndex] = None
+
+    __io_executor: typing.Optional[Executor] = None
+
+    __musicbrainz_ready: bool = False
+
+    __compiled_templates: typing.Dict[TemplateName, Template]
+
+    __template_fields: typing.Dict[TemplateName, typing.FrozenSet[str]]
+
     def __init__(self, args: ArgsDefault):
         self.args = args
         if args.config is not None:
             self.config = self.__read_config(args.config)
 
-        self.msg = Message(self)
-
-    def __read_config(
-        self, file_paths: typing.List[str]
-    ) -> typing.List[configparser.ConfigParser]:
-        configs: typing.List[configparser.ConfigParser] = []
-        for file_path in file_paths:
-            config = configparser.ConfigParser()
-            config.read(file_path)
-            configs.append(config)
-        return configs
-
-    @property
-    def selection(self) -> SelectionConfig:
-        return SelectionConfig(
+        # All sections are resolved only once. The snapshots are read many
+        # times per audio file.
+        self.selection = SelectionConfig(
             self,
             "selection",
-            {"source": "string", "target": "string", "source_as_target": "boolean"},
-        )
-
-    @property
-    def rename(self) -> RenameConfig:
-        return RenameConfig(
+            {
+                "source": "string",
+                "target": "string",
+                "source_as_target": "boolean",
+                "incremental": "boolean",
+                "state": "string",
+                "reset_state": "boolean",
+                "show_state": "boolean",
+                "watch": "boolean",
+                "watch_interval": "integer",
+                "watch_settle": "integer",
+                "serve": "string",
+                "from_tags": "string",
+            },
+        ).freeze(SelectionSettings)
+        self.rename = RenameConfig(
             self,
             "rename",
             {
                 "backup_folder": "string",
                 "best_format": "boolean",
                 "dry_run": "boolean",
+                "plan": "boolean",
+                "plan_out": "string",
+                "apply_plan": "string",
                 "move_action": "string",
                 "cleaning_action": "string",
             },
-        )
-
-    @property
-    def filters(self) -> FiltersConfig:
-        return FiltersConfig(
+        ).freeze(RenameSettings)
+        self.filters = FiltersConfig(
             self,
             "filters",
             {
@@ -510,11 +925,8 @@ class Job:
                 "genre_classical": "string",
                 "field_skip": "string",
             },
-        )
-
-    @property
-    def template_settings(self) -> TemplateSettingsConfig:
-        return TemplateSettingsConfig(
+        ).freeze(FiltersSettings)
+        self.template_settings = TemplateSettingsConfig(
             self,
             "template_settings",
             {
@@ -522,11 +934,8 @@ class Job:
                 "shell_friendly": "boolean",
                 "no_soundtrack": "boolean",
             },
-        )
-
-    @property
-    def path_templates(self) -> PathTemplatesConfig:
-        return PathTemplatesConfig(
+        ).freeze(TemplateSettings)
+        self.path_templates = PathTemplatesConfig(
             self,
             "path_templates",
             {
@@ -535,11 +944,8 @@ class Job:
                 "soundtrack_template": "string",
                 "classical_template": "string",
             },
-        )
-
-    @property
-    def cli_output(self) -> CliOutputConfig:
-        return CliOutputConfig(
+        ).freeze(PathTemplatesSettings)
+        self.cli_output = CliOutputConfig(
             self,
             "cli_output",
             {
@@ -551,15 +957,193 @@ class Job:
                 "stats": "boolean",
                 "verbose": "boolean",
             },
-        )
-
-    @property
-    def metadata_actions(self) -> MetadataActionsConfig:
-        return MetadataActionsConfig(
+        ).freeze(CliOutputSettings)
+        self.metadata_actions = MetadataActionsConfig(
             self,
             "metadata_actions",
             {
                 "enrich_metadata": "boolean",
                 "remap_classical": "boolean",
+                "mb_cache": "string",
+                "mb_cache_ttl": "integer",
+                "mb_cache_size": "integer",
+                "mb_threads": "integer",
+                "mb_rate_limit": "integer",
+                "mb_url": "string",
+                "mb_backend": "string",
+                "mb_store": "string",
             },
-        )
+        ).freeze(MetadataActionsSettings)
+        self.performance = PerformanceConfig(
+            self,
+            "performance",
+            {
+                "jobs": "integer",
+                "index": "string",
+                "rebuild_index": "boolean",
+                "read_threads": "integer",
+                "render_threads": "integer",
+                "io_threads": "integer",
+            },
+        ).freeze(PerformanceSettings)
+
+        self.msg = Message(self)
+        self.__compiled_templates = {}
+        self.__template_fields = {}
+
+    def compiled_template(self, name: TemplateName) -> Template:
+        """Get one of the path templates (see :class:`PathTemplatesConfig`)
+        in its compiled form. Each template is parsed and compiled only once
+        per job. For each audio file only the values have to be bound.
+
+        :param name: The name of the path template.
+        """
+        if name not in self.__compiled_templates:
+            self.__compiled_templates[name] = Template(
+                getattr(self.path_templates, name)
+            )
+        return self.__compiled_templates[name]
+
+    def template_fields(self, name: TemplateName) -> typing.FrozenSet[str]:
+        """Get the names of the fields a path template refers to. Only these
+        fields have to be exported to render the template.
+
+        :param name: The name of the path template.
+        """
+        if name not in self.__template_fields:
+            self.__template_fields[name] = frozenset(
+                find_template_fields(self.compiled_template(name))
+            )
+        return self.__template_fields[name]
+
+    @property
+    def metadata_index(self) -> typing.Optional[MetadataIndex]:
+        """The persistent metadata index. It is opened on the first access
+        (see :meth:`open_metadata_index`)."""
+        return self.open_metadata_index()
+
+    def open_metadata_index(self) -> typing.Optional[MetadataIndex]:
+        """Open the persistent metadata index unless it is open already,
+        for example before threads are started. It is only opened if a path
+        is configured (``--index``)."""
+        if not self.__metadata_index:
+            path = self.performance.metadata_index
+            if path:
+                self.__metadata_index = MetadataIndex(
+                    path, rebuild=self.performance.rebuild_index
+                )
+        return self.__metadata_index
+
+    @property
+    def target_index(self) -> TargetIndex:
+        """The in-memory index of the target tree, see
+        :class:`audiorename.scan.TargetIndex`."""
+        if self.__target_index is None:
+            self.__target_index = TargetIndex()
+        return self.__target_index
+
+    @property
+    def io_executor(self) -> typing.Optional[Executor]:
+        """The executor of the file system operations of the actions
+        (``--io-threads``). ``None`` if the operations are executed
+        synchronously."""
+        if self.__io_executor is None and self.performance.io_threads > 0:
+            self.__io_executor = Executor(self.performance.io_threads)
+        return self.__io_executor
+
+    @property
+    def incremental_state(self) -> typing.Optional[IncrementalState]:
+        """The state of the incremental mode. It is opened on the first
+        access and only if one of the options ``--incremental``,
+        ``--reset-state`` or ``--show-state`` is used. Dry runs use separate
+        records."""
+        if not self.__incremental_state:
+            selection = self.selection
+            if selection.incremental or selection.reset_state or selection.show_state:
+                self.__incremental_state = IncrementalState(
+                    selection.state, dry_run=self.rename.dry_run
+                )
+        return self.__incremental_state
+
+    @property
+    def musicbrainz_cache(self) -> typing.Optional[ResponseCache]:
+        """The persistent cache of the MusicBrainz responses. It is opened
+        on the first access and only if a path is configured
+        (``--mb-cache``)."""
+        if not self.__musicbrainz_cache:
+            path = self.metadata_actions.mb_cache
+            if path:
+                self.__musicbrainz_cache = ResponseCache(
+                    path,
+                    ttl=self.metadata_actions.mb_cache_ttl * 86400,
+                    size=self.metadata_actions.mb_cache_size,
+                )
+        return self.__musicbrainz_cache
+
+    @property
+    def musicbrainz_client(self) -> typing.Optional[Client]:
+        """The concurrent client of the MusicBrainz API. It is created on
+        the first access and only if ``--mb-threads`` is greater than 0."""
+        if not self.__musicbrainz_client:
+            threads = self.metadata_actions.mb_threads
+            if threads:
+                # The worker processes of --jobs share the rate limit.
+                self.__musicbrainz_client = Client(
+                    self.metadata_actions.mb_url,
+                    rate=self.metadata_actions.mb_rate_limit / self.performance.jobs,
+                    threads=threads,
+                )
+        return self.__musicbrainz_client
+
+    @property
+    def musicbrainz_store(self) -> typing.Optional[OfflineStore]:
+        """The local store of the offline backend. It is opened on the
+        first access and only if the backend is ``offline``."""
+        if not self.__musicbrainz_store and self.metadata_actions.mb_backend == (
+            "offline"
+        ):
+            path = self.metadata_actions.mb_store
+            if not path:
+                raise Exception("The offline backend needs a store (--mb-store).")
+            self.__musicbrainz_store = OfflineStore(path)
+        return self.__musicbrainz_store
+
+    @property
+    def work_graph(self) -> WorkGraph:
+        """The graph of the works and their parent works. It is kept in the
+        database of the response cache (``--mb-cache``) across runs. With
+        the offline backend or without a response cache the graph lives in
+        memory for the duration of the job."""
+        if not self.__work_graph:
+            path = self.metadata_actions.mb_cache
+            if path and self.metadata_actions.mb_backend == "online":
+                self.__work_graph = WorkGraph(
+                    path, ttl=self.metadata_actions.mb_cache_ttl * 86400
+                )
+            else:
+                self.__work_graph = WorkGraph()
+        return self.__work_graph
+
+    def setup_musicbrainz(self) -> None:
+        """Configure the module :mod:`audiorename.musicbrainz` for the
+        lookups of the metadata actions. Only the first call per job has an
+        effect."""
+        if self.__musicbrainz_ready:
+            return
+        self.__musicbrainz_ready = True
+        musicbrainz.set_useragent()
+        musicbrainz.set_rate_limit(self.performance.jobs)
+        musicbrainz.set_store(self.musicbrainz_store)
+        musicbrainz.set_cache(self.musicbrainz_cache)
+        musicbrainz.set_client(self.musicbrainz_client)
+        musicbrainz.set_work_graph(self.work_graph)
+
+    def __read_config(
+        self, file_paths: typing.List[str]
+    ) -> typing.List[configparser.ConfigParser]:
+        configs: typing.List[configparser.ConfigParser] = []
+        for file_path in file_paths:
+            config = configparser.ConfigParser()
+            config.read(file_path)
+            configs.append(config)
+        return configs
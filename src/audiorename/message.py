@@ -1,15 +1,18 @@
 """Print messages on the command line."""
 
+import time
 import typing
 from collections import OrderedDict
 
-import ansicolor
 import phrydy
 import tmep
 
 import audiorename
 
 from .args import all_fields
+from .utils import LazyModule
+
+ansicolor = LazyModule("ansicolor")
 
 if typing.TYPE_CHECKING:
     from .audiofile import AudioFile
@@ -200,3 +203,24 @@ def stats(job: "Job") -> None:
     kv.add("Execution time", job.stats.timer.result())
     kv.add("Counter", job.stats.counter.result())
     print(kv.result())
+
+
+def incremental_state(job: "Job") -> None:
+    """List the files below the source recorded by the incremental mode."""
+    state = job.incremental_state
+    if not state:
+        return
+    entries = state.entries(job.selection.source)
+    for entry in entries:
+        print(
+            "{}  {}  {}".format(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.processed)),
+                entry.size,
+                entry.path,
+            )
+        )
+    kv = KeyValue(job.cli_output.color)
+    kv.add("State", state.path)
+    kv.add("Mode", "dry run" if state.dry_run else "real run")
+    kv.add("Files", str(len(entries)))
+    print(kv.result())
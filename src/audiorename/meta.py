@@ -1,15 +1,30 @@
 """Extend the class ``MediaFile`` of the package ``phrydy``."""
 
 import re
-from typing import Any, Dict, List, Optional, Tuple
-
-from phrydy import MediaFileExtended
-from tmep import Functions
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from phrydy import MediaFileExtended, mediafile
+from tmep import Functions, Template
+from tmep.template import Call, Expression, Symbol
 
 import audiorename.musicbrainz as musicbrainz
 
+from .derived import DerivedFields, PerformerRaw
+
 Diff = List[Tuple[str, Optional[str], Optional[str]]]
-PerformerRaw = List[List[str]]
 
 
 def compare_dicts(first: Dict[str, str], second: Dict[str, str]) -> Diff:
@@ -41,7 +56,11 @@ def compare_dicts(first: Dict[str, str], second: Dict[str, str]) -> Diff:
     return diff
 
 
-class Meta(MediaFileExtended):
+class Meta(DerivedFields, MediaFileExtended):
+    # MediaFileExtended narrows these fields of MediaFile.
+    albumartist_sort: str
+    composer_sort: str
+
     def __init__(self, path: str, shell_friendly: bool = False):
         super(Meta, self).__init__(path, False)
         self.shell_friendly = shell_friendly
@@ -57,17 +76,32 @@ class Meta(MediaFileExtended):
         :param sanitize: Set the parameter to true to trigger the sanitize
           function.
         """
-        out: Dict[str, str] = {}
+        out: Dict[str, Any] = {}
         for field in self.fields_sorted():
             value = getattr(self, field)
             if value:
-                if sanitize:
-                    out[field] = self._sanitize(str(value))
-                else:
-                    out[field] = value
+                out[field] = value
 
+        if sanitize:
+            return self.sanitize_dict(out)
         return out
 
+    def export_lazy(
+        self, fields: Optional[Iterable[str]] = None, sanitize: bool = True
+    ) -> "LazyFields":
+        """
+        Export the fields into a mapping that computes the values on demand.
+        The mapping contains the same keys and values as :meth:`export_dict`.
+
+        :param fields: Restrict the mapping to these fields. By default all
+          fields are accessible.
+        :param sanitize: Set the parameter to true to trigger the sanitize
+          function.
+        """
+        if fields is None:
+            fields = self.fields()
+        return LazyFields(lambda field: getattr(self, field), fields, sanitize)
+
     def enrich_metadata(self) -> None:
         musicbrainz.set_useragent()
 
@@ -124,45 +158,6 @@ class Meta(MediaFileExtended):
                 self.work_hierarchy = " -> ".join(wh_titles)
                 self.mb_workhierarchy_ids = "/".join(wh_ids)
 
-    def remap_classical(self) -> None:
-        """Remap some fields to fit better for classical music:
-        ``composer`` becomes ``artist``, ``work`` becomes ``album``, from the
-        ``title`` the work prefix is removed (``Symphonie No. 9: I. Allegro``
-        -> ``I. Allegro``) and ``track`` becomes the movement number. All
-        overwritten fields are safed in the ``comments`` field. No combined
-        properties (like ``ar_combined_composer``) are used and therefore some
-        code duplications are done on purpose to avoid circular endless loops.
-        """
-        safe: List[List[str]] = []
-
-        if self.title:
-            safe.append(["title", self.title])
-            self.title = re.sub(r"^[^:]*: ?", "", self.title)
-
-            roman = re.findall(r"^([IVXLCDM]*)\.", self.title)
-            if roman:
-                safe.append(["track", str(self.track)])
-                self.track = self._roman_to_int(roman[0])
-
-        if self.composer:
-            safe.append(["artist", self.artist])
-            self.artist = self.composer
-
-        if self.ar_combined_work_top:
-            safe.append(["album", self.album])
-            self.ar_performer_short
-            album = self.ar_combined_work_top
-            if self.ar_performer_short:
-                album += " (" + self.ar_performer_short + ")"
-            self.album = album
-
-        if safe:
-            comments = "Original metadata: "
-            for safed in safe:
-                comments = comments + str(safed[0]) + ": " + str(safed[1]) + "; "
-
-            self.comments = comments
-
     ###############################################################################
     # Class methods
     ###############################################################################
@@ -174,14 +169,8 @@ class Meta(MediaFileExtended):
 
     @classmethod
     def fields_audiorename(cls):
-        for prop, _ in sorted(cls.__dict__.items()):
-            if isinstance(getattr(cls, prop), property):
-                if isinstance(prop, bytes):
-                    # On Python 2, class field names are bytes. This method
-                    # produces text strings.
-                    yield prop.decode("utf8", "ignore")
-                else:
-                    yield prop
+        for field in DerivedFields.field_names():
+            yield field
 
     @classmethod
     def fields(cls):
@@ -199,72 +188,6 @@ class Meta(MediaFileExtended):
     # Static methods
     ###############################################################################
 
-    @staticmethod
-    def _find_initials(value: str) -> str:
-        """
-        Find the first character of a string.
-
-        :param str value: A string to extract the initials.
-
-        :return: A single character in lowercase. The possible return values
-            are lowercase letters from the ASCII alphabet (``a-z``), the digit
-            ``0`` and the underscore character (``_``).
-        """
-        # To avoid ae -> a
-        value = Functions.fn_asciify(value)
-        # To avoid “!K7-Compilations” -> “!”
-        value = re.sub(r"^\W*", "", value)
-        initial = value[0:1].lower()
-
-        if re.match(r"\d", initial):
-            return "0"
-
-        if initial == "":
-            return "_"
-
-        return initial
-
-    @staticmethod
-    def _normalize_performer(ar_performer: List[str]) -> PerformerRaw:
-        """
-        :param ar_performer: A list of raw ar_performer strings like
-
-        .. code-block:: python
-
-            ['John Lennon (vocals)', 'Ringo Starr (drums)']
-
-        :return: A list
-
-        .. code-block:: python
-
-            [
-                ['vocals', 'John Lennon'],
-                ['drums', 'Ringo Starr'],
-            ]
-        """
-        out: PerformerRaw = []
-        for value in ar_performer:
-            value = value[:-1]
-            performers: List[str] = value.split(" (")
-            if len(performers) == 2:
-                out.append([performers[1], performers[0]])
-        return out
-
-    @staticmethod
-    def _roman_to_int(n: str) -> int:
-        numeral_map = tuple(
-            zip(
-                (1000, 900, 500, 400, 100, 90, 50, 40, 10, 9, 5, 4, 1),
-                ("M", "CM", "D", "CD", "C", "XC", "L", "XL", "X", "IX", "V", "IV", "I"),
-            )
-        )
-        i = result = 0
-        for integer, numeral in numeral_map:
-            while n[i : i + len(numeral)] == numeral:
-                result += integer
-                i += len(numeral)
-        return result
-
     @staticmethod
     def _sanitize(value: Any) -> str:
         if isinstance(value, str) or isinstance(value, bytes):
@@ -275,272 +198,21 @@ class Meta(MediaFileExtended):
         return value
 
     @staticmethod
-    def _shorten_performer(
-        ar_performer: str,
-        length: int = 3,
-        separator: str = " ",
-        abbreviation: str = ".",
-    ) -> str:
-        out = ""
-        count = 0
-        for s in ar_performer.split(" "):
-            if count < 3:
-                if len(s) > length:
-                    part = s[:length] + abbreviation
-                else:
-                    part = s
-                out = out + separator + part
-            count = count + 1
-
-        return out[len(separator) :]
+    def sanitize_dict(fields: Dict[str, Any]) -> Dict[str, str]:
+        """Sanitize all values of a dictionary exported by :meth:`export_dict`
+        with ``sanitize=False``.
 
-    @staticmethod
-    def _uniquify_list(sequence: List[Any]) -> List[Any]:
-        """https://www.peterbe.com/plog/uniqifiers-benchmark"""
-        unique: List[Any] = []
-
-        for element in sequence:
-            if not unique.count(element):
-                unique.append(element)
-
-        return unique
+        :param fields: The unsanitized fields.
+        """
+        out: Dict[str, str] = {}
+        for field, value in fields.items():
+            out[field] = Meta._sanitize(str(value))
+        return out
 
     ###############################################################################
     # Properties
     ###############################################################################
 
-    @property
-    def ar_classical_album(self) -> Optional[str]:
-        """Uses:
-
-        * ``phrydy.mediafile.MediaFile.work``
-
-        Examples:
-
-        * ``Horn Concerto: I. Allegro`` → ``Horn Concerto``
-        * ``Die Meistersinger von Nürnberg``
-        """
-        if self.work:
-            return re.sub(r":.*$", "", (str(self.work)))
-        return None
-
-    @property
-    def ar_combined_album(self) -> Optional[str]:
-        """Uses:
-
-        * ``phrydy.mediafile.MediaFile.album``
-
-        Example:
-
-        * ``Just Friends (Disc 2)`` → ``Just Friends``
-        """
-        if self.album:
-            return re.sub(r" ?\([dD]is[ck].*\)$", "", str(self.album))
-        return None
-
-    @property
-    def ar_initial_album(self) -> Optional[str]:
-        """Uses:
-
-        * :class:`audiorename.meta.Meta.ar_combined_album`
-
-        Examples:
-
-        * ``Just Friends`` → ``j``
-        * ``Die Meistersinger von Nürnberg``  → ``d``
-        """
-        if self.ar_combined_album:
-            return self._find_initials(self.ar_combined_album)
-        return None
-
-    @property
-    def ar_initial_artist(self) -> str:
-        """Uses:
-
-        * :class:`audiorename.meta.Meta.ar_combined_artist_sort`
-
-        Examples:
-
-        * ``Just Friends`` → ``j``
-        * ``Die Meistersinger von Nürnberg``  → ``d``
-        """
-        return self._find_initials(self.ar_combined_artist_sort)
-
-    @staticmethod
-    def __remove_feat_vs_second_artist(artist: str) -> str:
-        """Give only the first artist, remove the second after ``feat.``,
-        ``ft.`` or ``vs.``"""
-        return re.sub(r"\s+(feat|ft|vs)\.?\s.*", "", artist, flags=re.IGNORECASE)
-
-    @property
-    def ar_combined_artist(self) -> str:
-        """Uses:
-
-        * ``phrydy.mediafile.MediaFile.albumartist``
-        * ``phrydy.mediafile.MediaFile.artist``
-        * ``phrydy.mediafile.MediaFile.albumartist_credit``
-        * ``phrydy.mediafile.MediaFile.artist_credit``
-        * ``phrydy.mediafile.MediaFile.albumartist_sort``
-        * ``phrydy.mediafile.MediaFile.artist_sort``
-
-        Removes the second artist after ``feat.``, ``ft.`` or ``vs.``.
-        """
-        out: str
-        if self.albumartist:
-            out = self.albumartist
-        elif self.artist:
-            out = self.artist
-        elif self.albumartist_credit:
-            out = self.albumartist_credit
-        elif self.artist_credit:
-            out = self.artist_credit
-        # Same as aristsafe_sort
-        elif self.albumartist_sort:
-            out = self.albumartist_sort
-        elif self.artist_sort:
-            out = self.artist_sort
-        else:
-            out = "Unknown"
-
-        return Meta.__remove_feat_vs_second_artist(out)
-
-    @property
-    def ar_combined_artist_sort(self) -> str:
-        """Uses:
-
-        * ``phrydy.mediafile.MediaFile.albumartist_sort``
-        * ``phrydy.mediafile.MediaFile.artist_sort``
-        * ``phrydy.mediafile.MediaFile.albumartist``
-        * ``phrydy.mediafile.MediaFile.artist``
-        * ``phrydy.mediafile.MediaFile.albumartist_credit``
-        * ``phrydy.mediafile.MediaFile.artist_credit``
-
-        Removes the second artist after ``feat.``, ``ft.`` or ``vs.``.
-        """
-        out: str
-        if self.albumartist_sort:
-            out = self.albumartist_sort
-        elif self.artist_sort:
-            out = self.artist_sort
-        # Same as ar_combined_artist
-        elif self.albumartist:
-            out = self.albumartist
-        elif self.artist:
-            out = self.artist
-        elif self.albumartist_credit:
-            out = self.albumartist_credit
-        elif self.artist_credit:
-            out = self.artist_credit
-        else:
-            out = "Unknown"
-
-        out = Meta.__remove_feat_vs_second_artist(out)
-
-        if self.shell_friendly:
-            out = out.replace(", ", "_")
-
-        return out
-
-    @property
-    def ar_initial_composer(self) -> str:
-        """Uses:
-
-        * :class:`audiorename.meta.Meta.ar_combined_composer`
-        """
-        return self._find_initials(self.ar_combined_composer)
-
-    @property
-    def ar_combined_composer(self) -> str:
-        """Uses:
-
-        * ``phrydy.mediafile.MediaFile.composer_sort``
-        * ``phrydy.mediafile.MediaFile.composer``
-        * :class:`audiorename.meta.Meta.ar_combined_artist`
-        """
-        out: str = ""
-        if self.composer_sort:
-            out = self.composer_sort
-        elif self.composer:
-            out = self.composer
-        else:
-            out = self.ar_combined_artist
-
-        if self.shell_friendly:
-            out = out.replace(", ", "_")
-
-        # e. g. 'Mozart, Wolfgang Amadeus/Süßmeyer, Franz Xaver'
-        return re.sub(r" ?/.*", "", out)
-
-    @property
-    def ar_combined_disctrack(self) -> Optional[str]:
-        """
-        Generate a combination of track and disc number, e. g.: ``1-04``,
-        ``3-06``.
-
-        Uses:
-
-        * ``phrydy.mediafile.MediaFile.disctotal``
-        * ``phrydy.mediafile.MediaFile.disc``
-        * ``phrydy.mediafile.MediaFile.tracktotal``
-        * ``phrydy.mediafile.MediaFile.track``
-        """
-
-        if not self.track:
-            return None
-
-        if self.disctotal and int(self.disctotal) > 99:
-            disk = str(self.disc).zfill(3)
-        elif self.disctotal and int(self.disctotal) > 9:
-            disk = str(self.disc).zfill(2)
-        else:
-            disk = str(self.disc)
-
-        if self.tracktotal and int(self.tracktotal) > 99:
-            track = str(self.track).zfill(3)
-        else:
-            track = str(self.track).zfill(2)
-
-        if self.disc and self.disctotal and int(self.disctotal) > 1:
-            out = disk + "-" + track
-        elif self.disc and not self.disctotal:
-            out = disk + "-" + track
-        else:
-            out = track
-
-        return out
-
-    @property
-    def ar_performer(self) -> str:
-        """Uses:
-
-        * :class:`audiorename.meta.Meta.ar_performer_raw`
-        """
-        out: str = ""
-        for ar_performer in self.ar_performer_raw:
-            out = out + ", " + ar_performer[1]
-
-        out = out[2:]
-
-        return out
-
-    @property
-    def ar_classical_performer(self) -> str:
-        """http://musicbrainz.org/doc/Style/Classical/Release/Artist
-
-        Uses:
-
-        * :class:`audiorename.meta.Meta.ar_performer_short`
-        * ``phrydy.mediafile.MediaFile.albumartist``
-        """
-        if len(self.ar_performer_short) > 0:
-            out = self.ar_performer_short
-        elif self.albumartist:
-            out = re.sub(r"^.*; ?", "", self.albumartist)
-        else:
-            out = ""
-
-        return out
-
     @property
     def ar_performer_raw(self) -> PerformerRaw:
         """Generate a unifed ar_performer list.
@@ -587,110 +259,216 @@ class Meta(MediaFileExtended):
 
         return self._uniquify_list(out)
 
-    @property
-    def ar_performer_short(self):
-        """Uses:
 
-        * ``phrydy.mediafile.MediaFile.ar_performer_raw``
-        """
-        out: List[str] = []
-
-        performers = self.ar_performer_raw
-        picked: PerformerRaw = []
-        for performer in performers:
-            if performer[0] == "conductor" or performer[0] == "orchestra":
-                picked.append(performer)
-
-        if len(picked) > 0:
-            performers = picked
-
-        for performer in performers:
-            if (
-                performer[0] == "producer"
-                or performer[0] == "executive producer"
-                or performer[0] == "balance engineer"
-            ):
-                pass
-            elif (
-                performer[0] == "orchestra"
-                or performer[0] == "choir vocals"
-                or performer[0] == "string quartet"
-            ):
-                out.append(
-                    self._shorten_performer(performer[1], separator="", abbreviation="")
-                )
-            else:
-                out.append(performer[1].split(" ")[-1])
+class LazyFields(Mapping[str, Any]):
+    """A read-only mapping of fields whose values are computed on the first
+    access. Like :meth:`Meta.export_dict` the mapping only contains fields
+    with a truthy value. Expensive fields (for example
+    ``ar_performer_raw``) are never computed unless they are accessed.
 
-        return ", ".join(out)
+    :param get: A function that returns the raw value of a field, for example
+      ``lambda field: getattr(meta, field)``.
+    :param fields: The names of the accessible fields.
+    :param sanitize: Sanitize the values like :meth:`Meta.export_dict`.
+    """
 
-    @property
-    def ar_combined_soundtrack(self) -> bool:
-        if self.releasegroup_types and "soundtrack" in self.releasegroup_types.lower():
-            return True
+    __get: Callable[[str], Any]
 
-        if self.albumtype and "soundtrack" in self.albumtype.lower():
-            return True
+    __fields: FrozenSet[str]
 
-        if self.albumtypes:
-            for type in self.albumtypes:
-                if "soundtrack" in type.lower():
-                    return True
+    __sanitize: bool
 
-        return False
+    __cache: Dict[str, Any]
 
-    @property
-    def ar_classical_title(self) -> Optional[str]:
-        """Uses:
+    __missing = object()
 
-        * ``phrydy.mediafile.MediaFile.title``
+    def __init__(
+        self, get: Callable[[str], Any], fields: Iterable[str], sanitize: bool = False
+    ) -> None:
+        self.__get = get
+        self.__fields = frozenset(fields)
+        self.__sanitize = sanitize
+        self.__cache = {}
 
-        Example:
+    def __getitem__(self, field: str) -> Any:
+        if field in self.__cache:
+            value = self.__cache[field]
+        elif field not in self.__fields:
+            raise KeyError(field)
+        else:
+            value = self.__get(field)
+            if not value:
+                value = self.__missing
+            elif self.__sanitize:
+                value = Meta._sanitize(str(value))
+            self.__cache[field] = value
+        if value is self.__missing:
+            raise KeyError(field)
+        return value
 
-        * ``Horn Concerto: I. Allegro``
-        """
-        if self.title:
-            return re.sub(r"^[^:]*: ?", "", self.title)
-        return None
+    def __iter__(self) -> Iterator[str]:
+        for field in sorted(self.__fields):
+            if field in self:
+                yield field
 
-    @property
-    def ar_classical_track(self) -> Optional[str]:
-        """Uses:
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
 
-        * :class:`audiorename.meta.Meta.ar_classical_title`
-        * :class:`audiorename.meta.Meta.ar_combined_disctrack`
-        """
-        roman = None
-        if self.ar_classical_title:
-            roman = re.findall(r"^([IVXLCDM]*)\.", self.ar_classical_title)
-        if roman:
-            return str(self._roman_to_int(roman[0])).zfill(2)
-        elif self.ar_combined_disctrack:
-            return self.ar_combined_disctrack
-        return None
+    def __bool__(self) -> bool:
+        # A truth value test (tmep’s functions start with ``if not
+        # self.values``) must not compute all fields. An exported audio file
+        # always has some truthy fields (for example ``ar_combined_artist``).
+        return True
 
-    @property
-    def ar_combined_work_top(self) -> Optional[str]:
-        """Uses:
 
-        * ``phrydy.mediafile.MediaFile.work_hierarchy``
-        * ``phrydy.mediafile.MediaFile.work``
+TagType = Literal["int", "float", "bool", "list"]
 
-        """
-        if self.work_hierarchy:
-            return self.work_hierarchy.split(" -> ")[0]
-        elif self.ar_classical_album:
-            return self.ar_classical_album
+known_tag_types: Optional[Dict[str, TagType]] = None
+
+known_fields: Optional[FrozenSet[str]] = None
+
+
+def tag_types() -> Dict[str, TagType]:
+    """The types of the raw fields that are no strings, looked up in the
+    field descriptors of :class:`phrydy.MediaFileExtended`."""
+    global known_tag_types
+    if known_tag_types is None:
+        types: Dict[str, TagType] = {}
+        for field in MediaFileExtended.readable_fields():
+            descriptor = None
+            for cls in MediaFileExtended.__mro__:
+                if field in cls.__dict__:
+                    descriptor = cls.__dict__[field]
+                    break
+            if isinstance(descriptor, mediafile.ListMediaField):
+                types[field] = "list"
+            elif isinstance(descriptor, mediafile.DateItemField):
+                types[field] = "int"
+            else:
+                out_type = getattr(descriptor, "out_type", None)
+                if out_type is int:
+                    types[field] = "int"
+                elif out_type is float:
+                    types[field] = "float"
+                elif out_type is bool:
+                    types[field] = "bool"
+        known_tag_types = types
+    return known_tag_types
+
+
+def all_fields() -> FrozenSet[str]:
+    """The names of all raw and derived fields, see :meth:`Meta.fields`."""
+    global known_fields
+    if known_fields is None:
+        known_fields = frozenset(Meta.fields())
+    return known_fields
+
+
+def coerce_tag(field: str, value: Any) -> Any:
+    """Convert the text of a tag (for example a cell of a CSV file) into the
+    type of the field: ``"4"`` becomes ``4`` for ``track``, ``"1"`` becomes
+    ``True`` for ``comp`` and ``"a; b"`` becomes ``["a", "b"]`` for
+    ``albumtypes``. Other values are returned unchanged.
+
+    :return: ``None`` for empty or invalid values.
+    """
+    if not isinstance(value, str):
+        return value
+    tag_type = tag_types().get(field)
+    if not tag_type:
+        return value
+    value = value.strip()
+    if not value:
         return None
+    try:
+        if tag_type == "int":
+            return int(value)
+        elif tag_type == "float":
+            return float(value)
+        elif tag_type == "bool":
+            return value.lower() in ("1", "true", "yes", "on")
+    except ValueError:
+        return None
+    return [part.strip() for part in value.split(";") if part.strip()]
+
+
+class TagFields(DerivedFields):
+    """The raw and the derived fields of a plain mapping of tags, for example
+    a row of a tag dump. No audio file is opened.
+
+    The raw tags are accessed as attributes like on :class:`Meta`. Missing
+    tags are ``None``. Values can be assigned, for example by
+    :meth:`remap_classical`, without changing the mapping.
+
+    The performers are taken from the key ``ar_performer_raw`` (a list of
+    roles and names) or from the keys ``performer`` (names like ``John
+    Lennon (vocals)``, a list or separated by semicolons) and
+    ``conductor``.
+
+    :param tags: The raw tags keyed by the field names of phrydy. Texts are
+      converted with :func:`coerce_tag`.
+    :param shell_friendly: Like :class:`Meta`.
+    """
+
+    tags: Mapping[str, Any]
+
+    def __init__(self, tags: Mapping[str, Any], shell_friendly: bool = False) -> None:
+        self.tags = tags
+        self.shell_friendly = shell_friendly
+
+    def __getattr__(self, field: str) -> Any:
+        # Only called for fields that are neither assigned nor cached.
+        if field.startswith("__") or field == "tags":
+            raise AttributeError(field)
+        value = coerce_tag(field, self.tags.get(field))
+        self.__dict__[field] = value
+        return value
 
     @property
-    def ar_combined_year(self):
-        """Uses:
+    def ar_performer_raw(self) -> PerformerRaw:
+        performers = self.tags.get("ar_performer_raw")
+        if isinstance(performers, list):
+            return self._uniquify_list([list(p) for p in performers])
+        performers = self.tags.get("performer")
+        if isinstance(performers, str):
+            performers = [p.strip() for p in performers.split(";") if p.strip()]
+        out: PerformerRaw = []
+        if performers:
+            out = self._normalize_performer(performers)
+            conductor = self.tags.get("conductor")
+            if conductor:
+                out.insert(0, ["conductor", conductor])
+        return self._uniquify_list(out)
 
-        * ``phrydy.mediafile.MediaFile.original_year``
-        * ``phrydy.mediafile.MediaFile.year``
-        """
-        if self.original_year:
-            return self.original_year
-        elif self.year:
-            return self.year
+    def export_lazy(
+        self, fields: Optional[Iterable[str]] = None, sanitize: bool = True
+    ) -> LazyFields:
+        """Export the fields like :meth:`Meta.export_lazy`."""
+        if fields is None:
+            fields = all_fields()
+        return LazyFields(lambda field: getattr(self, field), fields, sanitize)
+
+
+def find_template_fields(template: Template) -> Set[str]:
+    """Find all fields a path template refers to: the symbols (for example
+    ``$title``) and the field names used as function arguments (for example
+    ``%ifdefnotempty{ar_combined_year,...}``).
+
+    :param template: A compiled path template.
+    """
+    known = set(Meta.fields())
+    fields: Set[str] = set()
+
+    def walk(expression: Expression) -> None:
+        for part in expression.parts:
+            if isinstance(part, Symbol):
+                fields.add(part.ident)
+            elif isinstance(part, Call):
+                for argument in part.args:
+                    literal = "".join(p for p in argument.parts if isinstance(p, str))
+                    if literal.strip() in known:
+                        fields.add(literal.strip())
+                    walk(argument)
+
+    walk(template.expr)
+    return fields
@@ -1,8 +1,3 @@
-import typing
-from typing import List, Literal, TypedDict, cast
-
-import musicbrainzngs as musicbrainz
-
 """Query the musicbrainz API using the library
 `musicbrainzngs <https://pypi.org/project/musicbrainzngs>`_.
 
@@ -156,6 +151,25 @@ classical/Mozart_Horn-concertos/01.mp3
 
 """
 
+import collections
+import concurrent.futures
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+import urllib.parse
+from typing import List, Literal, TypedDict, cast
+
+from .utils import LazyModule
+
+# musicbrainzngs and its HTTP stack are only imported when the MusicBrainz
+# API is actually used.
+musicbrainz = LazyModule("musicbrainzngs")
+
+
 WorkChild = TypedDict(
     "Work",
     {
@@ -288,6 +302,639 @@ Work = TypedDict(
 """
 
 
+EntityType = typing.Literal["recording", "work", "release"]
+
+Entity = typing.Dict[str, typing.Any]
+
+
+class ResponseCache:
+    """A persistent cache of the responses of the MusicBrainz API. The
+    entities are stored in a SQLite database keyed by the entity type, the
+    MBID and the includes.
+
+    :param path: The path of the SQLite database file. The file is created
+      if it doesn’t exist.
+    :param ttl: The time to live of an entry in seconds. Expired entries are
+      fetched again.
+    :param size: The maximum number of entries. The oldest entries are
+      evicted first.
+    """
+
+    path: str
+
+    ttl: float
+
+    size: int
+
+    __connection: sqlite3.Connection
+
+    __lock: threading.Lock
+
+    __puts: int
+
+    def __init__(self, path: str, ttl: float = 30 * 86400, size: int = 100000) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.size = size
+        self.__puts = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "entity TEXT NOT NULL, "
+            "mb_id TEXT NOT NULL, "
+            "includes TEXT NOT NULL, "
+            "fetched REAL NOT NULL, "
+            "response TEXT NOT NULL, "
+            "PRIMARY KEY (entity, mb_id, includes))"
+        )
+        self.__connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_fetched ON responses (fetched)"
+        )
+        self.__connection.commit()
+        self.evict()
+
+    @staticmethod
+    def __includes(includes: typing.Iterable[str]) -> str:
+        return "+".join(sorted(includes))
+
+    def get(
+        self, entity: EntityType, mb_id: str, includes: typing.Iterable[str] = ()
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Get a cached entity.
+
+        :return: The entity or ``None`` if it is not cached or has expired.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT response FROM responses "
+                "WHERE entity = ? AND mb_id = ? AND includes = ? AND fetched >= ?",
+                (entity, mb_id, self.__includes(includes), time.time() - self.ttl),
+            ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0])
+
+    def put(
+        self,
+        entity: EntityType,
+        mb_id: str,
+        includes: typing.Iterable[str],
+        response: typing.Dict[str, typing.Any],
+    ) -> None:
+        """Store an entity in the cache."""
+        serialized = json.dumps(response)
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (entity, mb_id, self.__includes(includes), time.time(), serialized),
+            )
+            self.__connection.commit()
+            self.__puts += 1
+            puts = self.__puts
+        if puts % 1000 == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove the expired entries and the oldest entries exceeding the
+        maximum number of entries.
+
+        :return: The number of removed entries.
+        """
+        with self.__lock:
+            removed = self.__connection.execute(
+                "DELETE FROM responses WHERE fetched < ?", (time.time() - self.ttl,)
+            ).rowcount
+            removed += self.__connection.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses "
+                "ORDER BY fetched DESC LIMIT -1 OFFSET ?)",
+                (self.size,),
+            ).rowcount
+            self.__connection.commit()
+        return removed
+
+    def count(self) -> int:
+        """The number of cached entities."""
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        self.__connection.close()
+
+
+cache: typing.Optional[ResponseCache] = None
+"""The response cache used by :func:`query`, see :func:`set_cache`."""
+
+
+class Memo:
+    """An in-process memo with single-flight coalescing: Concurrent calls
+    with the same key wait for the first call instead of fetching the same
+    value again. The memoized values must not be modified.
+
+    :param size: The maximum number of memoized values. The least recently
+      used value is dropped first.
+    """
+
+    size: int
+
+    __lock: threading.Lock
+
+    __values: "collections.OrderedDict[typing.Hashable, typing.Any]"
+
+    __pending: typing.Dict[typing.Hashable, threading.Event]
+
+    def __init__(self, size: int = 4096) -> None:
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__values = collections.OrderedDict()
+        self.__pending = {}
+
+    def get(
+        self,
+        key: typing.Hashable,
+        fetch: typing.Callable[[], typing.Any],
+        keep: typing.Callable[[typing.Any], bool] = lambda value: True,
+    ) -> typing.Any:
+        """Get the memoized value of a key or fetch it.
+
+        :param key: The key, for example the entity type and the MBID.
+        :param fetch: The function to fetch the value. It is called only
+          once per key, unless it raises an exception or the value is not
+          kept.
+        :param keep: Decides whether a fetched value is memoized, for
+          example to fetch again after an error.
+        """
+        while True:
+            with self.__lock:
+                if key in self.__values:
+                    self.__values.move_to_end(key)
+                    return self.__values[key]
+                event = self.__pending.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self.__pending[key] = event
+                    break
+            # Another thread is fetching the value. If it fails, try again.
+            event.wait()
+        try:
+            value = fetch()
+            if keep(value):
+                with self.__lock:
+                    self.__values[key] = value
+                    if len(self.__values) > self.size:
+                        self.__values.popitem(last=False)
+            return value
+        finally:
+            with self.__lock:
+                del self.__pending[key]
+            event.set()
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__values.clear()
+
+
+memo = Memo()
+"""The memo of :func:`query` and :func:`query_works_recursively`. It is
+cleared at the beginning of each run and each batch of the watch mode (see
+:func:`clear_memo`)."""
+
+
+def clear_memo() -> None:
+    memo.clear()
+
+
+def set_cache(response_cache: typing.Optional[ResponseCache]) -> None:
+    """Set the persistent response cache used by :func:`query`. ``None``
+    disables the cache."""
+    global cache
+    cache = response_cache
+
+
+class TokenBucket:
+    """A thread-safe token bucket to respect the rate limit of the
+    MusicBrainz API (one request per second on average).
+
+    :param rate: The number of tokens added per second.
+    :param burst: The maximum number of tokens in the bucket.
+    """
+
+    rate: float
+
+    burst: int
+
+    __tokens: float
+
+    __updated: float
+
+    __lock: threading.Lock
+
+    def __init__(self, rate: float = 1.0, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.__tokens = float(self.burst)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token. Block until a token is available."""
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(
+                    float(self.burst),
+                    self.__tokens + (now - self.__updated) * self.rate,
+                )
+                self.__updated = now
+                if self.__tokens >= 1.0:
+                    self.__tokens -= 1.0
+                    return
+                wait = (1.0 - self.__tokens) / self.rate
+            time.sleep(wait)
+
+
+class Client:
+    """A client of the MusicBrainz web service that sends requests
+    concurrently. ``musicbrainzngs`` serializes all requests, so this client
+    sends its own requests and only uses the XML parser of
+    ``musicbrainzngs``. The results have the same structure.
+
+    MusicBrainz offers no batched lookups of multiple entities with
+    relationships (the search and browse endpoints don’t return the work
+    relations), so each entity is requested on its own. The requests are
+    scheduled by a :class:`TokenBucket`.
+
+    :param url: The base URL of the MusicBrainz server.
+    :param rate: The maximum number of requests per second.
+    :param threads: The number of concurrent requests.
+    :param retries: How often a request is repeated if the server is
+      overloaded (HTTP status 503).
+    """
+
+    url: str
+
+    bucket: TokenBucket
+
+    retries: int
+
+    __executor: concurrent.futures.ThreadPoolExecutor
+
+    def __init__(
+        self,
+        url: str = "https://musicbrainz.org",
+        rate: float = 1.0,
+        threads: int = 4,
+        retries: int = 3,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.__executor = concurrent.futures.ThreadPoolExecutor(
+            max(threads, 1), thread_name_prefix="musicbrainz"
+        )
+
+    def fetch(
+        self, entity: EntityType, mb_id: str, includes: typing.Iterable[str] = ()
+    ) -> typing.Dict[str, typing.Any]:
+        """Request an entity like ``musicbrainzngs.get_<entity>_by_id``.
+
+        :raises musicbrainzngs.ResponseError: If the server responds with an
+          error.
+        :raises musicbrainzngs.NetworkError: If the server is unreachable.
+        """
+        import urllib.error
+        import urllib.request
+
+        url = "{}/ws/2/{}/{}".format(self.url, entity, urllib.parse.quote(mb_id))
+        includes = list(includes)
+        if includes:
+            url += "?" + urllib.parse.urlencode({"inc": " ".join(includes)})
+        request = urllib.request.Request(
+            url, headers={"User-Agent": musicbrainz.musicbrainz._useragent}
+        )
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    return musicbrainz.mbxml.parse_message(io.BytesIO(response.read()))
+            except urllib.error.HTTPError as error:
+                if error.code == 503 and attempt < self.retries:
+                    attempt += 1
+                    continue
+                raise musicbrainz.ResponseError(cause=error)
+            except urllib.error.URLError as error:
+                raise musicbrainz.NetworkError(cause=error)
+
+    def prefetch(
+        self,
+        recording_id: typing.Optional[str] = None,
+        release_id: typing.Optional[str] = None,
+        work_id: typing.Optional[str] = None,
+    ) -> None:
+        """Query the entities in the background, for example while the tags
+        of the next audio files are parsed. The results end up in the
+        in-process memo (see :class:`Memo`)."""
+        if recording_id:
+            self.__executor.submit(_quiet, _lookup, "recording", recording_id)
+        if release_id:
+            self.__executor.submit(_quiet, _lookup, "release", release_id)
+        if work_id:
+            self.__executor.submit(_quiet, _lookup_works, work_id, True)
+
+    def close(self) -> None:
+        self.__executor.shutdown(cancel_futures=True)
+
+
+def _quiet(function: typing.Callable[..., typing.Any], *args: typing.Any) -> None:
+    # Errors are reported by the queries of the metadata actions.
+    try:
+        function(*args)
+    except Exception:
+        pass
+
+
+class _NotFound:
+    code = 404
+
+
+class OfflineStore:
+    """A local store of MusicBrainz entities for hosts without internet
+    access. It answers the lookups like ``musicbrainzngs`` from a SQLite
+    database indexed by the entity type and the MBID. The database is
+    memory-mapped, so a lookup takes microseconds.
+
+    The entities have the structure of the results of ``musicbrainzngs``
+    and contain all relations, for example
+    ``{"recording": {"id": "…", "work-relation-list": […]}}``. A store can
+    be filled by :meth:`add` or :meth:`import_json`.
+
+    :param path: The path of the SQLite database file. A path ending with
+      ``.json`` or ``.jsonl`` is imported into an in-memory database (see
+      :meth:`import_json`).
+    :param writable: Open the database for :meth:`add`.
+    """
+
+    path: str
+
+    __connection: sqlite3.Connection
+
+    __lock: threading.Lock
+
+    def __init__(self, path: str, writable: bool = False) -> None:
+        self.path = path
+        self.__lock = threading.Lock()
+        is_json = path.endswith(".json") or path.endswith(".jsonl")
+        if is_json:
+            database = ":memory:"
+        elif writable:
+            database = path
+        else:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            database = "file:{}?mode=ro".format(urllib.parse.quote(path))
+        self.__connection = sqlite3.connect(
+            database, uri=not writable and not is_json, check_same_thread=False
+        )
+        self.__connection.execute("PRAGMA mmap_size=1073741824")
+        if writable or is_json:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                "entity TEXT NOT NULL, "
+                "mb_id TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (entity, mb_id)) WITHOUT ROWID"
+            )
+        if is_json:
+            self.import_json(path)
+
+    def add(self, entity: EntityType, data: Entity) -> None:
+        """Add an entity. The entity is identified by its ``id``. Call
+        :meth:`commit` to save the added entities."""
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO entities VALUES (?, ?, ?)",
+                (entity, data["id"], json.dumps(data)),
+            )
+
+    def import_json(self, path: str) -> int:
+        """Import the entities of a JSON file. The file contains either a
+        list of documents or one document per line (JSON Lines). A
+        document has one key, the entity type, for example
+        ``{"work": {"id": "…", "title": "…"}}``.
+
+        :return: The number of imported entities.
+        """
+        with open(path, encoding="utf-8") as json_file:
+            content = json_file.read()
+        if content.lstrip().startswith("["):
+            documents = json.loads(content)
+        else:
+            documents = [json.loads(line) for line in content.splitlines() if line]
+        count = 0
+        for document in documents:
+            for entity, data in document.items():
+                self.add(entity, data)
+                count += 1
+        with self.__lock:
+            self.__connection.commit()
+        return count
+
+    def commit(self) -> None:
+        with self.__lock:
+            self.__connection.commit()
+
+    def fetch(
+        self, entity: EntityType, mb_id: str, includes: typing.Iterable[str] = ()
+    ) -> Entity:
+        """Look up an entity like ``musicbrainzngs.get_<entity>_by_id``. The
+        includes are ignored, the stored entities contain all relations.
+
+        :raises musicbrainzngs.ResponseError: If the entity is not in the
+          store. The cause has the HTTP status code 404.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT data FROM entities WHERE entity = ? AND mb_id = ?",
+                (entity, mb_id),
+            ).fetchone()
+        if not row:
+            raise musicbrainz.ResponseError(cause=_NotFound())
+        return {entity: json.loads(row[0])}
+
+    def get_recording_by_id(
+        self, mb_id: str, includes: typing.Iterable[str] = ()
+    ) -> Entity:
+        return self.fetch("recording", mb_id, includes)
+
+    def get_release_by_id(
+        self, mb_id: str, includes: typing.Iterable[str] = ()
+    ) -> Entity:
+        return self.fetch("release", mb_id, includes)
+
+    def get_work_by_id(self, mb_id: str, includes: typing.Iterable[str] = ()) -> Entity:
+        return self.fetch("work", mb_id, includes)
+
+    def count(self) -> int:
+        """The number of stored entities."""
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM entities"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        self.__connection.close()
+
+
+store: typing.Optional[OfflineStore] = None
+"""The offline store used by :func:`query` instead of the MusicBrainz
+API, see :func:`set_store`."""
+
+
+def set_store(offline_store: typing.Optional[OfflineStore]) -> None:
+    """Answer all queries from a local store. ``None`` switches back to the
+    MusicBrainz API."""
+    global store
+    store = offline_store
+
+
+class WorkGraph:
+    """A graph of the works and their parent works (“parts” relations).
+    Each work and the link to its parent are stored only once. Resolving a
+    movement whose ancestors are already known needs no further lookups.
+
+    :param path: The path of a SQLite database file to keep the graph
+      across runs. The graph is loaded into memory when it is opened.
+      Without a path the graph lives in memory only.
+    :param ttl: The time to live of a stored work in seconds.
+    """
+
+    path: typing.Optional[str]
+
+    ttl: float
+
+    __nodes: typing.Dict[str, typing.Tuple[typing.Optional[str], Work]]
+    """The parent ID and the entity of each known work."""
+
+    __connection: typing.Optional[sqlite3.Connection]
+
+    __lock: threading.Lock
+
+    def __init__(
+        self, path: typing.Optional[str] = None, ttl: float = 30 * 86400
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.__nodes = {}
+        self.__lock = threading.Lock()
+        self.__connection = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.__connection = sqlite3.connect(
+                path, timeout=60, check_same_thread=False
+            )
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS work_graph ("
+                "mb_id TEXT PRIMARY KEY, "
+                "parent_id TEXT, "
+                "fetched REAL NOT NULL, "
+                "work TEXT NOT NULL)"
+            )
+            self.__connection.execute(
+                "DELETE FROM work_graph WHERE fetched < ?", (time.time() - ttl,)
+            )
+            self.__connection.commit()
+            for mb_id, parent_id, work in self.__connection.execute(
+                "SELECT mb_id, parent_id, work FROM work_graph"
+            ):
+                self.__nodes[mb_id] = (parent_id, json.loads(work))
+
+    def add(self, work: Work) -> typing.Optional[str]:
+        """Add a work to the graph.
+
+        :return: The ID of the parent work.
+        """
+        parent_id = _find_parent(work)
+        with self.__lock:
+            self.__nodes[work["id"]] = (parent_id, work)
+            if self.__connection:
+                self.__connection.execute(
+                    "INSERT OR REPLACE INTO work_graph VALUES (?, ?, ?, ?)",
+                    (work["id"], parent_id, time.time(), json.dumps(work)),
+                )
+                self.__connection.commit()
+        return parent_id
+
+    def resolve(self, work_id: str, quiet: bool = False) -> typing.Tuple[Work, ...]:
+        """Resolve a work and all its ancestors. Unknown works are queried
+        (see :func:`query`) and added to the graph.
+
+        :param quiet: Don’t print the error message of a failed lookup.
+
+        :return: The work first, followed by its parent, grandparent etc.
+        """
+        works: List[Work] = []
+        seen: typing.Set[str] = set()
+        next_id: typing.Optional[str] = work_id
+        while next_id and next_id not in seen:
+            seen.add(next_id)
+            with self.__lock:
+                node = self.__nodes.get(next_id)
+            if node:
+                next_id, work = node
+            else:
+                result = _lookup("work", next_id)
+                if isinstance(result, str):
+                    if not quiet:
+                        print(result)
+                    break
+                work = cast(Work, result)
+                next_id = self.add(work)
+            works.append(work)
+        return tuple(works)
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__nodes)
+
+    def close(self) -> None:
+        if self.__connection:
+            self.__connection.close()
+
+
+work_graph = WorkGraph()
+"""The work graph used by :func:`query_works_recursively`, see
+:func:`set_work_graph`."""
+
+
+def set_work_graph(graph: WorkGraph) -> None:
+    global work_graph
+    work_graph = graph
+
+
+client: typing.Optional[Client] = None
+"""The client used by :func:`query`, see :func:`set_client`. Without a
+client the requests are sent by ``musicbrainzngs`` one after another."""
+
+
+def set_client(musicbrainz_client: typing.Optional[Client]) -> None:
+    global client
+    client = musicbrainz_client
+
+
 def set_useragent() -> None:
     musicbrainz.set_useragent(
         "audiorename",
@@ -296,9 +943,41 @@ def set_useragent() -> None:
     )
 
 
+def set_rate_limit(processes: int) -> None:
+    """Share the rate limit of ``musicbrainzngs`` (one request per second)
+    between the worker processes of ``--jobs``.
+
+    :param processes: The number of processes sending requests.
+    """
+    musicbrainz.set_rate_limit(float(max(processes, 1)), 1)
+
+
 def query(
-    mb_type: typing.Literal["recording", "work", "release"], mb_id: str
+    mb_type: EntityType, mb_id: str
 ) -> typing.Union[typing.Dict[str, typing.Any], None]:
+    """Query an entity. Each entity is queried only once per run, even if
+    it is requested by multiple threads at the same time. The result must
+    not be modified."""
+    result = _lookup(mb_type, mb_id)
+    if isinstance(result, str):
+        print(result)
+        return None
+    return result
+
+
+def _lookup(mb_type: EntityType, mb_id: str) -> typing.Union[Entity, str]:
+    """Look up an entity in the memo or query it.
+
+    :return: The entity or an error message. Error messages are not
+      memoized."""
+    return memo.get(
+        (mb_type, mb_id),
+        lambda: _query(mb_type, mb_id),
+        keep=lambda result: not isinstance(result, str),
+    )
+
+
+def _query(mb_type: EntityType, mb_id: str) -> typing.Union[Entity, str]:
     method = "get_" + mb_type + "_by_id"
     query = getattr(musicbrainz, method)
 
@@ -312,29 +991,53 @@ def query(
     if mb_type == "work":
         mb_includes.append("artist-rels")
 
+    if cache and not store:
+        cached = cache.get(mb_type, mb_id, mb_includes)
+        if cached is not None:
+            return cached
+
     try:
-        result = query(mb_id, includes=mb_includes)
+        if store:
+            return store.fetch(mb_type, mb_id, mb_includes)[mb_type]
+        if client:
+            result = client.fetch(mb_type, mb_id, mb_includes)
+        else:
+            result = query(mb_id, includes=mb_includes)
+        if cache:
+            cache.put(mb_type, mb_id, mb_includes, result[mb_type])
         return result[mb_type]
 
     except musicbrainz.ResponseError as err:
-        if err.cause and err.cause.code == 404:
-            print(
+        if err.cause and getattr(err.cause, "code", None) == 404:
+            return (
                 "Item of type “" + mb_type + "” with the ID “" + mb_id + "” not found."
             )
         else:
-            print("Received bad response from the MusicBrainz server.")
-    return None
+            return "Received bad response from the MusicBrainz server."
+
+
+def query_works_recursively(
+    work_id: str, works: typing.Optional[List[Work]] = None
+) -> List[Work]:
+    """Query a work and all its parent works (“parts” relations).
 
+    :param work_id: The MBID of the work.
+    :param works: A list to append the works to.
+
+    :return: The work first, followed by its parent, grandparent etc.
+    """
+    if works is None:
+        works = []
+    works.extend(_lookup_works(work_id))
+    return works
 
-def query_works_recursively(work_id: str, works: List[Work] = []) -> List[Work]:
-    work = cast(Work, query("work", work_id))
 
-    if not work:
-        return works
+def _lookup_works(work_id: str, quiet: bool = False) -> typing.Tuple[Work, ...]:
+    return work_graph.resolve(work_id, quiet)
 
-    works.append(work)
 
-    parent_work = False
+def _find_parent(work: Work) -> typing.Optional[str]:
+    """Find the ID of the parent work (a backward “parts” relation)."""
     if "work-relation-list" in work:
         for relation in work["work-relation-list"]:
             if (
@@ -342,10 +1045,5 @@ def query_works_recursively(work_id: str, works: List[Work] = []) -> List[Work]:
                 and relation["direction"] == "backward"
                 and relation["type"] == "parts"
             ):
-                parent_work = relation
-                break
-
-    if parent_work:
-        query_works_recursively(parent_work["work"]["id"], works)
-
-    return works
+                return relation["work"]["id"]
+    return None
@@ -0,0 +1,223 @@
+"""A streaming pipeline of stages connected by bounded queues.
+
+Each stage runs in its own threads, so slow reads (for example from a
+network file system) overlap with the rendering of other files. The items
+leave the pipeline in the order they entered it. The number of items in
+flight is limited, so the memory consumption doesn’t depend on the number
+of files.
+
+Everything a stage prints is captured per item and returned together with
+the result, so the output of the different threads doesn’t interleave.
+"""
+
+import contextlib
+import io
+import queue
+import sys
+import threading
+import typing
+
+
+class Stage:
+    """
+    :param name: The name of the stage, used for the names of the threads.
+    :param function: The function applied to each item.
+    :param threads: The number of threads of the stage.
+    """
+
+    name: str
+
+    function: typing.Callable[[typing.Any], typing.Any]
+
+    threads: int
+
+    def __init__(
+        self,
+        name: str,
+        function: typing.Callable[[typing.Any], typing.Any],
+        threads: int = 1,
+    ) -> None:
+        self.name = name
+        self.function = function
+        self.threads = max(threads, 1)
+
+
+class Result:
+    """An item leaving the pipeline."""
+
+    value: typing.Any
+    """The return value of the last stage."""
+
+    output: str
+    """The text printed by all stages while processing the item."""
+
+    def __init__(self, value: typing.Any, output: str) -> None:
+        self.value = value
+        self.output = output
+
+
+class _Item:
+    __slots__ = ("number", "value", "output", "error")
+
+    def __init__(self, number: int, value: typing.Any) -> None:
+        self.number = number
+        self.value = value
+        self.output: typing.List[str] = []
+        self.error: typing.Optional[BaseException] = None
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """Redirect the standard output of the current thread into a buffer.
+    Threads without a buffer write into the original standard output."""
+
+    def __init__(self, stream: typing.TextIO) -> None:
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        if getattr(self.local, "buffer", None) is None:
+            self.stream.flush()
+
+    @contextlib.contextmanager
+    def capture(self) -> typing.Iterator[io.StringIO]:
+        self.local.buffer = io.StringIO()
+        try:
+            yield self.local.buffer
+        finally:
+            self.local.buffer = None
+
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    :param stages: The stages each item passes in this order.
+    :param capacity: The maximum number of items in flight.
+    """
+
+    stages: typing.List[Stage]
+
+    capacity: int
+
+    def __init__(self, stages: typing.Sequence[Stage], capacity: int = 64) -> None:
+        self.stages = list(stages)
+        self.capacity = max(capacity, 1)
+
+    def run(self, items: typing.Iterable[typing.Any]) -> typing.Iterator[Result]:
+        """Feed the items into the pipeline and yield the results in the
+        original order. An exception raised by a stage is raised again when
+        the result of the item would have been yielded."""
+        stop = threading.Event()
+        slots = threading.Semaphore(self.capacity)
+        queues: typing.List["queue.Queue[typing.Any]"] = [
+            queue.Queue(self.capacity) for _ in range(len(self.stages) + 1)
+        ]
+        stdout = _ThreadLocalStdout(sys.stdout)
+
+        def put(target: "queue.Queue[typing.Any]", item: typing.Any) -> bool:
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def feed() -> None:
+            number = 0
+            try:
+                for value in items:
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    if not put(queues[0], _Item(number, value)):
+                        return
+                    number += 1
+            except BaseException as error:
+                failed = _Item(number, None)
+                failed.error = error
+                put(queues[0], failed)
+            finally:
+                put(queues[0], _DONE)
+
+        def work(
+            index: int, stage: Stage, lock: threading.Lock, finished: typing.List[int]
+        ) -> None:
+            source = queues[index]
+            target = queues[index + 1]
+            while not stop.is_set():
+                try:
+                    item = source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    # Let the other threads of this stage see the end, too.
+                    put(source, _DONE)
+                    with lock:
+                        finished.append(1)
+                        last = len(finished) == stage.threads
+                    if last:
+                        put(target, _DONE)
+                    return
+                if item.error is None:
+                    with stdout.capture() as buffer:
+                        try:
+                            item.value = stage.function(item.value)
+                        except BaseException as error:
+                            item.error = error
+                    item.output.append(buffer.getvalue())
+                if not put(target, item):
+                    return
+
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            lock = threading.Lock()
+            finished: typing.List[int] = []
+            for number in range(stage.threads):
+                threads.append(
+                    threading.Thread(
+                        target=work,
+                        args=(index, stage, lock, finished),
+                        name="pipeline-{}-{}".format(stage.name, number),
+                        daemon=True,
+                    )
+                )
+
+        original = sys.stdout
+        sys.stdout = stdout
+        try:
+            for thread in threads:
+                thread.start()
+            waiting: typing.Dict[int, _Item] = {}
+            expected = 0
+            output = queues[-1]
+            done = False
+            while not done or waiting:
+                if expected in waiting:
+                    item = waiting.pop(expected)
+                    expected += 1
+                    slots.release()
+                    if item.error is not None:
+                        raise item.error
+                    # The consumer prints into the original standard output.
+                    yield Result(item.value, "".join(item.output))
+                    continue
+                if done:
+                    break
+                received = output.get()
+                if received is _DONE:
+                    done = True
+                else:
+                    waiting[received.number] = received
+        finally:
+            stop.set()
+            sys.stdout = original
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,284 @@
+"""Plan the renaming of all source files before the file system is touched
+(``--plan``).
+
+Without a plan each source file is renamed right after its target has been
+rendered. Two source files with the same target are only detected when the
+second one is renamed. With a plan, the targets of all source files are
+rendered first and grouped. Source files whose targets differ only in the
+extension belong to the same group, because :func:`find_target_path`
+treats them as the same target. The conflicts inside a group are resolved
+in memory with :func:`detect_best_format`, so only the winner is moved or
+copied and the losers are cleaned up directly. The resulting actions are
+executed sorted by target, directory by directory.
+
+Instead of being performed, the operations can be written into a JSON Lines
+file (``--plan-out``) and applied later (``--apply-plan``), for example on
+another machine. Applying a plan reads no tags.
+"""
+
+import contextlib
+import io
+import json
+import os
+import typing
+
+from .audiofile import (
+    Action,
+    AudioFile,
+    DestinationType,
+    detect_best_format,
+    find_target_path,
+)
+from .job import CleaningAction, Job
+
+OperationAction = typing.Literal["move", "copy", "exists", "renamed"]
+
+
+class Operation(typing.NamedTuple):
+    """A resolved operation of the plan. It is one line of a plan file
+    (``--plan-out``)."""
+
+    source: str
+    """The absolute path of the source file."""
+
+    target: str
+    """The absolute path of the desired target."""
+
+    action: OperationAction
+    """``move`` or ``copy`` the source to the target, the target ``exists``
+    already or the source is already ``renamed``."""
+
+    cleanup: typing.Optional[str]
+    """The path of the file to clean up: The source file if it lost against
+    the target or an existing target replaced by the source file."""
+
+    cleaning_action: typing.Optional[CleaningAction]
+    """``backup`` or ``delete`` the file to clean up."""
+
+    best_format: typing.Optional[DestinationType]
+    """The result of the format comparison of the source file: ``source`` or
+    ``target``. ``None`` if no comparison was necessary."""
+
+
+class PlannedFile(typing.NamedTuple):
+    source: str
+    """The absolute path of the source file."""
+
+    target: str
+    """The absolute path of the desired target."""
+
+
+class Plan:
+    """
+    :param job: The `job` object.
+    """
+
+    job: Job
+
+    groups: typing.Dict[str, typing.List[PlannedFile]]
+    """The planned files grouped by the path of the desired target without
+    the extension. The files of a group keep the order of the source."""
+
+    def __init__(self, job: Job) -> None:
+        self.job = job
+        self.groups = {}
+
+    def add(self, source: typing.Union[str, AudioFile], target: str) -> None:
+        """Add a source file and the path of its desired target (see
+        :func:`find_desired_target`)."""
+        if isinstance(source, AudioFile):
+            source = source.abspath
+        planned = PlannedFile(os.path.abspath(source), os.path.abspath(target))
+        self.groups.setdefault(os.path.splitext(planned.target)[0], []).append(planned)
+
+    def __open(
+        self, path: str, file_type: typing.Literal["source", "target"]
+    ) -> AudioFile:
+        prefix = os.getcwd() if file_type == "source" else self.job.selection.target
+        return AudioFile(path, job=self.job, prefix=prefix, file_type=file_type)
+
+    def resolve(self) -> typing.Iterator[typing.Tuple[Operation, str]]:
+        """Resolve the conflicts of the plan group by group, sorted by
+        target. Inside a group the losers come before the winner, so they
+        are cleaned up before the winner is moved or copied to the target.
+        Tags are only read to compare the formats of conflicting files.
+
+        :return: The operations together with the messages of the format
+          comparisons.
+        """
+        job = self.job
+        cleaning_action: typing.Optional[CleaningAction] = None
+        if job.rename.cleaning_action in ("backup", "delete"):
+            cleaning_action = job.rename.cleaning_action
+        for key in sorted(self.groups):
+            group = self.groups[key]
+            sources = [self.__open(planned.source, "source") for planned in group]
+
+            # The current holder of the target: Either a source file that
+            # already has the desired target path, an existing target file
+            # or the best source file so far.
+            holder: typing.Optional[int] = None
+            for i, planned in enumerate(group):
+                if planned.source == planned.target:
+                    holder = i
+                    break
+            existing: typing.Optional[AudioFile] = None
+            if holder is None:
+                path = find_target_path(
+                    group[0].target, job.filters.extension, job.target_index
+                )
+                if path:
+                    existing = self.__open(path, "target")
+
+            # Resolve the conflicts in memory. The messages of the format
+            # comparisons are printed together with the other messages of
+            # the compared source file.
+            notes: typing.Dict[int, str] = {}
+            bests: typing.Dict[int, DestinationType] = {}
+            losers: typing.List[int] = []
+            replace_existing = False
+            for i, source in enumerate(sources):
+                if i == holder:
+                    continue
+                target = sources[holder] if holder is not None else existing
+                if not target:
+                    holder = i
+                    continue
+                best: DestinationType = "target"
+                if job.rename.cleaning_action and job.rename.best_format:
+                    if not source.meta:
+                        raise Exception("source.meta must not be empty.")
+                    if not target.meta:
+                        raise Exception("target.meta must not be empty.")
+                    output = io.StringIO()
+                    with contextlib.redirect_stdout(output):
+                        best = detect_best_format(source.meta, target.meta, job)
+                    notes[i] = output.getvalue()
+                    bests[i] = best
+                if best == "source":
+                    if holder is None:
+                        replace_existing = True
+                    else:
+                        losers.append(holder)
+                    holder = i
+                else:
+                    losers.append(i)
+
+            for i in sorted(losers):
+                yield (
+                    Operation(
+                        group[i].source,
+                        group[i].target,
+                        "exists",
+                        group[i].source if cleaning_action else None,
+                        cleaning_action,
+                        bests.get(i),
+                    ),
+                    notes.get(i, ""),
+                )
+
+            if holder is not None:
+                planned = group[holder]
+                cleanup: typing.Optional[str] = None
+                if existing and replace_existing and cleaning_action:
+                    cleanup = existing.abspath
+                action: OperationAction
+                if planned.source == planned.target:
+                    action = "renamed"
+                elif job.rename.move_action == "copy":
+                    action = "copy"
+                else:
+                    action = "move"
+                yield (
+                    Operation(
+                        planned.source,
+                        planned.target,
+                        action,
+                        cleanup,
+                        cleaning_action if cleanup else None,
+                        bests.get(holder),
+                    ),
+                    notes.get(holder, ""),
+                )
+        self.groups = {}
+
+    def perform(self, operation: Operation, note: str = "") -> None:
+        """Perform a single operation. Only the paths are needed, no tags
+        are read.
+
+        :param operation: The operation to perform.
+        :param note: The messages of the format comparison.
+        """
+        job = self.job
+        action = Action(job)
+        source = self.__open(operation.source, "source")
+        job.msg.next_file(source)
+        print(note, end="")
+
+        if operation.cleanup:
+            cleanup = self.__open(
+                operation.cleanup,
+                "source" if operation.cleanup == operation.source else "target",
+            )
+            if operation.cleaning_action == "backup":
+                action.backup(cleanup)
+            elif operation.cleaning_action == "delete":
+                action.delete(cleanup)
+
+        if operation.action == "exists":
+            job.msg.status("Exists", status="error")
+        elif operation.action == "renamed":
+            job.msg.status("Renamed", status="ok")
+            job.stats.counter.count("renamed")
+        else:
+            target = self.__open(operation.target, "target")
+            if operation.action == "copy":
+                action.copy(source, target)
+            else:
+                action.move(source, target)
+
+    def execute(self) -> typing.Iterator[str]:
+        """Resolve and perform the plan.
+
+        :return: The paths of the processed source files.
+        """
+        for operation, note in self.resolve():
+            self.perform(operation, note)
+            yield operation.source
+
+    def write(self, path: str) -> int:
+        """Resolve the plan and write the operations into a JSON Lines file
+        instead of performing them.
+
+        :param path: The path of the plan file.
+
+        :return: The number of written operations.
+        """
+        count = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, "w", encoding="utf-8") as plan_file:
+            for operation, _ in self.resolve():
+                plan_file.write(
+                    json.dumps(operation._asdict(), ensure_ascii=False) + "\n"
+                )
+                count += 1
+        return count
+
+    def apply(self, path: str) -> typing.Iterator[str]:
+        """Perform the operations of a plan file written by :meth:`write`.
+        The file is read line by line, so the memory consumption doesn’t
+        depend on the size of the plan.
+
+        :param path: The path of the plan file.
+
+        :return: The paths of the processed source files.
+        """
+        with open(path, encoding="utf-8") as plan_file:
+            for line in plan_file:
+                if not line.strip():
+                    continue
+                operation = Operation(**json.loads(line))
+                self.perform(operation)
+                yield operation.source
@@ -0,0 +1,164 @@
+"""Scan a source directory for audio files and index the target tree.
+
+The scanner is built on :func:`os.scandir`. The type of a directory entry
+is usually known without an additional ``stat`` system call, so only the
+names of the entries have to be compared with the extensions.
+"""
+
+import os
+import typing
+
+
+def normalize_extensions(extensions: typing.Iterable[str]) -> typing.Tuple[str, ...]:
+    """Convert extensions like ``mp3`` into a tuple of lower case, dotted
+    extensions like ``.mp3`` for :meth:`str.endswith`."""
+    return tuple(sorted({"." + e.lower().lstrip(".") for e in extensions}))
+
+
+def scan(
+    source: str,
+    extensions: typing.Tuple[str, ...],
+    ignore: typing.Iterable[str] = (),
+) -> typing.Iterator[str]:
+    """Yield the paths of all files below a directory whose names end with
+    one of the extensions.
+
+    The order is the same as in a top-down :func:`os.walk` with sorted
+    directory and file names: First the files of a directory, then the
+    subdirectories one after another. Hidden directories (names starting
+    with a dot) and the ignored directories are not entered. Symbolic links
+    to directories are not followed.
+
+    :param source: The directory to scan.
+    :param extensions: Lower case, dotted extensions (see
+      :func:`normalize_extensions`).
+    :param ignore: The paths of directories to skip, for example the backup
+      folder.
+    """
+    ignored = {os.path.abspath(path) for path in ignore}
+    stack: typing.List[str] = [source]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirectories: typing.List[str] = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if (
+                    not entry.name.startswith(".")
+                    and not entry.is_symlink()
+                    and os.path.abspath(entry.path) not in ignored
+                ):
+                    subdirectories.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                yield entry.path
+        # The stack is processed from the end.
+        stack.extend(reversed(subdirectories))
+
+
+class TargetIndex:
+    """An in-memory index of the file names in the target tree. It replaces
+    the ``os.path.exists`` calls per file and extension to find an already
+    existing target.
+
+    Each directory is listed only once, with a single :func:`os.scandir`
+    call, the first time a target in it is looked up. Directories that are
+    never looked up are not listed, so a large target tree costs nothing
+    beyond the directories the files are actually renamed into. The actions
+    that create or remove files keep the index up to date with
+    :meth:`add` and :meth:`remove`.
+
+    The index also knows which directories exist, so :meth:`makedirs` only
+    has to create a directory once per run.
+    """
+
+    listings: int
+    """The number of listed directories."""
+
+    __directories: typing.Dict[str, typing.Set[str]]
+
+    __existing: typing.Set[str]
+    """The directories known to exist."""
+
+    def __init__(self) -> None:
+        self.__directories = {}
+        self.__existing = set()
+        self.listings = 0
+
+    def __list(self, directory: str) -> typing.Set[str]:
+        names = self.__directories.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as iterator:
+                    names = {entry.name for entry in iterator}
+                self.__existing.add(directory)
+            except OSError:
+                names = set()
+            self.listings += 1
+            self.__directories[directory] = names
+        return names
+
+    def exists(self, path: str) -> bool:
+        directory, name = os.path.split(path)
+        return name in self.__list(directory)
+
+    def find(self, path: str, extensions: typing.Iterable[str]) -> typing.Optional[str]:
+        """Get the path of an existing file that differs from the given path
+        only in the extension.
+
+        :param path: The path of the desired target.
+        :param extensions: The extensions (without a dot) to try in this
+          order.
+        """
+        directory, stem = os.path.split(os.path.splitext(path)[0])
+        names = self.__list(directory)
+        for extension in extensions:
+            name = stem + "." + extension
+            if name in names:
+                return os.path.join(directory, name)
+        return None
+
+    def add(self, path: str) -> None:
+        """Record a created file. Directories that have not been listed yet
+        are left alone, they are listed on the first lookup."""
+        directory, name = os.path.split(path)
+        names = self.__directories.get(directory)
+        if names is not None:
+            names.add(name)
+
+    def remove(self, path: str) -> None:
+        """Record a removed file."""
+        directory, name = os.path.split(path)
+        names = self.__directories.get(directory)
+        if names is not None:
+            names.discard(name)
+
+    def makedirs(self, directory: str) -> None:
+        """Create a directory and its parents unless the directory is known
+        to exist.
+
+        :param directory: An absolute path.
+        """
+        if directory in self.__existing:
+            return
+        os.makedirs(directory, exist_ok=True)
+        while directory not in self.__existing:
+            self.__existing.add(directory)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+
+    def clear(self) -> None:
+        """Forget all listings, for example before a new run over a target
+        tree that may have been changed by others."""
+        self.__directories = {}
+        self.__existing = set()
@@ -0,0 +1,253 @@
+"""Answer where audio files would be renamed to (``--serve``).
+
+Other programs, for example an ingestion service, ask a long-running
+server instead of starting the command line interface per track. A single
+:class:`~audiorename.job.Job` answers all requests, so the compiled
+templates, the metadata index and the MusicBrainz caches stay warm.
+
+The server speaks HTTP on a loopback TCP address (``HOST:PORT``) or on a Unix
+socket (``unix:PATH`` or a path containing a directory separator). The body
+of a ``POST`` request is a JSON object or a list of JSON objects (a batch).
+Each object names either the ``path`` of an audio file or the ``tags`` of an
+audio file together with its ``extension``:
+
+.. code-block:: json
+
+    [
+        {"path": "/music/inbox/01.mp3"},
+        {"tags": {"artist": "a-ha", "title": "Hunting High and Low"},
+         "extension": "flac"}
+    ]
+
+The answer has the same shape. Each object contains the ``target`` and
+the name of the chosen ``template`` (``default``, ``compilation``,
+``soundtrack`` or ``classical``), or an ``error``.
+
+The files are neither renamed nor modified. The metadata actions
+(``--enrich-metadata``, ``--remap-classical``) are applied in memory only.
+"""
+
+import contextlib
+import http.server
+import io
+import ipaddress
+import json
+import os
+import socketserver
+import stat
+import typing
+
+from .audiofile import (
+    AudioFile,
+    is_classical,
+    render_tags,
+    render_target,
+    select_template,
+)
+from .job import Job
+
+Answer = typing.Dict[str, typing.Any]
+
+
+class TargetResolver:
+    """
+    :param job: The `job` object. The same job answers all requests.
+    """
+
+    job: Job
+
+    def __init__(self, job: Job) -> None:
+        self.job = job
+
+    def fields_of_file(
+        self, path: str
+    ) -> typing.Optional[typing.Mapping[str, typing.Any]]:
+        """Read the fields of an audio file and apply the metadata actions
+        in memory.
+
+        :return: ``None`` if the audio file is broken.
+        """
+        job = self.job
+        source = AudioFile(
+            os.path.abspath(path), job=job, prefix=os.getcwd(), file_type="source"
+        )
+        # Keep the messages and tracebacks out of the answers.
+        with contextlib.redirect_stdout(io.StringIO()):
+            fields = source.fields
+            if fields is None:
+                return None
+            enrich = job.metadata_actions.enrich_metadata
+            remap = job.metadata_actions.remap_classical or is_classical(fields, job)
+            if enrich or remap:
+                meta = source.meta
+                if not meta:
+                    return None
+                if enrich:
+                    job.setup_musicbrainz()
+                    meta.enrich_metadata()
+                if remap:
+                    meta.remap_classical()
+                fields = meta.export_lazy(sanitize=False)
+        return fields
+
+    def resolve(self, request: typing.Any) -> Answer:
+        """Answer a single request.
+
+        :param request: A dictionary with either the key ``path`` or the keys
+          ``tags`` and ``extension`` (optional).
+        """
+        if not isinstance(request, dict):
+            return {"error": "The request must be a JSON object."}
+        extension: typing.Optional[str] = None
+        fields: typing.Optional[typing.Mapping[str, typing.Any]]
+        try:
+            if isinstance(request.get("path"), str):
+                path = request["path"]
+                if not os.path.isfile(path):
+                    return {"error": "No such file: " + path}
+                fields = self.fields_of_file(path)
+                if fields is None:
+                    return {"error": "Broken file: " + path}
+                extension = path.split(".")[-1].lower()
+                template = select_template(fields, self.job)
+                target = render_target(fields, self.job, template, extension)
+            elif isinstance(request.get("tags"), dict):
+                if isinstance(request.get("extension"), str):
+                    extension = request["extension"].lstrip(".")
+                template, target = render_tags(request["tags"], self.job, extension)
+            else:
+                return {"error": "The request needs a “path” or “tags”."}
+        except Exception as error:
+            return {"error": "{}: {}".format(type(error).__name__, error)}
+        return {"target": target, "template": template}
+
+    def resolve_batch(
+        self, requests: typing.Any
+    ) -> typing.Union[Answer, typing.List[Answer]]:
+        """Answer a single request or a list of requests."""
+        if isinstance(requests, list):
+            return [self.resolve(request) for request in requests]
+        return self.resolve(requests)
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    server: "typing.Union[TcpServer, UnixServer]"
+
+    def send_json(self, status: int, data: typing.Any) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            requests = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self.send_json(400, {"error": "The body is not valid JSON."})
+            return
+        self.send_json(200, self.server.resolver.resolve_batch(requests))
+
+    def address_string(self) -> str:
+        # The client address of a Unix socket is an empty string.
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+class TcpServer(http.server.HTTPServer):
+    resolver: TargetResolver
+
+
+class UnixServer(socketserver.UnixStreamServer):
+    resolver: TargetResolver
+
+
+def is_loopback(host: str) -> bool:
+    """Check if a host only accepts connections from the local machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def find_socket_path(address: str) -> typing.Optional[str]:
+    """The path of the Unix socket if the address is ``unix:PATH`` or a path
+    containing a directory separator (for example ``./audiorename.sock``).
+
+    :return: ``None`` if the address is not a Unix socket.
+    """
+    if address.startswith("unix:"):
+        return address[5:]
+    if os.sep in address:
+        return address
+    return None
+
+
+def remove_socket(path: str) -> None:
+    """Remove a stale Unix socket. Any other file is left untouched."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise Exception("The path of the Unix socket is not a socket: " + path)
+    os.remove(path)
+
+
+def create_server(
+    address: str, resolver: TargetResolver
+) -> "typing.Union[TcpServer, UnixServer]":
+    """Bind a server to an address.
+
+    :param address: ``HOST:PORT``, ``unix:PATH`` or the path of a Unix socket
+      containing a directory separator. Port 0 binds to a free port. The
+      server has no authentication, so only loopback hosts are accepted.
+    :param resolver: Answers the requests.
+    """
+    server: typing.Union[TcpServer, UnixServer]
+    path = find_socket_path(address)
+    if path is not None:
+        remove_socket(path)
+        server = UnixServer(path, RequestHandler)
+    else:
+        host, _, port = address.rpartition(":")
+        if not port.isdigit():
+            raise Exception(
+                "Invalid address (HOST:PORT, unix:PATH or a path): " + address
+            )
+        host = host or "127.0.0.1"
+        if not is_loopback(host):
+            raise Exception(
+                "The server only binds to loopback hosts "
+                "(for example 127.0.0.1 or localhost): " + address
+            )
+        server = TcpServer((host, int(port)), RequestHandler)
+    server.resolver = resolver
+    return server
+
+
+def serve(job: Job) -> None:
+    """Answer requests until the process is interrupted."""
+    address = job.selection.serve
+    if not address:
+        raise Exception("The server needs an address (--serve).")
+    server = create_server(address, TargetResolver(job))
+    if isinstance(server, TcpServer):
+        host, port = server.server_address[:2]
+        address = "{}:{}".format(str(host), port)
+    job.msg.output("Serving on " + address)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        path = find_socket_path(address)
+        if path is not None:
+            remove_socket(path)
@@ -0,0 +1,156 @@
+"""The state of the incremental mode (``--incremental``).
+
+The state is a SQLite database. It records the source files processed by
+previous runs together with their size, modification time and inode.
+Unchanged files are skipped before their tags are parsed. Dry runs and
+real runs keep separate records.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+
+class Entry(typing.NamedTuple):
+    """A recorded source file."""
+
+    path: str
+    size: int
+    mtime: int
+    """The modification time in nanoseconds."""
+    inode: int
+    processed: float
+    """The time of the processing as a Unix timestamp."""
+
+
+class IncrementalState:
+    """
+    :param path: The path of the SQLite database file. The file is created
+      if it doesn’t exist.
+    :param dry_run: Use the records of the dry runs.
+    """
+
+    path: str
+
+    dry_run: bool
+
+    __connection: sqlite3.Connection
+
+    __lock: threading.Lock
+
+    __uncommitted: int
+
+    def __init__(self, path: str, dry_run: bool = False) -> None:
+        self.path = path
+        self.dry_run = dry_run
+        self.__uncommitted = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            "dry_run INTEGER NOT NULL, "
+            "path TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "mtime INTEGER NOT NULL, "
+            "inode INTEGER NOT NULL, "
+            "processed REAL NOT NULL, "
+            "PRIMARY KEY (dry_run, path))"
+        )
+        self.__connection.commit()
+
+    def __prefix_condition(self, prefix: str) -> typing.Tuple[str, typing.Tuple]:
+        prefix = os.path.abspath(prefix)
+        return (
+            "dry_run = ? AND (path = ? OR substr(path, 1, ?) = ?)",
+            (int(self.dry_run), prefix, len(prefix) + 1, os.path.join(prefix, "")),
+        )
+
+    def is_unchanged(self, path: str) -> bool:
+        """Check if a source file has been processed before and is
+        unchanged since then.
+
+        :param path: The absolute path of the source file.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT size, mtime, inode FROM processed "
+                "WHERE dry_run = ? AND path = ?",
+                (int(self.dry_run), path),
+            ).fetchone()
+        return row == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def record(self, path: str) -> None:
+        """Record a processed source file. Files that no longer exist (for
+        example moved files) are not recorded.
+
+        :param path: The absolute path of the source file.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    int(self.dry_run),
+                    path,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    stat.st_ino,
+                    time.time(),
+                ),
+            )
+            self.__uncommitted += 1
+            if self.__uncommitted >= 100:
+                self.__connection.commit()
+                self.__uncommitted = 0
+
+    def entries(self, prefix: str) -> typing.List[Entry]:
+        """The recorded files below a path.
+
+        :param prefix: A directory or a file path.
+        """
+        condition, parameters = self.__prefix_condition(prefix)
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT path, size, mtime, inode, processed FROM processed "
+                "WHERE " + condition + " ORDER BY path",
+                parameters,
+            ).fetchall()
+        return [Entry(*row) for row in rows]
+
+    def reset(self, prefix: str) -> int:
+        """Forget the recorded files below a path.
+
+        :param prefix: A directory or a file path.
+
+        :return: The number of forgotten files.
+        """
+        condition, parameters = self.__prefix_condition(prefix)
+        with self.__lock:
+            removed = self.__connection.execute(
+                "DELETE FROM processed WHERE " + condition, parameters
+            ).rowcount
+            self.__connection.commit()
+        return removed
+
+    def commit(self) -> None:
+        with self.__lock:
+            self.__connection.commit()
+            self.__uncommitted = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.__connection.close()
@@ -0,0 +1,112 @@
+"""Render the target paths of a tag dump (``--from-tags``), for example an
+export of a catalogue database, without opening any audio file.
+
+A tag dump is either a CSV file with a header row of field names or a
+JSON Lines file with one object per line. The keys are the field names of
+phrydy (``album``, ``track``, …, see ``--field-help``). The optional key
+``extension`` (or ``path``) gives the extension of the target.
+
+For each row one JSON object is printed in the order of the rows: the
+``target`` and the chosen ``template`` or an ``error`` together with the
+number of the ``line``. A malformed row is reported like this and the
+next rows are rendered nonetheless. The derived fields are computed by
+:class:`audiorename.meta.TagFields`.
+"""
+
+import csv
+import json
+import os
+import sys
+import typing
+
+from .audiofile import render_tags
+from .job import Job
+
+Row = typing.Union[typing.Dict[str, typing.Any], Exception]
+"""A row of a tag dump or the error raised while parsing it."""
+
+
+def parse_json_lines(
+    lines: typing.Iterable[str],
+) -> typing.Iterator[typing.Tuple[int, Row]]:
+    """Parse JSON Lines, one object per line. Blank lines are skipped."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, error
+            continue
+        if not isinstance(row, dict):
+            yield number, ValueError("The line is not a JSON object.")
+            continue
+        yield number, row
+
+
+def parse_csv(tag_file: typing.TextIO) -> typing.Iterator[typing.Tuple[int, Row]]:
+    """Parse a CSV file with a header row of field names."""
+    reader = csv.DictReader(tag_file)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            # The line number is only counted up for parsed lines.
+            yield reader.line_num + 1, error
+            continue
+        yield reader.line_num, row
+
+
+def read_tag_file(path: str) -> typing.Iterator[typing.Tuple[int, Row]]:
+    """Read the rows of a tag dump one after another. A malformed row
+    doesn’t stop the reading, its error is yielded instead.
+
+    :param path: The path of a CSV file (extension ``.csv``) or of a JSON
+      Lines file. ``-`` reads JSON Lines from the standard input.
+
+    :return: The line numbers and the rows.
+    """
+    if path == "-":
+        yield from parse_json_lines(sys.stdin)
+    elif path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as tag_file:
+            yield from parse_csv(tag_file)
+    else:
+        with open(path, encoding="utf-8") as tag_file:
+            yield from parse_json_lines(tag_file)
+
+
+def find_extension(row: typing.Mapping[str, typing.Any]) -> typing.Optional[str]:
+    """The extension of the target without the dot: The key ``extension``
+    or the extension of the key ``path``."""
+    extension = row.get("extension")
+    if not extension and row.get("path"):
+        extension = os.path.splitext(str(row["path"]))[1]
+    if extension:
+        return str(extension).lstrip(".").lower()
+    return None
+
+
+def render_tag_file(job: Job) -> None:
+    """Print the target of each row of the tag dump ``--from-tags``."""
+    path = job.selection.from_tags
+    if not path:
+        raise Exception("No tag dump given (--from-tags).")
+    write = sys.stdout.write
+    for number, row in read_tag_file(path):
+        answer: typing.Dict[str, typing.Any]
+        try:
+            if isinstance(row, Exception):
+                raise row
+            template, target = render_tags(row, job, find_extension(row))
+            answer = {"target": target, "template": template}
+            job.stats.counter.count("rendered")
+        except Exception as error:
+            answer = {
+                "line": number,
+                "error": "{}: {}".format(type(error).__name__, error),
+            }
+            job.stats.counter.count("error")
+        write(json.dumps(answer, ensure_ascii=False) + "\n")
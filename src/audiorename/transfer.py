@@ -0,0 +1,266 @@
+"""Copy and move audio files with the fastest strategy the file system
+supports.
+
+Copies first try a reflink (``FICLONE``, for example on Btrfs or XFS): The
+target shares the data blocks of the source, so no data is copied at all.
+Then ``os.copy_file_range`` lets the kernel copy the data without passing it
+through user space. The last resort is :func:`shutil.copyfile`.
+
+Moves on the same device are a bare :func:`os.rename`. Across devices the
+file is copied as described above and the source is removed afterwards.
+
+The :class:`Executor` runs these operations in background threads
+(``--io-threads``).
+"""
+
+import concurrent.futures
+import contextlib
+import errno
+import os
+import shutil
+import threading
+import typing
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+Strategy = typing.Literal["rename", "reflink", "copy_file_range", "copy"]
+"""How a file was transferred. The strategies are reported in the
+statistics with the prefix ``via_``, for example ``via_reflink``."""
+
+FICLONE = 0x40049409
+"""The ``ioctl`` request to clone a file on Linux, see ``ioctl_ficlone(2)``."""
+
+
+def reflink(source: typing.BinaryIO, target: typing.BinaryIO) -> bool:
+    """Clone the data blocks of the source into the target.
+
+    :return: ``False`` if the file system doesn’t support reflinks.
+    """
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def copy_file_range(source: typing.BinaryIO, target: typing.BinaryIO) -> bool:
+    """Copy the data inside the kernel with ``os.copy_file_range``.
+
+    :return: ``False`` if the system call isn’t available, not supported
+      for these files or stops before the end of the source (some file
+      systems report no data). The caller copies the file again in that
+      case and overwrites anything written so far.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+    size = os.fstat(source.fileno()).st_size
+    copied = 0
+    while copied < size:
+        try:
+            count = os.copy_file_range(source.fileno(), target.fileno(), size - copied)
+        except OSError:
+            if copied == 0:
+                return False
+            raise
+        if count == 0:
+            return False
+        copied += count
+    return True
+
+
+def copy_file(source: str, target: str) -> Strategy:
+    """Copy a file together with its permission bits and time stamps like
+    :func:`shutil.copy2`.
+
+    If the copy fails, the partially written target is removed.
+
+    :return: The used strategy.
+    """
+    strategy: typing.Optional[Strategy] = None
+    with open(source, "rb") as source_file:
+        target_file = open(target, "wb")
+        try:
+            with target_file:
+                if reflink(source_file, target_file):
+                    strategy = "reflink"
+                elif copy_file_range(source_file, target_file):
+                    strategy = "copy_file_range"
+            if not strategy:
+                shutil.copyfile(source, target)
+                strategy = "copy"
+            shutil.copystat(source, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(target)
+            raise
+    return strategy
+
+
+def same_device(source: str, target: str) -> bool:
+    """Check if the source file and the directory of the target are on the
+    same device, so the source can be renamed."""
+    try:
+        return os.stat(source).st_dev == os.stat(os.path.dirname(target)).st_dev
+    except OSError:
+        return False
+
+
+def move_file(source: str, target: str) -> Strategy:
+    """Move a file like :func:`shutil.move`.
+
+    :return: The used strategy: ``rename`` on the same device, otherwise the
+      strategy of the copy.
+    """
+    if same_device(source, target):
+        try:
+            os.rename(source, target)
+            return "rename"
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+    strategy = copy_file(source, target)
+    if os.path.getsize(target) != os.path.getsize(source):
+        os.remove(target)
+        raise Exception(
+            "The copy of “{}” is incomplete, the source is kept.".format(source)
+        )
+    os.remove(source)
+    return strategy
+
+
+class Executor:
+    """Execute file system operations in a bounded pool of threads.
+
+    Each operation names the directories it touches. An operation starts only
+    after all earlier operations in the same directories have finished, so
+    the operations per directory keep their order while operations in
+    different directories overlap. The pool executes the operations in the
+    order of their submission, so an operation only ever waits for
+    operations that have already been started.
+
+    The exceptions of the operations are collected and handed over to the
+    caller with :meth:`failures`. Each operation also names the files it
+    reads or writes. After an operation has failed, the later operations on
+    the same files are skipped, so for example a move doesn’t overwrite a
+    target whose backup failed.
+
+    :param threads: The number of threads.
+    :param capacity: The maximum number of pending operations. Submitting
+      blocks while the limit is reached. Defaults to four times the number of
+      threads.
+    """
+
+    threads: int
+
+    __pool: concurrent.futures.ThreadPoolExecutor
+
+    __slots: threading.Semaphore
+
+    __last: typing.Dict[str, "concurrent.futures.Future[None]"]
+    """The last submitted operation per directory."""
+
+    __pending: typing.Set["concurrent.futures.Future[None]"]
+    """The operations that haven’t finished yet."""
+
+    __failures: typing.List[typing.Tuple[str, BaseException]]
+
+    __failed: typing.Set[str]
+    """The files of the operations that failed or were skipped since the
+    last :meth:`wait`."""
+
+    __lock: threading.Lock
+
+    def __init__(self, threads: int, capacity: typing.Optional[int] = None) -> None:
+        self.threads = max(threads, 1)
+        self.__pool = concurrent.futures.ThreadPoolExecutor(
+            self.threads, thread_name_prefix="io"
+        )
+        self.__slots = threading.Semaphore(capacity or self.threads * 4)
+        self.__last = {}
+        self.__pending = set()
+        self.__failures = []
+        self.__failed = set()
+        self.__lock = threading.Lock()
+
+    def submit(
+        self,
+        name: str,
+        directories: typing.Iterable[str],
+        operation: typing.Callable[[], typing.Any],
+        files: typing.Iterable[str] = (),
+    ) -> None:
+        """Queue an operation.
+
+        :param name: The name of the operation, returned by :meth:`failures`
+          together with the exception.
+        :param directories: The directories the operation reads from or
+          writes into.
+        :param operation: The function to execute.
+        :param files: The files the operation reads or writes. The operation
+          is skipped if an earlier operation on one of the files has failed
+          or has been skipped since the last :meth:`wait`. The files must be
+          inside the directories.
+        """
+        directories = set(directories)
+        files = set(files)
+        dependencies = [
+            self.__last[directory]
+            for directory in directories
+            if directory in self.__last
+        ]
+
+        def run() -> None:
+            try:
+                # A failed dependency only cancels the operation if both
+                # touch the same file, the failure has been recorded already.
+                concurrent.futures.wait(dependencies)
+                with self.__lock:
+                    if self.__failed & files:
+                        self.__failed.update(files)
+                        return
+                operation()
+            except BaseException as error:
+                with self.__lock:
+                    self.__failures.append((name, error))
+                    self.__failed.update(files)
+            finally:
+                self.__slots.release()
+
+        def finished(future: "concurrent.futures.Future[None]") -> None:
+            with self.__lock:
+                self.__pending.discard(future)
+
+        self.__slots.acquire()
+        future = self.__pool.submit(run)
+        with self.__lock:
+            self.__pending.add(future)
+        future.add_done_callback(finished)
+        for directory in directories:
+            self.__last[directory] = future
+        # Forget the finished operations.
+        for directory, last in list(self.__last.items()):
+            if last.done():
+                del self.__last[directory]
+
+    def failures(self) -> typing.List[typing.Tuple[str, BaseException]]:
+        """Get and forget the failures collected so far.
+
+        :return: The names of the failed operations and their exceptions.
+        """
+        with self.__lock:
+            failures = self.__failures
+            self.__failures = []
+        return failures
+
+    def wait(self) -> None:
+        """Wait until all submitted operations have finished."""
+        with self.__lock:
+            pending = list(self.__pending)
+        concurrent.futures.wait(pending)
+        with self.__lock:
+            self.__failed.clear()
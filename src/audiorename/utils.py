@@ -1,4 +1,7 @@
+import importlib
 import re
+import types
+import typing
 
 
 def indent(text: str) -> str:
@@ -7,3 +10,26 @@ def indent(text: str) -> str:
 
 def read_file(path: str) -> str:
     return open(path, "r").read()
+
+
+class LazyModule:
+    """A stand-in for a module that is imported on the first access of one
+    of its attributes. Expensive imports that are only needed by some
+    options don’t slow down the start of the program.
+
+    The import itself is thread-safe (see :func:`importlib.import_module`).
+
+    :param name: The name of the module, for example ``musicbrainzngs``.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.__name = name
+        self.__module: typing.Optional[types.ModuleType] = None
+
+    def __getattr__(self, attribute: str) -> typing.Any:
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+        return getattr(self.__module, attribute)
+
+    def __repr__(self) -> str:
+        return "<lazy module {!r}>".format(self.__name)
@@ -0,0 +1,265 @@
+"""Watch the source directory and process the audio files added to it
+(``--watch``), for example an inbox folder.
+
+A single :class:`~audiorename.job.Job` stays alive while watching, so the
+compiled templates, the metadata index and the MusicBrainz clients and
+caches stay warm between the batches.
+
+The watcher scans the source directory every ``--watch-interval`` seconds.
+On Linux inotify wakes it up as soon as a watched directory changes. On
+other systems or if inotify isn’t available it only polls.
+
+Files that are still being written are not processed: The size and the
+modification time of all new audio files in a directory must stay
+unchanged for ``--watch-settle`` seconds. Then all audio files of the
+directory are handed over to one :class:`~audiorename.batch.Batch`, so the
+album filters (``--album-complete``, ``--album-min``) see the whole album.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+import typing
+
+from .batch import Batch
+from .job import Job
+from .scan import normalize_extensions, scan
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+
+class FileState(typing.NamedTuple):
+    size: int
+    mtime: int
+    """The modification time in nanoseconds."""
+
+
+def stat_file(path: str) -> typing.Optional[FileState]:
+    """:return: ``None`` if the file doesn’t exist (anymore)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return FileState(stat.st_size, stat.st_mtime_ns)
+
+
+class Poller:
+    """Wait for the next scan without noticing any changes."""
+
+    def watch(self, directory: str) -> None:
+        pass
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+    def close(self) -> None:
+        pass
+
+
+class Inotify(Poller):
+    """Wait for the next scan, but wake up as soon as one of the watched
+    directories changes. A minimal binding of the Linux inotify API (see
+    ``inotify(7)``) with :mod:`ctypes`.
+
+    Only the directories are watched that contained audio files at the last
+    scan. The events themselves are discarded, the next scan finds the
+    changes.
+    """
+
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+    )
+
+    __libc: ctypes.CDLL
+
+    __fd: int
+
+    def __init__(self) -> None:
+        self.__libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # IN_NONBLOCK and IN_CLOEXEC have the values of the open flags.
+        fd = self.__libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.__fd = fd
+
+    def watch(self, directory: str) -> None:
+        # Adding an existing watch again only updates its mask.
+        self.__libc.inotify_add_watch(self.__fd, os.fsencode(directory), self.MASK)
+
+    def wait(self, timeout: float) -> None:
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return
+        try:
+            while os.read(self.__fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self.__fd)
+
+
+def create_waiter() -> Poller:
+    """Use inotify if it is available and polling otherwise."""
+    try:
+        return Inotify()
+    except (OSError, AttributeError):
+        return Poller()
+
+
+class Watcher:
+    """
+    :param job: The `job` object. The same job processes all batches.
+    :param waiter: Waits between the scans, see :func:`create_waiter`.
+    :param clock: The clock that measures the settling time.
+    """
+
+    job: Job
+
+    waiter: Poller
+
+    clock: typing.Callable[[], float]
+
+    extensions: typing.Tuple[str, ...]
+
+    pending: typing.Dict[str, typing.Tuple[FileState, float]]
+    """The new or changed files that haven’t been processed yet: Their state
+    and the time since which the state is unchanged."""
+
+    processed: typing.Dict[str, FileState]
+    """The states of the processed files that are still in the source, for
+    example copied files or the files of incomplete albums. They are only
+    processed again if they change or if new files are added to their
+    directory."""
+
+    def __init__(
+        self,
+        job: Job,
+        waiter: typing.Optional[Poller] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.job = job
+        self.waiter = waiter if waiter is not None else create_waiter()
+        self.clock = clock
+        self.extensions = normalize_extensions(job.filters.extension)
+        self.pending = {}
+        self.processed = {}
+
+    def scan(self) -> typing.Dict[str, typing.List[str]]:
+        """:return: The paths of the audio files in the source grouped by
+        directory in the order of :func:`scan`."""
+        directories: typing.Dict[str, typing.List[str]] = {}
+        for path in scan(
+            self.job.selection.source,
+            self.extensions,
+            ignore=(self.job.rename.backup_folder,),
+        ):
+            path = os.path.abspath(path)
+            directories.setdefault(os.path.dirname(path), []).append(path)
+        return directories
+
+    def step(self) -> typing.List[str]:
+        """Scan the source once and process the directories whose new files
+        have settled. Errors are reported and don’t stop the watching.
+
+        :return: The processed directories.
+        """
+        now = self.clock()
+        directories = self.scan()
+        self.waiter.watch(self.job.selection.source)
+        states: typing.Dict[str, FileState] = {}
+        for directory, paths in directories.items():
+            self.waiter.watch(directory)
+            for path in paths:
+                state = stat_file(path)
+                if state:
+                    states[path] = state
+
+        for path in list(self.processed):
+            if path not in states:
+                del self.processed[path]
+        for path in list(self.pending):
+            if path not in states:
+                del self.pending[path]
+        for path, state in states.items():
+            if self.processed.get(path) == state:
+                continue
+            pending = self.pending.get(path)
+            if not pending or pending[0] != state:
+                self.pending[path] = (state, now)
+
+        # The time since which all pending files of a directory are unchanged.
+        settled: typing.Dict[str, float] = {}
+        for path, (_, since) in self.pending.items():
+            directory = os.path.dirname(path)
+            settled[directory] = max(settled.get(directory, since), since)
+
+        processed: typing.List[str] = []
+        for directory in sorted(settled):
+            if now - settled[directory] < self.job.selection.watch_settle:
+                continue
+            paths = [path for path in directories[directory] if path in states]
+            try:
+                Batch(self.job, paths).execute()
+            except Exception as error:
+                # The files are only processed again if they change.
+                self.job.msg.status(
+                    "Error in “{}”: {}".format(directory, error), status="error"
+                )
+            for path in paths:
+                self.pending.pop(path, None)
+                state = stat_file(path)
+                if state:
+                    self.processed[path] = state
+            processed.append(directory)
+        return processed
+
+    def timeout(self) -> float:
+        """The seconds until the next scan: The interval, or less if pending
+        files settle earlier."""
+        timeout = float(self.job.selection.watch_interval)
+        now = self.clock()
+        for _, since in self.pending.values():
+            timeout = min(timeout, since + self.job.selection.watch_settle - now)
+        return max(timeout, 0.1)
+
+    def run(self, iterations: typing.Optional[int] = None) -> None:
+        """Watch the source until the process is interrupted.
+
+        :param iterations: Stop after this number of scans.
+        """
+        if not os.path.isdir(self.job.selection.source):
+            raise Exception("The watch mode needs a source directory.")
+        if self.job.selection.reset_state and self.job.incremental_state:
+            self.job.incremental_state.reset(self.job.selection.source)
+        self.job.msg.output("Watching " + self.job.selection.source)
+        count = 0
+        try:
+            while iterations is None or count < iterations:
+                self.step()
+                count += 1
+                if iterations is None or count < iterations:
+                    if self.pending:
+                        # Changes during the settling are found by the
+                        # next scan anyway.
+                        time.sleep(self.timeout())
+                    else:
+                        self.waiter.wait(self.timeout())
+        finally:
+            self.waiter.close()
@@ -5,7 +5,7 @@ import re
 import shutil
 import subprocess
 import tempfile
-from typing import Optional
+from typing import Any, Optional
 
 import musicbrainzngs
 import musicbrainzngs.musicbrainz
@@ -70,7 +70,7 @@ def gen_file_list(
     return output
 
 
-def get_job(**arguments: str) -> Job:
+def get_job(**arguments: Any) -> Job:
     args = ArgsDefault()
     for key in arguments:
         setattr(args, key, arguments[key])
@@ -141,3 +141,61 @@ def call_bin(*args: str) -> list[str]:
         for line in audiorename.stdout.readlines():
             out.append(line.decode("utf-8"))
     return out
+
+
+class StubMusicBrainz:
+    """A local stand-in for the module ``musicbrainzngs``. Each recording
+    is a performance of a work with the ID ``work-<recording ID>``. All
+    works are parts of the work ``parent``, which is part of ``grandparent``.
+    Pass it to ``monkeypatch.setattr(audiorename.musicbrainz, "musicbrainz",
+    ...)``."""
+
+    ResponseError = musicbrainzngs.ResponseError
+
+    requests: list[tuple[str, str]]
+    """The requested entities as (entity type, MBID)."""
+
+    def __init__(self) -> None:
+        self.requests = []
+
+    def set_useragent(self, *args: str) -> None:
+        pass
+
+    def set_rate_limit(self, *args: float) -> None:
+        pass
+
+    def get_recording_by_id(self, mb_id: str, includes: list[str] = []):
+        self.requests.append(("recording", mb_id))
+        return {
+            "recording": {
+                "id": mb_id,
+                "title": "Recording " + mb_id,
+                "work-relation-list": [
+                    {"type": "performance", "work": {"id": "work-" + mb_id}}
+                ],
+            }
+        }
+
+    def get_release_by_id(self, mb_id: str, includes: list[str] = []):
+        self.requests.append(("release", mb_id))
+        return {
+            "release": {
+                "id": mb_id,
+                "title": "Release " + mb_id,
+                "release-group": {"type": "Album", "primary-type": "Album"},
+            }
+        }
+
+    def get_work_by_id(self, mb_id: str, includes: list[str] = []):
+        self.requests.append(("work", mb_id))
+        work: dict[str, Any] = {"id": mb_id, "title": "Work " + mb_id}
+        parent = {"parent": "grandparent", "grandparent": None}.get(mb_id, "parent")
+        if parent:
+            work["work-relation-list"] = [
+                {
+                    "direction": "backward",
+                    "type": "parts",
+                    "work": {"id": parent, "title": "Work " + parent},
+                }
+            ]
+        return {"work": work}
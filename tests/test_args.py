@@ -34,6 +34,17 @@ class TestCommandlineInterface:
                 audiorename.execute()
         assert exc_info.value.code == 2
 
+    def test_without_source(self) -> None:
+        with pytest.raises(SystemExit) as exc_info:
+            with helper.Capturing("stderr") as output:
+                audiorename.args.parse_args(("--dry-run",))
+        assert exc_info.value.code == 2
+        assert "required: source" in " ".join(output)
+
+    def test_apply_plan_without_source(self) -> None:
+        args = audiorename.args.parse_args(("--apply-plan", "plan.json"))
+        assert args.source is None
+
     def test_without_mutually_exclusive(self) -> None:
         with pytest.raises(SystemExit) as exc_info:
             with helper.Capturing("stderr") as output:
@@ -42,6 +53,15 @@ class TestCommandlineInterface:
         assert "not allowed with argument" in " ".join(output)
 
 
+class TestLazyDescription:
+    def test_not_built_without_help(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def fail() -> str:
+            raise AssertionError("The description must not be built.")
+
+        monkeypatch.setattr(audiorename.args, "description", fail)
+        assert audiorename.args.parse_args(("--dry-run", ".")).dry_run is True
+
+
 class TestVersion:
     def test_version(self) -> None:
         with pytest.raises(SystemExit):
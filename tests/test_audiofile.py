@@ -5,10 +5,12 @@ import shutil
 import tempfile
 
 import pytest
+from tmep import Template
 
 import audiorename
 from audiorename import audiofile
 from audiorename.meta import Meta
+from audiorename.scan import TargetIndex
 from tests import helper
 
 
@@ -107,6 +109,14 @@ class TestFunctionGetTarget:
         result = audiofile.find_target_path(target, self.extensions)
         assert self.target == result
 
+    def test_index(self) -> None:
+        index = TargetIndex()
+        target = self.target.replace(".flac", ".mp3")
+        assert audiofile.find_target_path(target, self.extensions, index) == (
+            self.target
+        )
+        assert index.find(self.target.replace(".flac", ".wav"), ["wav"]) is None
+
 
 class TestFunctionBestFormat:
     """
@@ -327,6 +337,10 @@ class TestProcessTargetPath:
         result = self.process(self.meta, "$title")
         assert result == "full"
 
+    def test_compiled_template(self) -> None:
+        result = audiofile.process_target_path(self.meta, Template("$title"))
+        assert result == "full"
+
     def test_unicode(self) -> None:
         self.assert_target_path("aeoeue", title="äöü")
 
@@ -1,5 +1,9 @@
 """Test the submodule “batchelper.py”."""
 
+import os
+import shutil
+import tempfile
+
 import audiorename
 from tests import helper
 
@@ -167,3 +171,90 @@ class TestSkip:
             audiorename.execute("--dry-run", "--verbose", path)
         output = helper.filter_source(output)
         assert output[1]
+
+
+class TestJobs:
+    def execute(self, *args: str) -> list[str]:
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute(*args)
+        return output
+
+    def test_same_output_as_serial(self) -> None:
+        args = ("--dry-run", "--verbose", "--stats", helper.get_testfile("files"))
+        serial = self.execute(*args)
+        parallel = self.execute("--jobs", "3", *args)
+        # Remove the execution time
+        assert serial[:-3] == parallel[:-3]
+        assert serial[-2] == parallel[-2]
+
+    def test_album_filter(self) -> None:
+        args = ("--dry-run", "--verbose", "--album-complete")
+        serial = self.execute(*args, helper.get_testfile("files"))
+        parallel = self.execute("--jobs", "2", *args, helper.get_testfile("files"))
+        assert serial == parallel
+
+    def test_no_race_to_the_same_target(self) -> None:
+        source = tempfile.mkdtemp()
+        target = tempfile.mkdtemp()
+        for name in ("a.mp3", "b.mp3", "c.mp3"):
+            shutil.copyfile(
+                helper.get_testfile("files", "album.mp3"), os.path.join(source, name)
+            )
+
+        output = self.execute("--jobs", "3", "--stats", "--target", target, source)
+
+        assert helper.join(output).count("Exists") == 2
+        assert "move=1" in helper.join(output)
+        assert sorted(os.listdir(source)) == ["b.mp3", "c.mp3"]
+        assert helper.is_file(target + helper.path_album)
+
+
+class TestPipeline:
+    def execute(self, *args: str) -> list[str]:
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute(*args)
+        return output
+
+    def test_same_output_as_serial(self) -> None:
+        args = ("--dry-run", "--verbose", "--stats", helper.get_testfile("files"))
+        serial = self.execute(*args)
+        pipeline = self.execute("--read-threads", "4", "--render-threads", "3", *args)
+        # Remove the execution time
+        assert serial[:-3] == pipeline[:-3]
+        assert serial[-2] == pipeline[-2]
+
+    def test_album_filter(self) -> None:
+        args = ("--dry-run", "--verbose", "--album-complete")
+        serial = self.execute(*args, helper.get_testfile("files"))
+        pipeline = self.execute(
+            "--read-threads", "3", *args, helper.get_testfile("files")
+        )
+        assert serial == pipeline
+
+    def test_single_file(self) -> None:
+        args = ("--dry-run", "--verbose", helper.get_testfile("files", "album.mp3"))
+        assert self.execute(*args) == self.execute("--render-threads", "2", *args)
+
+    def test_rename(self) -> None:
+        source = tempfile.mkdtemp()
+        target = tempfile.mkdtemp()
+        for name in ("a.mp3", "b.mp3", "c.mp3"):
+            shutil.copyfile(
+                helper.get_testfile("files", "album.mp3"), os.path.join(source, name)
+            )
+
+        output = self.execute(
+            "--read-threads",
+            "2",
+            "--render-threads",
+            "2",
+            "--stats",
+            "--target",
+            target,
+            source,
+        )
+
+        assert helper.join(output).count("Exists") == 2
+        assert "move=1" in helper.join(output)
+        assert sorted(os.listdir(source)) == ["b.mp3", "c.mp3"]
+        assert helper.is_file(target + helper.path_album)
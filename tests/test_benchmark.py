@@ -0,0 +1,289 @@
+"""Benchmarks that count the expensive operations per processed audio file."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import typing
+
+import pytest
+
+import audiorename
+from audiorename.audiofile import process_target_path
+from audiorename.job import Config
+from audiorename.meta import Meta
+from tests import helper
+
+
+class TestMetaParses:
+    """Count how often the tags of an audio file are parsed by mutagen."""
+
+    parses: typing.List[str]
+
+    @pytest.fixture(autouse=True)
+    def count_parses(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.parses = []
+        init = Meta.__init__
+
+        def counting_init(meta: Meta, path: str, shell_friendly: bool = False):
+            self.parses.append(path)
+            init(meta, path, shell_friendly)
+
+        monkeypatch.setattr(Meta, "__init__", counting_init)
+
+    def execute(self, *args: str) -> None:
+        with helper.Capturing():
+            audiorename.execute("--dry-run", "--target", tempfile.mkdtemp(), *args)
+
+    def assert_one_parse_per_file(self, files: typing.List[str]) -> None:
+        assert len(self.parses) == len(files)
+        assert sorted(self.parses) == sorted(files)
+
+    def test_single_file(self) -> None:
+        single = helper.get_testfile("files", "album.mp3")
+        self.execute(single)
+        self.assert_one_parse_per_file([single])
+
+    def test_album(self) -> None:
+        self.execute(helper.get_testfile("files", "album_complete"))
+        self.assert_one_parse_per_file(
+            helper.gen_file_list(
+                ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11"],
+                helper.get_testfile("files", "album_complete"),
+            )
+        )
+
+    def test_album_complete(self) -> None:
+        folder = helper.get_testfile("files", "album_complete")
+        self.execute("--album-complete", folder)
+        self.assert_one_parse_per_file(
+            helper.gen_file_list(
+                ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11"],
+                folder,
+            )
+        )
+
+    def test_album_min(self) -> None:
+        folder = helper.get_testfile("files", "album_complete")
+        self.execute("--album-min", "7", folder)
+        assert len(self.parses) == 11
+
+    def test_classical(self) -> None:
+        folder = helper.get_testfile("classical", "Mozart_Horn-concertos")
+        self.execute("--classical", folder)
+        self.assert_one_parse_per_file(
+            helper.gen_file_list(
+                ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11"],
+                folder,
+            )
+        )
+
+    def test_index_unchanged_files(self) -> None:
+        folder = helper.get_testfile("files", "album_complete")
+        index = os.path.join(tempfile.mkdtemp(), "index.sqlite")
+        self.execute("--index", index, folder)
+        assert len(self.parses) == 11
+        self.parses = []
+        self.execute("--index", index, folder)
+        assert len(self.parses) == 0
+        self.execute("--index", index, "--album-complete", folder)
+        assert len(self.parses) == 0
+
+    def test_from_tags(self) -> None:
+        tag_file = os.path.join(tempfile.mkdtemp(), "tags.jsonl")
+        with open(tag_file, "w") as f:
+            for track in range(1, 101):
+                f.write('{"album": "Album", "track": %d}\n' % track)
+        self.execute("--from-tags", tag_file, ".")
+        assert len(self.parses) == 0
+
+
+class TestProcessTargetPath:
+    """Throughput of :func:`audiorename.audiofile.process_target_path` with and
+    without the compiled templates cached by the job."""
+
+    def setup_method(self) -> None:
+        self.job = helper.get_job()
+        self.meta = helper.get_meta("files", "album.mp3").export_dict()
+
+    def throughput(self, cached: bool, number: int = 200) -> float:
+        def render() -> None:
+            if cached:
+                process_target_path(self.meta, self.job.compiled_template("default"))
+            else:
+                process_target_path(self.meta, self.job.path_templates.default)
+
+        return number / timeit.timeit(render, number=number)
+
+    def test_throughput(self) -> None:
+        assert process_target_path(
+            self.meta, self.job.compiled_template("default")
+        ) == process_target_path(self.meta, self.job.path_templates.default)
+
+        uncached = self.throughput(cached=False)
+        cached = self.throughput(cached=True)
+        print(
+            "process_target_path: {:.0f}/s without cache, {:.0f}/s with cache".format(
+                uncached, cached
+            )
+        )
+        assert cached > uncached
+
+
+class TestComputedFields:
+    """Only the fields a path template refers to are computed."""
+
+    computed: typing.List[str]
+
+    @pytest.fixture(autouse=True)
+    def count_computed(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.computed = []
+        ar_performer_raw: property = Meta.__dict__["ar_performer_raw"]
+
+        def counting(meta: Meta) -> typing.Any:
+            self.computed.append(meta.title or "")
+            return ar_performer_raw.__get__(meta)
+
+        monkeypatch.setattr(Meta, "ar_performer_raw", property(counting))
+
+    def test_title_only(self) -> None:
+        with helper.Capturing():
+            audiorename.execute(
+                "--dry-run",
+                "--format",
+                "$title",
+                "--target",
+                tempfile.mkdtemp(),
+                helper.get_testfile("classical", "Mozart_Horn-concertos"),
+            )
+        assert self.computed == []
+
+    def test_classical(self) -> None:
+        with helper.Capturing():
+            audiorename.execute(
+                "--dry-run",
+                "--classical",
+                "--target",
+                tempfile.mkdtemp(),
+                helper.get_testfile("classical", "Mozart_Horn-concertos"),
+            )
+        assert len(self.computed) > 0
+
+
+class TestConfigLookups:
+    """The settings are resolved once per job. The number of lookups in the
+    command line arguments and the configuration files must not depend on the
+    number of processed audio files."""
+
+    lookups: int
+
+    @pytest.fixture(autouse=True)
+    def count_lookups(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.lookups = 0
+        init = Config.__init__
+
+        def counting_init(config: Config, *args: typing.Any) -> None:
+            self.lookups += 1
+            init(config, *args)
+
+        monkeypatch.setattr(Config, "__init__", counting_init)
+
+    def count(self, source: str) -> int:
+        self.lookups = 0
+        with helper.Capturing():
+            audiorename.execute(
+                "--dry-run",
+                "--config",
+                helper.get_testfile("config", "minimal.ini"),
+                "--target",
+                tempfile.mkdtemp(),
+                source,
+            )
+        return self.lookups
+
+    def test_constant(self) -> None:
+        single = self.count(helper.get_testfile("files", "album.mp3"))
+        many = self.count(helper.get_testfile("files"))
+        assert single == many
+
+
+class TestDirectorySyscalls:
+    """Count the file system calls to find existing targets and to create
+    the target directories per moved audio file."""
+
+    calls: typing.Dict[str, int]
+
+    @pytest.fixture(autouse=True)
+    def count_calls(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.calls = {"mkdir": 0, "scandir": 0, "exists": 0}
+
+        def counting(name: str, function: typing.Any) -> typing.Any:
+            def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+                self.calls[name] += 1
+                return function(*args, **kwargs)
+
+            return wrapper
+
+        monkeypatch.setattr(os, "mkdir", counting("mkdir", os.mkdir))
+        monkeypatch.setattr(os, "scandir", counting("scandir", os.scandir))
+        monkeypatch.setattr(os.path, "exists", counting("exists", os.path.exists))
+
+    def test_album(self) -> None:
+        source = tempfile.mkdtemp()
+        target = tempfile.mkdtemp()
+        folder = helper.get_testfile("files", "album_complete")
+        for name in sorted(os.listdir(folder)):
+            shutil.copyfile(os.path.join(folder, name), os.path.join(source, name))
+        self.calls = {key: 0 for key in self.calls}
+        with helper.Capturing():
+            audiorename.execute("--target", target, source)
+        calls = dict(self.calls)
+        moved = 11
+        print(
+            "Per moved file: {:.2f} mkdir, {:.2f} scandir, {:.2f} exists".format(
+                *(calls[key] / moved for key in ("mkdir", "scandir", "exists"))
+            )
+        )
+        # Each target directory is created once, not once per file.
+        created = sum(len(dirs) for _, dirs, _ in os.walk(target))
+        assert created == 3
+        assert calls["mkdir"] == created
+        # The source directory is scanned, the album directory is listed.
+        assert calls["scandir"] == 2
+        # Only the parse checks if the source exists, no target probing.
+        assert calls["exists"] < moved * 2
+
+
+class TestStartup:
+    """The program is called once per file from hooks, so its start must be
+    fast. Modules only needed by some options must not be imported."""
+
+    deferred = (
+        "musicbrainzngs",
+        "urllib.request",
+        "concurrent.futures.process",
+        "audiorename.server",
+        "audiorename.tags",
+        "audiorename.watch",
+    )
+
+    def test_single_file(self) -> None:
+        code = (
+            "import sys, audiorename\n"
+            "audiorename.execute('--dry-run', '--target', {target!r}, {source!r})\n"
+            "print(' '.join(m for m in {deferred!r} if m in sys.modules))\n"
+        ).format(
+            target=tempfile.mkdtemp(),
+            source=helper.get_testfile("files", "album.mp3"),
+            deferred=self.deferred,
+        )
+        begin = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        duration = time.perf_counter() - begin
+        print("Startup and single file: {:.3f}s".format(duration))
+        assert result.stdout.splitlines()[-1] == ""
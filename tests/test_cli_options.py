@@ -63,6 +63,28 @@ class TestBestFormat:
         assert not os.path.exists(self.high_quality)
         assert not os.path.exists(self.low_quality)
 
+    def test_failed_cleanup_keeps_target(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        target = os.path.join(self.target, "test-file.mp3")
+        remove = os.remove
+
+        def fail(path: str) -> None:
+            if path == target:
+                raise OSError("Permission denied")
+            remove(path)
+
+        with helper.Capturing(clean_ansi=True):
+            self.move(self.low_quality)
+        with open(target, "rb") as low_quality:
+            content = low_quality.read()
+        monkeypatch.setattr(os, "remove", fail)
+        with helper.Capturing(clean_ansi=True) as output:
+            self.move(self.high_quality, "--delete", "--io-threads", "2")
+        assert "Delete failed" in helper.join(output)
+        with open(target, "rb") as low_quality:
+            assert low_quality.read() == content
+        assert os.path.exists(self.high_quality)
+        assert not os.path.exists(os.path.join(self.target, "test-file.flac"))
+
     def test_backup_source(self) -> None:
         with helper.Capturing(clean_ansi=True) as output:
             self.move(self.high_quality, "--backup")
@@ -0,0 +1,107 @@
+"""Test the submodule “index.py”."""
+
+import os
+import shutil
+import tempfile
+
+import audiorename
+from audiorename.index import MetadataIndex
+from tests import helper
+
+
+def get_index(rebuild: bool = False) -> MetadataIndex:
+    return MetadataIndex(os.path.join(tempfile.mkdtemp(), "index.sqlite"), rebuild)
+
+
+class TestMetadataIndex:
+    def setup_method(self) -> None:
+        self.index = get_index()
+        self.audio_file = helper.copy_to_tmp("files", "album.mp3")
+        self.fields = helper.get_meta("files", "album.mp3").export_dict(sanitize=False)
+
+    def test_get_not_indexed(self) -> None:
+        assert self.index.get(self.audio_file) is None
+
+    def test_put_get(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        fields = self.index.get(self.audio_file)
+        assert fields
+        assert fields["title"] == "full"
+        assert fields["track"] == 2
+        assert fields["date"] == "2001-01-01"
+
+    def test_sanitized_values_unchanged(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        fields = self.index.get(self.audio_file)
+        assert fields
+        assert audiorename.meta.Meta.sanitize_dict(
+            fields
+        ) == audiorename.meta.Meta.sanitize_dict(self.fields)
+
+    def test_changed_mtime(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        stat = os.stat(self.audio_file)
+        os.utime(self.audio_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        assert self.index.get(self.audio_file) is None
+
+    def test_changed_size(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        with open(self.audio_file, "ab") as f:
+            f.write(b"\0")
+        assert self.index.get(self.audio_file) is None
+
+    def test_shell_friendly(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        assert self.index.get(self.audio_file, shell_friendly=True) is None
+
+    def test_rebuild(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        index = MetadataIndex(self.index.path, rebuild=True)
+        assert index.get(self.audio_file) is None
+        assert index.count() == 1
+
+    def test_prune(self) -> None:
+        self.index.put(self.audio_file, self.fields)
+        other = helper.copy_to_tmp("files", "compilation.mp3")
+        self.index.put(other, self.fields)
+        os.remove(self.audio_file)
+        assert self.index.prune(os.path.dirname(self.audio_file)) == 1
+        assert self.index.count() == 1
+        assert self.index.get(other)
+
+
+class TestOption:
+    def setup_method(self) -> None:
+        self.index_path = os.path.join(tempfile.mkdtemp(), "index.sqlite")
+
+    def execute(self, *args: str) -> str:
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute(
+                "--dry-run", "--verbose", "--index", self.index_path, *args
+            )
+        return helper.join(output)
+
+    def test_same_output(self) -> None:
+        source = helper.get_testfile("files")
+        first = self.execute(source)
+        second = self.execute(source)
+        assert first == second
+        assert MetadataIndex(self.index_path).count() == 33
+
+    def test_album_complete(self) -> None:
+        source = helper.get_testfile("files")
+        first = self.execute("--album-complete", source)
+        second = self.execute("--album-complete", source)
+        assert first == second
+
+    def test_prune_moved_files(self) -> None:
+        source = tempfile.mkdtemp()
+        shutil.copyfile(
+            helper.get_testfile("files", "album.mp3"),
+            os.path.join(source, "album.mp3"),
+        )
+        with helper.Capturing():
+            audiorename.execute(
+                "--index", self.index_path, "--target", tempfile.mkdtemp(), source
+            )
+        assert MetadataIndex(self.index_path).count() == 0
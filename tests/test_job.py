@@ -3,6 +3,9 @@
 import os
 import typing
 
+import pytest
+
+from audiorename import musicbrainz
 from audiorename.args import ArgsDefault
 from audiorename.job import Counter, Job, Timer
 from tests import helper
@@ -29,6 +32,59 @@ class TestJobWithArgParser:
     def test_source_as_target(self) -> None:
         assert job(source_as_target=True).selection.target == os.getcwd()
 
+    def test_incremental_default(self) -> None:
+        assert job().selection.incremental is False
+        assert job().incremental_state is None
+
+    def test_incremental(self) -> None:
+        assert job(incremental=True).selection.incremental is True
+
+    def test_state_default(self) -> None:
+        assert job().selection.state == os.path.expanduser(
+            "~/.cache/audiorename/state.sqlite"
+        )
+
+    def test_state(self) -> None:
+        assert job(state="state.sqlite").selection.state == os.path.abspath(
+            "state.sqlite"
+        )
+
+    def test_reset_state(self) -> None:
+        assert job(reset_state=True).selection.reset_state is True
+
+    def test_show_state(self) -> None:
+        assert job(show_state=True).selection.show_state is True
+
+    def test_watch_default(self) -> None:
+        assert job().selection.watch is False
+        assert job().selection.watch_interval == 2
+        assert job().selection.watch_settle == 5
+
+    def test_watch(self) -> None:
+        assert job(watch=True).selection.watch is True
+
+    def test_watch_interval(self) -> None:
+        assert job(watch_interval=10).selection.watch_interval == 10
+        assert job(watch_interval=0).selection.watch_interval == 1
+
+    def test_watch_settle(self) -> None:
+        assert job(watch_settle=0).selection.watch_settle == 0
+
+    def test_serve_default(self) -> None:
+        assert job().selection.serve is None
+
+    def test_serve(self) -> None:
+        assert job(serve="127.0.0.1:8765").selection.serve == "127.0.0.1:8765"
+
+    def test_from_tags_default(self) -> None:
+        assert job().selection.from_tags is None
+
+    def test_from_tags(self) -> None:
+        assert job(from_tags="tags.csv").selection.from_tags == os.path.abspath(
+            "tags.csv"
+        )
+        assert job(from_tags="-").selection.from_tags == "-"
+
     ##
     # [rename]
     ##
@@ -42,6 +98,24 @@ class TestJobWithArgParser:
     def test_dry_run(self) -> None:
         assert job(dry_run=True).rename.dry_run is True
 
+    def test_plan_default(self) -> None:
+        assert job().rename.plan is False
+
+    def test_plan(self) -> None:
+        assert job(plan=True).rename.plan is True
+
+    def test_plan_out(self) -> None:
+        assert job().rename.plan_out is None
+        assert job(plan_out="plan.jsonl").rename.plan_out == os.path.abspath(
+            "plan.jsonl"
+        )
+
+    def test_apply_plan(self) -> None:
+        assert job().rename.apply_plan is None
+        assert job(apply_plan="plan.jsonl").rename.apply_plan == os.path.abspath(
+            "plan.jsonl"
+        )
+
     def test_move_action(self) -> None:
         assert job(move_action="copy").rename.move_action == "copy"
 
@@ -108,6 +182,111 @@ class TestJobWithArgParser:
     def test_remap_classical(self) -> None:
         assert job(remap_classical=True).metadata_actions.remap_classical is True
 
+    def test_mb_cache(self) -> None:
+        metadata_actions = job(
+            mb_cache="mb.sqlite", mb_cache_ttl=7, mb_cache_size=10
+        ).metadata_actions
+        assert metadata_actions.mb_cache == os.path.abspath("mb.sqlite")
+        assert metadata_actions.mb_cache_ttl == 7
+        assert metadata_actions.mb_cache_size == 10
+
+    def test_mb_cache_default(self) -> None:
+        metadata_actions = job().metadata_actions
+        assert metadata_actions.mb_cache is None
+        assert metadata_actions.mb_cache_ttl == 30
+        assert metadata_actions.mb_cache_size == 100000
+        assert job().musicbrainz_cache is None
+
+    def test_mb_client(self) -> None:
+        metadata_actions = job(
+            mb_threads=4, mb_rate_limit=2, mb_url="http://localhost:5000"
+        ).metadata_actions
+        assert metadata_actions.mb_threads == 4
+        assert metadata_actions.mb_rate_limit == 2
+        assert metadata_actions.mb_url == "http://localhost:5000"
+
+    def test_mb_client_default(self) -> None:
+        metadata_actions = job().metadata_actions
+        assert metadata_actions.mb_threads == 0
+        assert metadata_actions.mb_rate_limit == 1
+        assert metadata_actions.mb_url == "https://musicbrainz.org"
+        assert job().musicbrainz_client is None
+
+    def test_mb_client_shared_rate_limit(self) -> None:
+        client = job(mb_threads=2, mb_rate_limit=4, jobs=2).musicbrainz_client
+        assert client is not None
+        assert client.bucket.rate == 2
+
+    def test_setup_musicbrainz_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        calls: typing.List[int] = []
+        monkeypatch.setattr(musicbrainz, "set_rate_limit", calls.append)
+        monkeypatch.setattr(musicbrainz, "set_cache", lambda cache: None)
+        monkeypatch.setattr(musicbrainz, "set_client", lambda client: None)
+        monkeypatch.setattr(musicbrainz, "set_store", lambda store: None)
+        monkeypatch.setattr(musicbrainz, "set_work_graph", lambda graph: None)
+        j = job(jobs=3)
+        j.setup_musicbrainz()
+        j.setup_musicbrainz()
+        assert calls == [3]
+
+    def test_mb_backend(self) -> None:
+        metadata_actions = job(
+            mb_backend="offline", mb_store="mb.json"
+        ).metadata_actions
+        assert metadata_actions.mb_backend == "offline"
+        assert metadata_actions.mb_store == os.path.abspath("mb.json")
+
+    def test_mb_backend_default(self) -> None:
+        assert job().metadata_actions.mb_backend == "online"
+        assert job().metadata_actions.mb_store is None
+        assert job().musicbrainz_store is None
+
+    def test_mb_backend_offline_without_store(self) -> None:
+        with pytest.raises(Exception, match="--mb-store"):
+            job(mb_backend="offline").musicbrainz_store
+
+    ##
+    # [performance]
+    ##
+
+    def test_jobs(self) -> None:
+        assert job(jobs=3).performance.jobs == 3
+
+    def test_jobs_default(self) -> None:
+        assert job().performance.jobs == 1
+
+    def test_jobs_cpu_count(self) -> None:
+        assert job(jobs=0).performance.jobs == (os.cpu_count() or 1)
+
+    def test_index(self) -> None:
+        assert job(index="index.sqlite").performance.metadata_index == os.path.abspath(
+            "index.sqlite"
+        )
+
+    def test_index_default(self) -> None:
+        assert job().performance.metadata_index is None
+        assert job().metadata_index is None
+
+    def test_rebuild_index(self) -> None:
+        assert job(rebuild_index=True).performance.rebuild_index is True
+
+    def test_threads(self) -> None:
+        performance = job(read_threads=8, render_threads=2).performance
+        assert performance.read_threads == 8
+        assert performance.render_threads == 2
+
+    def test_threads_default(self) -> None:
+        assert job().performance.read_threads == 1
+        assert job(render_threads=0).performance.render_threads == 1
+
+    def test_io_threads(self) -> None:
+        assert job(io_threads=4).performance.io_threads == 4
+        assert job(io_threads=4).io_executor
+
+    def test_io_threads_default(self) -> None:
+        assert job().performance.io_threads == 0
+        assert job().io_executor is None
+
 
 def get_config_path(config_file: str) -> str:
     return helper.get_testfile("config", config_file)
@@ -150,11 +329,23 @@ class TestJobWithConfigParser:
         assert self.job.selection.source == "/tmp"
         assert self.job.selection.target == "/tmp"
         assert self.job.selection.source_as_target is True
+        assert self.job.selection.incremental is True
+        assert self.job.selection.state == "/tmp/state.sqlite"
+        assert self.job.selection.reset_state is True
+        assert self.job.selection.show_state is True
+        assert self.job.selection.watch is True
+        assert self.job.selection.watch_interval == 3
+        assert self.job.selection.watch_settle == 7
+        assert self.job.selection.serve == "/tmp/audiorename.sock"
+        assert self.job.selection.from_tags == "/tmp/tags.csv"
 
     def test_section_rename(self) -> None:
         assert self.job.rename.backup_folder == "/tmp/backup"
         assert self.job.rename.best_format is True
         assert self.job.rename.dry_run is True
+        assert self.job.rename.plan is True
+        assert self.job.rename.plan_out == "/tmp/plan.jsonl"
+        assert self.job.rename.apply_plan == "/tmp/plan.jsonl"
         assert self.job.rename.move_action == "copy"
         assert self.job.rename.cleaning_action == "delete"
 
@@ -188,6 +379,55 @@ class TestJobWithConfigParser:
     def test_section_metadata_actions(self) -> None:
         assert self.job.metadata_actions.enrich_metadata is True
         assert self.job.metadata_actions.remap_classical is True
+        assert self.job.metadata_actions.mb_cache == "/tmp/musicbrainz.sqlite"
+        assert self.job.metadata_actions.mb_cache_ttl == 7
+        assert self.job.metadata_actions.mb_cache_size == 1000
+        assert self.job.metadata_actions.mb_threads == 4
+        assert self.job.metadata_actions.mb_rate_limit == 2
+        assert self.job.metadata_actions.mb_url == "http://localhost:5000"
+        assert self.job.metadata_actions.mb_backend == "offline"
+        assert self.job.metadata_actions.mb_store == "/tmp/musicbrainz-store.sqlite"
+
+    def test_section_performance(self) -> None:
+        assert self.job.performance.jobs == 4
+        assert self.job.performance.metadata_index == "/tmp/index.sqlite"
+        assert self.job.performance.rebuild_index is True
+        assert self.job.performance.read_threads == 8
+        assert self.job.performance.render_threads == 2
+        assert self.job.performance.io_threads == 4
+
+
+class TestResolvedSettings:
+    def test_immutable(self) -> None:
+        j = job(source=".")
+        with pytest.raises(AttributeError):
+            j.selection.source = "/tmp"  # type: ignore
+
+    def test_slotted(self) -> None:
+        with pytest.raises(AttributeError):
+            job().rename.unknown = True  # type: ignore
+
+    def test_resolved_once(self) -> None:
+        j = job(target="test")
+        assert j.selection is j.selection
+        assert j.selection.target == os.path.abspath("test")
+
+
+class TestCompiledTemplate:
+    def test_compiled_once(self) -> None:
+        j = job(default_template="$artist/$title")
+        template = j.compiled_template("default")
+        assert template.original == "$artist/$title"
+        assert j.compiled_template("default") is template
+
+    def test_all_templates(self) -> None:
+        j = job()
+        assert j.compiled_template("default").original == j.path_templates.default
+        assert (
+            j.compiled_template("compilation").original == j.path_templates.compilation
+        )
+        assert j.compiled_template("soundtrack").original == j.path_templates.soundtrack
+        assert j.compiled_template("classical").original == j.path_templates.classical
 
 
 class TestTimer:
@@ -238,3 +478,11 @@ class TestCounter:
 
         self.counter.count("no_field")
         assert self.counter.result() == "no_field=1 rename=1"
+
+    def test_merge(self) -> None:
+        self.counter.count("move")
+        other = Counter()
+        other.count("move")
+        other.count("no_field")
+        self.counter.merge(other.export())
+        assert self.counter.result() == "move=2 no_field=1"
@@ -5,6 +5,7 @@ import tempfile
 import typing
 
 import pytest
+from tmep import Template
 
 import audiorename.meta as meta
 from audiorename.meta import Meta
@@ -68,6 +69,52 @@ class TestExportDict:
         assert result["title"] == "full"
 
 
+class TestExportLazy:
+    def test_same_as_export_dict(self) -> None:
+        meta = helper.get_meta("files", "album.mp3")
+        assert dict(meta.export_lazy()) == meta.export_dict()
+        assert dict(meta.export_lazy(sanitize=False)) == meta.export_dict(
+            sanitize=False
+        )
+
+    def test_restricted(self) -> None:
+        meta = helper.get_meta("files", "album.mp3")
+        result = meta.export_lazy(["title", "mb_workid"])
+        assert result["title"] == "full"
+        assert "mb_workid" not in result
+        assert "album" not in result
+        assert list(result) == ["title"]
+        assert len(result) == 1
+
+    def test_computed_once(self) -> None:
+        calls: typing.List[str] = []
+
+        def get(field: str) -> str:
+            calls.append(field)
+            return "a/b"
+
+        result = meta.LazyFields(get, ["title", "album"], sanitize=True)
+        assert result["title"] == "ab"
+        assert result["title"] == "ab"
+        assert calls == ["title"]
+
+
+class TestFindTemplateFields:
+    def find(self, template: str) -> typing.Set[str]:
+        return meta.find_template_fields(Template(template))
+
+    def test_symbols(self) -> None:
+        assert self.find("$artist/${album}_$title") == {"artist", "album", "title"}
+
+    def test_function_arguments(self) -> None:
+        assert self.find(
+            "%ifdefnotempty{ar_combined_year,$ar_combined_album (%upper{$year})}"
+        ) == {"ar_combined_year", "ar_combined_album", "year"}
+
+    def test_literal_arguments(self) -> None:
+        assert self.find("%ifdef{xxx,a,b}%shorten{title,3}") == {"title"}
+
+
 # Test file:
 # test/classical/without_work.mp3
 #
@@ -1066,3 +1113,87 @@ class TestClassical:
 # m/Massive-Attack-vs-Mad-Professor/No-Protection_1995/06_Moving-Dub-Better-Things.mp3
 # m/Massive-Attack-vs-Mad-Professor/No-Protection_1995/07_I-Spy-Spying-Glass.mp3
 # m/Massive-Attack-vs-Mad-Professor/No-Protection_1995/08_Backward-Sucking-Heat-Miser.mp3
+
+
+###############################################################################
+# Tag fields
+###############################################################################
+
+
+class TestCoerceTag:
+    def test_int(self) -> None:
+        assert meta.coerce_tag("track", "4") == 4
+        assert meta.coerce_tag("year", " 1985 ") == 1985
+
+    def test_bool(self) -> None:
+        assert meta.coerce_tag("comp", "1") is True
+        assert meta.coerce_tag("comp", "False") is False
+
+    def test_list(self) -> None:
+        assert meta.coerce_tag("albumtypes", "album; soundtrack") == [
+            "album",
+            "soundtrack",
+        ]
+
+    def test_empty_or_invalid(self) -> None:
+        assert meta.coerce_tag("track", "") is None
+        assert meta.coerce_tag("track", "four") is None
+
+    def test_unchanged(self) -> None:
+        assert meta.coerce_tag("album", "4") == "4"
+        assert meta.coerce_tag("track", 4) == 4
+
+
+class TestTagFields:
+    def test_derived_fields(self) -> None:
+        fields = meta.TagFields(
+            {
+                "albumartist": "a-ha",
+                "album": "Hunting High and Low (Disc 2)",
+                "track": "4",
+                "disc": "2",
+                "disctotal": "2",
+            }
+        )
+        assert fields.ar_combined_album == "Hunting High and Low"
+        assert fields.ar_combined_disctrack == "2-04"
+        assert fields.ar_initial_artist == "a"
+        assert fields.title is None
+
+    def test_same_as_meta(self) -> None:
+        source = Meta(helper.get_testfile("classical", "without_work.mp3"))
+        tags = {field: getattr(source, field) for field in Meta.fields_phrydy()}
+        tags["ar_performer_raw"] = source.ar_performer_raw
+        fields = meta.TagFields(tags)
+        for field in Meta.fields_audiorename():
+            assert getattr(fields, field) == getattr(source, field)
+
+    def test_performer(self) -> None:
+        fields = meta.TagFields(
+            {
+                "performer": "Anne-Sophie Mutter (violin); Berliner Philharmoniker "
+                "(orchestra)",
+                "conductor": "Herbert von Karajan",
+            }
+        )
+        assert fields.ar_performer_raw == [
+            ["conductor", "Herbert von Karajan"],
+            ["violin", "Anne-Sophie Mutter"],
+            ["orchestra", "Berliner Philharmoniker"],
+        ]
+        assert fields.ar_performer_short == "Karajan, BerPhi"
+
+    def test_remap_classical(self) -> None:
+        tags = {"title": "Horn Concerto: II. Romanze", "track": "8", "work": "Horn"}
+        fields = meta.TagFields(tags)
+        fields.remap_classical()
+        assert fields.title == "II. Romanze"
+        assert fields.track == 2
+        # The mapping itself is unchanged.
+        assert tags["track"] == "8"
+
+    def test_export_lazy(self) -> None:
+        exported = meta.TagFields({"album": "Album", "comp": "0"}).export_lazy()
+        assert exported["album"] == "Album"
+        assert exported["ar_combined_album"] == "Album"
+        assert "comp" not in exported
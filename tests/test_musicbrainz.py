@@ -1,6 +1,33 @@
+import concurrent.futures
+import http.server
+import json
+import os
+import tempfile
+import threading
+import time
+import timeit
+import typing
+
+import musicbrainzngs
 import pytest
 
-from audiorename.musicbrainz import query, query_works_recursively, set_useragent
+import audiorename
+import audiorename.musicbrainz
+from audiorename.musicbrainz import (
+    Client,
+    Memo,
+    OfflineStore,
+    ResponseCache,
+    TokenBucket,
+    WorkGraph,
+    clear_memo,
+    query,
+    query_works_recursively,
+    set_client,
+    set_store,
+    set_useragent,
+    set_work_graph,
+)
 from tests import helper
 
 
@@ -67,3 +94,550 @@ class TestEnrich:
         result = query_works_recursively("4fba670e-3b8e-4ddf-a3a6-90817c94d6ce", [])
         assert result[0]["id"] == "4fba670e-3b8e-4ddf-a3a6-90817c94d6ce"
         assert len(result) == 1
+
+
+@pytest.fixture
+def stub(monkeypatch: pytest.MonkeyPatch) -> helper.StubMusicBrainz:
+    stub = helper.StubMusicBrainz()
+    monkeypatch.setattr(audiorename.musicbrainz, "musicbrainz", stub)
+    monkeypatch.setattr(audiorename.musicbrainz, "cache", None)
+    monkeypatch.setattr(audiorename.musicbrainz, "memo", Memo())
+    monkeypatch.setattr(audiorename.musicbrainz, "work_graph", WorkGraph())
+    return stub
+
+
+def cache_path() -> str:
+    return os.path.join(tempfile.mkdtemp(), "musicbrainz.sqlite")
+
+
+class TestResponseCache:
+    def test_get_put(self) -> None:
+        cache = ResponseCache(cache_path())
+        assert cache.get("work", "1", ["work-rels"]) is None
+        cache.put("work", "1", ["work-rels"], {"id": "1"})
+        assert cache.get("work", "1", ["work-rels"]) == {"id": "1"}
+        assert cache.count() == 1
+
+    def test_key_includes(self) -> None:
+        cache = ResponseCache(cache_path())
+        cache.put("work", "1", ["work-rels", "artist-rels"], {"id": "1"})
+        assert cache.get("work", "1", ["artist-rels", "work-rels"]) == {"id": "1"}
+        assert cache.get("work", "1", ["work-rels"]) is None
+        assert cache.get("recording", "1", ["work-rels", "artist-rels"]) is None
+
+    def test_persistent(self) -> None:
+        path = cache_path()
+        ResponseCache(path).put("release", "1", [], {"id": "1"})
+        assert ResponseCache(path).get("release", "1", []) == {"id": "1"}
+
+    def test_ttl(self) -> None:
+        path = cache_path()
+        ResponseCache(path).put("release", "1", [], {"id": "1"})
+        time.sleep(0.01)
+        cache = ResponseCache(path, ttl=0.001)
+        assert cache.get("release", "1", []) is None
+        assert cache.count() == 0
+
+    def test_size(self) -> None:
+        cache = ResponseCache(cache_path(), size=2)
+        for mb_id in ("1", "2", "3"):
+            cache.put("release", mb_id, [], {"id": mb_id})
+            time.sleep(0.001)
+        assert cache.evict() == 1
+        assert cache.get("release", "1", []) is None
+        assert cache.get("release", "3", []) == {"id": "3"}
+
+
+class TestQueryCached:
+    def test_query(self, stub: helper.StubMusicBrainz) -> None:
+        audiorename.musicbrainz.set_cache(ResponseCache(cache_path()))
+        assert query("release", "1") == query("release", "1")
+        clear_memo()
+        assert query("release", "1")
+        assert stub.requests == [("release", "1")]
+
+    def test_query_works_recursively(self, stub: helper.StubMusicBrainz) -> None:
+        audiorename.musicbrainz.set_cache(ResponseCache(cache_path()))
+        query_works_recursively("a", [])
+        clear_memo()
+        query_works_recursively("b", [])
+        assert stub.requests == [
+            ("work", "a"),
+            ("work", "parent"),
+            ("work", "grandparent"),
+            ("work", "b"),
+        ]
+
+    def test_without_cache(self, stub: helper.StubMusicBrainz) -> None:
+        query("release", "1")
+        clear_memo()
+        query("release", "1")
+        assert len(stub.requests) == 2
+
+    def test_enrich_album(self, stub: helper.StubMusicBrainz) -> None:
+        path = cache_path()
+        args = (
+            "--dry-run",
+            "--enrich-metadata",
+            "--mb-cache",
+            path,
+            helper.get_testfile("classical", "Mozart_Horn-concertos"),
+        )
+        with helper.Capturing():
+            audiorename.execute(*args)
+        # One request per unique entity.
+        assert len(stub.requests) > 0
+        assert len(stub.requests) == len(set(stub.requests))
+        assert stub.requests.count(("work", "parent")) == 1
+
+        stub.requests.clear()
+        with helper.Capturing():
+            audiorename.execute(*args)
+        assert stub.requests == []
+
+
+class TestMemo:
+    def test_memo(self, stub: helper.StubMusicBrainz) -> None:
+        assert query("release", "1") is query("release", "1")
+        assert stub.requests == [("release", "1")]
+
+    def test_single_flight(self, stub: helper.StubMusicBrainz) -> None:
+        get_release_by_id = stub.get_release_by_id
+
+        def slow(mb_id: str, includes: typing.List[str] = []):
+            time.sleep(0.05)
+            return get_release_by_id(mb_id, includes)
+
+        stub.get_release_by_id = slow  # type: ignore
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: query("release", "1"), range(16)))
+        assert all(result is results[0] for result in results)
+        assert stub.requests == [("release", "1")]
+
+    def test_failed_fetch(self) -> None:
+        memo = Memo()
+        calls: typing.List[int] = []
+
+        def fetch() -> int:
+            calls.append(1)
+            if len(calls) == 1:
+                raise ValueError()
+            return 2
+
+        with pytest.raises(ValueError):
+            memo.get("key", fetch)
+        assert memo.get("key", fetch) == 2
+        assert memo.get("key", fetch) == 2
+        assert len(calls) == 2
+
+    def test_bounded(self) -> None:
+        memo = Memo(size=2)
+        for key in ("a", "b", "a", "c"):
+            memo.get(key, lambda: key)
+        assert len(memo) == 2
+        # “b” is the least recently used key.
+        assert memo.get("b", lambda: "fetched") == "fetched"
+        assert memo.get("a", lambda: "fetched") == "fetched"
+
+    def test_errors_not_memoized(self, stub: helper.StubMusicBrainz) -> None:
+        get_release_by_id = stub.get_release_by_id
+        calls: typing.List[str] = []
+
+        def fail_once(mb_id: str, includes: typing.List[str] = []):
+            calls.append(mb_id)
+            if len(calls) == 1:
+                raise musicbrainzngs.ResponseError()
+            return get_release_by_id(mb_id, includes)
+
+        stub.get_release_by_id = fail_once  # type: ignore
+        with helper.Capturing():
+            assert query("release", "1") is None
+        assert query("release", "1") is not None
+        assert query("release", "1") is not None
+        assert calls == ["1", "1"]
+
+    def test_works_default_argument(self, stub: helper.StubMusicBrainz) -> None:
+        assert len(query_works_recursively("a")) == 3
+        assert len(query_works_recursively("b")) == 3
+
+    def test_works_modify_result(self, stub: helper.StubMusicBrainz) -> None:
+        query_works_recursively("a").reverse()
+        assert query_works_recursively("a")[0]["id"] == "a"
+
+    def test_work_cycle(self, stub: helper.StubMusicBrainz) -> None:
+        get_work_by_id = stub.get_work_by_id
+
+        def cycle(mb_id: str, includes: typing.List[str] = []):
+            result = get_work_by_id(mb_id, includes)
+            if mb_id == "grandparent":
+                result["work"]["work-relation-list"] = [
+                    {"direction": "backward", "type": "parts", "work": {"id": "a"}}
+                ]
+            return result
+
+        stub.get_work_by_id = cycle  # type: ignore
+        assert [work["id"] for work in query_works_recursively("a")] == [
+            "a",
+            "parent",
+            "grandparent",
+        ]
+
+    def test_enrich_album(self, stub: helper.StubMusicBrainz) -> None:
+        with helper.Capturing():
+            audiorename.execute(
+                "--dry-run",
+                "--enrich-metadata",
+                helper.get_testfile("classical", "Mozart_Horn-concertos"),
+            )
+        releases = [request for request in stub.requests if request[0] == "release"]
+        assert len(releases) == 1
+        assert len(stub.requests) == len(set(stub.requests))
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """A local stand-in for the MusicBrainz web service. It answers the
+    lookups of releases with a minimal XML document."""
+
+    requests: typing.List[str]
+
+    active: int
+
+    max_active: int
+
+    def __init__(self, delay: float = 0.05, status: int = 200) -> None:
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    server: StandInServer
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        mb_id = self.path.split("?")[0].split("/")[-1]
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#">'
+            '<release id="{}"><title>Release {}</title>'
+            '<release-group type="Album"><primary-type>Album</primary-type>'
+            "</release-group></release></metadata>".format(mb_id, mb_id)
+        ).encode()
+        with server.lock:
+            server.active -= 1
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/xml")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+class TestTokenBucket:
+    def test_burst(self) -> None:
+        bucket = TokenBucket(rate=1, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.5
+
+    def test_rate(self) -> None:
+        bucket = TokenBucket(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.09
+
+
+class TestClient:
+    @pytest.fixture(autouse=True)
+    def reset(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(audiorename.musicbrainz, "cache", None)
+        monkeypatch.setattr(audiorename.musicbrainz, "client", None)
+        monkeypatch.setattr(audiorename.musicbrainz, "memo", Memo())
+        monkeypatch.setattr(audiorename.musicbrainz, "work_graph", WorkGraph())
+        set_useragent()
+
+    def test_fetch(self) -> None:
+        server = StandInServer(delay=0)
+        result = Client(server.url, rate=100).fetch("release", "1", ["release-groups"])
+        assert result["release"]["id"] == "1"
+        assert result["release"]["release-group"]["primary-type"] == "Album"
+        assert server.requests == ["/ws/2/release/1?inc=release-groups"]
+
+    def test_query(self) -> None:
+        server = StandInServer(delay=0)
+        set_client(Client(server.url, rate=100))
+        result = query("release", "1")
+        assert result
+        assert result["title"] == "Release 1"
+
+    def test_not_found(self) -> None:
+        server = StandInServer(delay=0, status=404)
+        set_client(Client(server.url, rate=100))
+        with helper.Capturing() as output:
+            assert query("release", "1") is None
+        assert "not found" in output[0]
+
+    def test_retry_overloaded(self) -> None:
+        server = StandInServer(delay=0, status=503)
+        set_client(Client(server.url, rate=100, retries=2))
+        with helper.Capturing() as output:
+            assert query("release", "1") is None
+        assert len(server.requests) == 3
+        assert "bad response" in output[0]
+
+    def test_concurrent(self) -> None:
+        server = StandInServer(delay=0.1)
+        client = Client(server.url, rate=1000, threads=8)
+        set_client(client)
+        start = time.monotonic()
+        for mb_id in range(8):
+            client.prefetch(release_id=str(mb_id))
+        results = [query("release", str(mb_id)) for mb_id in range(8)]
+        assert all(results)
+        assert len(server.requests) == 8
+        assert server.max_active > 1
+        assert time.monotonic() - start < 0.6
+
+    def test_rate_limit(self) -> None:
+        server = StandInServer(delay=0)
+        client = Client(server.url, rate=20, threads=8)
+        set_client(client)
+        start = time.monotonic()
+        for mb_id in range(5):
+            client.prefetch(release_id=str(mb_id))
+        for mb_id in range(5):
+            query("release", str(mb_id))
+        assert time.monotonic() - start >= 0.19
+
+
+def store_documents() -> typing.List[typing.Dict[str, typing.Any]]:
+    """The entities of tests/files/classical/Mozart_Horn-concertos/01.mp3"""
+    return [
+        {
+            "recording": {
+                "id": "7886ad6c-11af-435b-8ec3-bca5711f7728",
+                "title": "Konzert für Horn und Orchester: I. Allegro",
+                "work-relation-list": [
+                    {
+                        "type": "performance",
+                        "work": {"id": "21fe0bf0-a040-387c-a39d-369d53c251fe"},
+                    }
+                ],
+            }
+        },
+        {
+            "release": {
+                "id": "5ed650c5-0f72-4b79-80a7-c458c869f53e",
+                "title": "4 Hornkonzerte",
+                "release-group": {"type": "Album", "primary-type": "Album"},
+            }
+        },
+        {
+            "work": {
+                "id": "21fe0bf0-a040-387c-a39d-369d53c251fe",
+                "title": "Offline Concerto: I. Allegro",
+                "work-relation-list": [
+                    {
+                        "direction": "backward",
+                        "type": "parts",
+                        "work": {"id": "offline-parent"},
+                    }
+                ],
+                "artist-relation-list": [
+                    {
+                        "direction": "backward",
+                        "type": "composer",
+                        "artist": {
+                            "name": "Wolfgang Amadeus Mozart",
+                            "sort-name": "Mozart, Wolfgang Amadeus",
+                        },
+                    }
+                ],
+            }
+        },
+        {"work": {"id": "offline-parent", "title": "Offline Concerto"}},
+    ]
+
+
+def write_store(extension: str) -> str:
+    path = os.path.join(tempfile.mkdtemp(), "store" + extension)
+    documents = store_documents()
+    with open(path, "w", encoding="utf-8") as json_file:
+        if extension == ".json":
+            json.dump(documents, json_file)
+        else:
+            for document in documents:
+                json_file.write(json.dumps(document) + "\n")
+    return path
+
+
+class TestOfflineStore:
+    @pytest.fixture(autouse=True)
+    def reset(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(audiorename.musicbrainz, "cache", None)
+        monkeypatch.setattr(audiorename.musicbrainz, "client", None)
+        monkeypatch.setattr(audiorename.musicbrainz, "store", None)
+        monkeypatch.setattr(audiorename.musicbrainz, "memo", Memo())
+        monkeypatch.setattr(audiorename.musicbrainz, "work_graph", WorkGraph())
+
+    def test_sqlite(self) -> None:
+        path = os.path.join(tempfile.mkdtemp(), "store.sqlite")
+        writable = OfflineStore(path, writable=True)
+        writable.add("work", {"id": "1", "title": "Work"})
+        writable.commit()
+        writable.close()
+
+        store = OfflineStore(path)
+        assert store.get_work_by_id("1", ["work-rels"]) == {
+            "work": {"id": "1", "title": "Work"}
+        }
+        assert store.count() == 1
+
+    def test_missing_database(self) -> None:
+        with pytest.raises(FileNotFoundError):
+            OfflineStore("/nonexistent/store.sqlite")
+
+    @pytest.mark.parametrize("extension", [".json", ".jsonl"])
+    def test_json(self, extension: str) -> None:
+        store = OfflineStore(write_store(extension))
+        assert store.count() == 4
+        result = store.get_release_by_id("5ed650c5-0f72-4b79-80a7-c458c869f53e")
+        assert result["release"]["title"] == "4 Hornkonzerte"
+
+    def test_not_found(self) -> None:
+        set_store(OfflineStore(write_store(".json")))
+        with helper.Capturing() as output:
+            assert query("recording", "unknown") is None
+        assert "not found" in output[0]
+
+    def test_query_works_recursively(self) -> None:
+        set_store(OfflineStore(write_store(".json")))
+        works = query_works_recursively("21fe0bf0-a040-387c-a39d-369d53c251fe")
+        assert [work["id"] for work in works] == [
+            "21fe0bf0-a040-387c-a39d-369d53c251fe",
+            "offline-parent",
+        ]
+
+    def test_fast(self) -> None:
+        store = OfflineStore(write_store(".json"))
+        number = 1000
+        duration = timeit.timeit(
+            lambda: store.get_work_by_id("offline-parent"), number=number
+        )
+        assert duration / number < 0.001
+
+    def test_enrich_metadata(self) -> None:
+        with helper.Capturing() as output:
+            audiorename.execute(
+                "--dry-run",
+                "--enrich-metadata",
+                "--mb-backend",
+                "offline",
+                "--mb-store",
+                write_store(".jsonl"),
+                helper.get_testfile("classical", "Mozart_Horn-concertos", "01.mp3"),
+            )
+        assert "Offline Concerto: I. Allegro" in helper.join(output)
+
+
+class TestWorkGraph:
+    def graph_path(self) -> str:
+        return os.path.join(tempfile.mkdtemp(), "musicbrainz.sqlite")
+
+    def test_known_ancestors(self, stub: helper.StubMusicBrainz) -> None:
+        graph = WorkGraph()
+        set_work_graph(graph)
+        graph.resolve("a")
+        clear_memo()
+        stub.requests.clear()
+        assert [work["id"] for work in graph.resolve("b")] == [
+            "b",
+            "parent",
+            "grandparent",
+        ]
+        assert stub.requests == [("work", "b")]
+        assert len(graph) == 4
+
+    def test_persistent(self, stub: helper.StubMusicBrainz) -> None:
+        path = self.graph_path()
+        WorkGraph(path).resolve("a")
+        clear_memo()
+        stub.requests.clear()
+
+        graph = WorkGraph(path)
+        assert len(graph) == 3
+        set_work_graph(graph)
+        works = query_works_recursively("a")
+        assert [work["id"] for work in works] == ["a", "parent", "grandparent"]
+        assert stub.requests == []
+
+    def test_ttl(self, stub: helper.StubMusicBrainz) -> None:
+        path = self.graph_path()
+        WorkGraph(path).resolve("a")
+        time.sleep(0.01)
+        assert len(WorkGraph(path, ttl=0.001)) == 0
+
+    def test_not_found(self, stub: helper.StubMusicBrainz) -> None:
+        def not_found(mb_id: str, includes: typing.List[str] = []):
+            stub.requests.append(("work", mb_id))
+            raise musicbrainzngs.ResponseError()
+
+        stub.get_work_by_id = not_found  # type: ignore
+        with helper.Capturing() as output:
+            assert query_works_recursively("a") == []
+        assert output == ["Received bad response from the MusicBrainz server."]
+        assert stub.requests == [("work", "a")]
+
+    def test_parent_not_found(self, stub: helper.StubMusicBrainz) -> None:
+        get_work_by_id = stub.get_work_by_id
+
+        def parent_not_found(mb_id: str, includes: typing.List[str] = []):
+            if mb_id == "parent":
+                raise musicbrainzngs.ResponseError()
+            return get_work_by_id(mb_id, includes)
+
+        stub.get_work_by_id = parent_not_found  # type: ignore
+        with helper.Capturing() as output:
+            works = query_works_recursively("a")
+        assert [work["id"] for work in works] == ["a"]
+        assert output == ["Received bad response from the MusicBrainz server."]
+
+    def test_quiet(self, stub: helper.StubMusicBrainz) -> None:
+        def not_found(mb_id: str, includes: typing.List[str] = []):
+            raise musicbrainzngs.ResponseError()
+
+        stub.get_work_by_id = not_found  # type: ignore
+        with helper.Capturing() as output:
+            assert WorkGraph().resolve("a", quiet=True) == ()
+        assert output == []
+
+    def test_enrich_across_runs(self, stub: helper.StubMusicBrainz) -> None:
+        path = self.graph_path()
+        folder = helper.get_testfile("classical", "Mozart_Horn-concertos")
+        with helper.Capturing():
+            audiorename.execute("--dry-run", "-E", "--mb-cache", path, folder)
+        assert ("work", "parent") in stub.requests
+
+        # Only the work graph is kept: The responses have expired.
+        ResponseCache(path, ttl=0).evict()
+        stub.requests.clear()
+        with helper.Capturing():
+            audiorename.execute("--dry-run", "-E", "--mb-cache", path, folder)
+        assert not [request for request in stub.requests if request[0] == "work"]
@@ -0,0 +1,72 @@
+"""Test the module “pipeline.py”."""
+
+import random
+import threading
+import time
+import typing
+
+import pytest
+
+from audiorename.pipeline import Pipeline, Stage
+
+
+def sleep() -> None:
+    time.sleep(random.random() / 1000)
+
+
+def double(value: int) -> int:
+    sleep()
+    print("double", value)
+    return value * 2
+
+
+def increment(value: int) -> int:
+    sleep()
+    print("increment", value)
+    return value + 1
+
+
+class TestPipeline:
+    def test_order(self) -> None:
+        pipeline = Pipeline([Stage("a", double, 4), Stage("b", increment, 3)], 5)
+        results = list(pipeline.run(range(200)))
+        assert [result.value for result in results] == [i * 2 + 1 for i in range(200)]
+
+    def test_output(self) -> None:
+        pipeline = Pipeline([Stage("a", double, 4), Stage("b", increment, 3)])
+        for i, result in enumerate(pipeline.run(range(50))):
+            assert result.output == "double {}\nincrement {}\n".format(i, i * 2)
+
+    def test_empty(self) -> None:
+        assert list(Pipeline([Stage("a", double, 2)]).run([])) == []
+
+    def test_exception(self) -> None:
+        def fail(value: int) -> int:
+            if value == 7:
+                raise ValueError(value)
+            return value
+
+        values: typing.List[int] = []
+        with pytest.raises(ValueError):
+            for result in Pipeline([Stage("a", fail, 3)]).run(range(100)):
+                values.append(result.value)
+        assert values == list(range(7))
+
+    def test_bounded(self) -> None:
+        lock = threading.Lock()
+        in_flight = 0
+        maximum = 0
+
+        def source() -> typing.Iterator[int]:
+            nonlocal in_flight, maximum
+            for i in range(100):
+                with lock:
+                    in_flight += 1
+                    maximum = max(maximum, in_flight)
+                yield i
+
+        for _ in Pipeline([Stage("a", double, 4)], capacity=8).run(source()):
+            with lock:
+                in_flight -= 1
+        # The feeder may have taken one more item from the source.
+        assert maximum <= 9
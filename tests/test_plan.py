@@ -0,0 +1,169 @@
+"""Test the module “plan.py”."""
+
+import json
+import os
+import shutil
+import tempfile
+import typing
+
+import audiorename
+from tests import helper
+
+
+def copy(source: str, *path_segments: str) -> str:
+    """Copy a test file into a source directory under a new name."""
+    path = os.path.join(source, path_segments[-1])
+    shutil.copyfile(helper.get_testfile(*path_segments[:-1]), path)
+    return path
+
+
+class TestPlan:
+    def setup_method(self) -> None:
+        self.source = tempfile.mkdtemp()
+        self.target = tempfile.mkdtemp()
+
+    def execute(self, *args: str) -> str:
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute(
+                "--plan",
+                "--one-line",
+                "--stats",
+                "--target",
+                self.target,
+                *args,
+                self.source,
+            )
+        return helper.join(output)
+
+    def quality(self) -> typing.Tuple[str, str]:
+        low = copy(self.source, "quality", "mp3_128.mp3", "a.mp3")
+        high = copy(self.source, "quality", "flac.flac", "b.flac")
+        return low, high
+
+    def test_same_target(self) -> None:
+        for name in ("a.mp3", "b.mp3", "c.mp3"):
+            copy(self.source, "files", "album.mp3", name)
+        output = self.execute()
+        assert output.count("Exists") == 2
+        assert "move=1" in output
+        assert sorted(os.listdir(self.source)) == ["b.mp3", "c.mp3"]
+        assert helper.is_file(self.target + helper.path_album)
+
+    def test_dry_run_detects_conflicts(self) -> None:
+        for name in ("a.mp3", "b.mp3"):
+            copy(self.source, "files", "album.mp3", name)
+        output = self.execute("--dry-run")
+        assert output.count("Exists") == 1
+        assert "move=1" in output
+        assert sorted(os.listdir(self.source)) == ["a.mp3", "b.mp3"]
+
+    def test_best_format_in_memory(self) -> None:
+        low, high = self.quality()
+        output = self.execute("--best-format", "--delete", "--format", "test-file")
+        assert "Delete […]" + low in output
+        # The worse file is never moved into the target.
+        assert "move=1" in output
+        assert os.listdir(self.target) == ["test-file.flac"]
+        assert os.listdir(self.source) == []
+
+    def test_best_format_existing_target(self) -> None:
+        copy(self.target, "quality", "mp3_128.mp3", "test-file.mp3")
+        high = copy(self.source, "quality", "flac.flac", "b.flac")
+        output = self.execute("--best-format", "--delete", "--format", "test-file")
+        assert "Delete […]test-file.mp3" in output
+        assert os.listdir(self.target) == ["test-file.flac"]
+        assert not os.path.exists(high)
+
+    def test_existing_target_wins(self) -> None:
+        copy(self.target, "quality", "flac.flac", "test-file.flac")
+        low = copy(self.source, "quality", "mp3_128.mp3", "a.mp3")
+        output = self.execute("--best-format", "--delete", "--format", "test-file")
+        assert "Exists" in output
+        assert "Delete […]" + low in output
+        assert os.listdir(self.target) == ["test-file.flac"]
+
+    def test_sorted_by_target(self) -> None:
+        album = copy(self.source, "files", "album.mp3", "a.mp3")
+        compilation = copy(self.source, "files", "compilation.mp3", "z.mp3")
+        output = self.execute("--dry-run")
+        # The target “_compilations/…” sorts before “the album artist/…”.
+        assert output.index("Move […]" + compilation) < output.index("Move […]" + album)
+
+    def test_same_as_serial(self) -> None:
+        source = helper.get_testfile("files")
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute("--dry-run", "--stats", source)
+        serial = helper.join(output)
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute("--dry-run", "--stats", "--plan", source)
+        plan = helper.join(output)
+        counter = serial[serial.index("Counter:") :]
+        assert counter == plan[plan.index("Counter:") :]
+
+
+class TestPlanFile:
+    def setup_method(self) -> None:
+        self.source = tempfile.mkdtemp()
+        self.target = tempfile.mkdtemp()
+        self.plan_file = os.path.join(tempfile.mkdtemp(), "plan.jsonl")
+
+    def execute(self, *args: str) -> str:
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute("--one-line", "--stats", "--target", self.target, *args)
+        return helper.join(output)
+
+    def read_plan(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        with open(self.plan_file) as plan_file:
+            return [json.loads(line) for line in plan_file]
+
+    def test_plan_out(self) -> None:
+        a = copy(self.source, "files", "album.mp3", "a.mp3")
+        b = copy(self.source, "files", "album.mp3", "b.mp3")
+        self.execute("--plan-out", self.plan_file, "--delete", self.source)
+        assert sorted(os.listdir(self.source)) == ["a.mp3", "b.mp3"]
+        assert os.listdir(self.target) == []
+        target = self.target + helper.path_album
+        assert self.read_plan() == [
+            {
+                "source": b,
+                "target": target,
+                "action": "exists",
+                "cleanup": b,
+                "cleaning_action": "delete",
+                "best_format": "target",
+            },
+            {
+                "source": a,
+                "target": target,
+                "action": "move",
+                "cleanup": None,
+                "cleaning_action": None,
+                "best_format": None,
+            },
+        ]
+
+    def test_apply_plan(self) -> None:
+        for name in ("a.mp3", "b.mp3"):
+            copy(self.source, "files", "album.mp3", name)
+        self.execute("--plan-out", self.plan_file, "--delete", self.source)
+        output = self.execute("--apply-plan", self.plan_file)
+        assert "delete=1" in output
+        assert "move=1" in output
+        assert os.listdir(self.source) == []
+        assert helper.is_file(self.target + helper.path_album)
+
+    def test_apply_plan_reads_no_tags(self) -> None:
+        copy(self.source, "files", "album.mp3", "a.mp3")
+        self.execute("--plan-out", self.plan_file, self.source)
+        original = audiorename.meta.Meta.__init__
+
+        def init(*args: typing.Any, **kwargs: typing.Any) -> None:
+            raise AssertionError("The tags must not be read.")
+
+        audiorename.meta.Meta.__init__ = init  # type: ignore
+        try:
+            output = self.execute("--apply-plan", self.plan_file, ".")
+        finally:
+            audiorename.meta.Meta.__init__ = original  # type: ignore
+        assert "move=1" in output
+        assert helper.is_file(self.target + helper.path_album)
@@ -0,0 +1,169 @@
+"""Test the module “scan.py”."""
+
+import os
+import shutil
+import tempfile
+import typing
+
+from audiorename.scan import TargetIndex, normalize_extensions, scan
+from tests import helper
+
+
+def walk(source: str, extensions: typing.Tuple[str, ...]) -> typing.List[str]:
+    """The previous implementation based on os.walk."""
+    result: typing.List[str] = []
+    for path, dirs, files in os.walk(source):
+        dirs.sort()
+        files.sort()
+        for file_name in files:
+            if file_name.lower().endswith(extensions):
+                result.append(os.path.join(path, file_name))
+    return result
+
+
+def touch(*path_segments: str) -> str:
+    path = os.path.join(*path_segments)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
+    return path
+
+
+class TestNormalizeExtensions:
+    def test_normalize(self) -> None:
+        assert normalize_extensions(["mp3", "FLAC", ".m4a", "mp3"]) == (
+            ".flac",
+            ".m4a",
+            ".mp3",
+        )
+
+
+class TestScan:
+    extensions = normalize_extensions(["mp3", "m4a", "flac"])
+
+    def test_same_order_as_os_walk(self) -> None:
+        source = helper.get_testfile()
+        result = list(scan(source, self.extensions))
+        assert len(result) > 0
+        assert result == walk(source, self.extensions)
+
+    def test_files_before_subdirectories(self) -> None:
+        source = tempfile.mkdtemp()
+        touch(source, "a", "1.mp3")
+        touch(source, "b.mp3")
+        touch(source, "c", "2.mp3")
+        assert list(scan(source, self.extensions)) == [
+            os.path.join(source, "b.mp3"),
+            os.path.join(source, "a", "1.mp3"),
+            os.path.join(source, "c", "2.mp3"),
+        ]
+
+    def test_extension_case_insensitive(self) -> None:
+        source = tempfile.mkdtemp()
+        touch(source, "a.MP3")
+        touch(source, "b.txt")
+        assert list(scan(source, self.extensions)) == [os.path.join(source, "a.MP3")]
+
+    def test_prune_hidden_directories(self) -> None:
+        source = tempfile.mkdtemp()
+        touch(source, ".hidden", "a.mp3")
+        touch(source, "visible", "b.mp3")
+        assert list(scan(source, self.extensions)) == [
+            os.path.join(source, "visible", "b.mp3")
+        ]
+
+    def test_prune_ignored_directories(self) -> None:
+        source = tempfile.mkdtemp()
+        touch(source, "backup", "a.mp3")
+        touch(source, "music", "b.mp3")
+        assert list(
+            scan(source, self.extensions, ignore=[os.path.join(source, "backup")])
+        ) == [os.path.join(source, "music", "b.mp3")]
+
+    def test_no_symlinked_directories(self) -> None:
+        source = tempfile.mkdtemp()
+        touch(source, "music", "a.mp3")
+        os.symlink(os.path.join(source, "music"), os.path.join(source, "link"))
+        assert list(scan(source, self.extensions)) == [
+            os.path.join(source, "music", "a.mp3")
+        ]
+
+    def test_nonexistent(self) -> None:
+        assert list(scan("/nonexistent", self.extensions)) == []
+
+
+class TestTargetIndex:
+    def setup_method(self) -> None:
+        self.target = tempfile.mkdtemp()
+        self.flac = touch(self.target, "album", "01.flac")
+        self.index = TargetIndex()
+
+    def test_exists(self) -> None:
+        assert self.index.exists(self.flac)
+        assert not self.index.exists(os.path.join(self.target, "album", "02.flac"))
+
+    def test_find_other_extension(self) -> None:
+        mp3 = os.path.join(self.target, "album", "01.mp3")
+        assert self.index.find(mp3, ["mp3", "flac"]) == self.flac
+        assert self.index.find(mp3, ["mp3"]) is None
+
+    def test_find_extension_order(self) -> None:
+        mp3 = touch(self.target, "album", "01.mp3")
+        assert self.index.find(self.flac, ["mp3", "flac"]) == mp3
+
+    def test_directory_listed_once(self) -> None:
+        for track in range(20):
+            self.index.find(
+                os.path.join(self.target, "album", "{:02d}.mp3".format(track)),
+                ["flac", "mp3", "m4a"],
+            )
+        assert self.index.listings == 1
+
+    def test_missing_directory(self) -> None:
+        path = os.path.join(self.target, "missing", "01.mp3")
+        assert self.index.find(path, ["mp3"]) is None
+        self.index.add(path)
+        assert self.index.find(path, ["mp3"]) == path
+
+    def test_add_remove(self) -> None:
+        mp3 = os.path.join(self.target, "album", "02.mp3")
+        assert not self.index.exists(mp3)
+        self.index.add(mp3)
+        assert self.index.exists(mp3)
+        self.index.remove(mp3)
+        assert not self.index.exists(mp3)
+
+    def test_add_unlisted_directory(self) -> None:
+        path = touch(self.target, "other", "01.mp3")
+        self.index.add(path)
+        assert self.index.listings == 0
+        assert self.index.exists(path)
+        assert self.index.listings == 1
+
+    def test_clear(self) -> None:
+        mp3 = os.path.join(self.target, "album", "01.mp3")
+        assert self.index.find(mp3, ["mp3"]) is None
+        touch(mp3)
+        assert self.index.find(mp3, ["mp3"]) is None
+        self.index.clear()
+        assert self.index.find(mp3, ["mp3"]) == mp3
+
+    def test_makedirs(self) -> None:
+        directory = os.path.join(self.target, "a", "b")
+        self.index.makedirs(directory)
+        assert os.path.isdir(directory)
+        os.rmdir(directory)
+        # The directory is known to exist, so it isn’t created again.
+        self.index.makedirs(directory)
+        assert not os.path.isdir(directory)
+        self.index.makedirs(os.path.join(self.target, "a"))
+        self.index.clear()
+        self.index.makedirs(directory)
+        assert os.path.isdir(directory)
+
+    def test_makedirs_listed_directory(self) -> None:
+        directory = os.path.join(self.target, "album")
+        self.index.exists(os.path.join(directory, "01.mp3"))
+        shutil.rmtree(directory)
+        # The directory was listed, so it is known to exist.
+        self.index.makedirs(directory)
+        assert not os.path.isdir(directory)
@@ -0,0 +1,179 @@
+"""Test the module “server.py”."""
+
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import typing
+
+import pytest
+
+from audiorename.server import (
+    TargetResolver,
+    create_server,
+    find_socket_path,
+    is_loopback,
+)
+from tests import helper
+
+
+class TestTargetResolver:
+    def setup_method(self) -> None:
+        self.resolver = TargetResolver(helper.get_job(target="/target"))
+
+    def test_path(self) -> None:
+        path = helper.copy_to_tmp("files", "album.mp3")
+        assert self.resolver.resolve({"path": path}) == {
+            "target": "/target" + helper.path_album,
+            "template": "default",
+        }
+        # The file is neither moved nor modified.
+        assert os.path.exists(path)
+
+    def test_compilation(self) -> None:
+        answer = self.resolver.resolve(
+            {"path": helper.get_testfile("files", "compilation.mp3")}
+        )
+        assert answer == {
+            "target": "/target" + helper.path_compilation,
+            "template": "compilation",
+        }
+
+    def test_tags(self) -> None:
+        answer = self.resolver.resolve(
+            {
+                "tags": {"comp": True, "album": "Album", "title": "Title"},
+                "extension": "flac",
+            }
+        )
+        assert answer["template"] == "compilation"
+        assert answer["target"].endswith(".flac")
+
+    def test_missing_file(self) -> None:
+        answer = self.resolver.resolve({"path": "/missing.mp3"})
+        assert answer == {"error": "No such file: /missing.mp3"}
+
+    def test_broken_file(self) -> None:
+        path = helper.get_testfile("broken", "binary.mp3")
+        assert self.resolver.resolve({"path": path}) == {
+            "error": "Broken file: " + path
+        }
+
+    def test_invalid_request(self) -> None:
+        assert "error" in self.resolver.resolve({"name": "a.mp3"})
+        assert "error" in self.resolver.resolve("a.mp3")
+
+    def test_batch(self) -> None:
+        answers = self.resolver.resolve_batch(
+            [
+                {"path": helper.get_testfile("files", "album.mp3")},
+                {"path": "/missing.mp3"},
+            ]
+        )
+        assert isinstance(answers, list)
+        assert answers[0]["template"] == "default"
+        assert "error" in answers[1]
+
+
+class TestFindSocketPath:
+    def test_tcp(self) -> None:
+        assert find_socket_path("127.0.0.1:8765") is None
+        assert find_socket_path(":8765") is None
+
+    def test_unix_prefix(self) -> None:
+        assert find_socket_path("unix:audiorename.sock") == "audiorename.sock"
+
+    def test_path(self) -> None:
+        path = os.path.join("run", "audiorename.sock")
+        assert find_socket_path(path) == path
+
+    def test_is_loopback(self) -> None:
+        assert is_loopback("127.0.0.1")
+        assert is_loopback("localhost")
+        assert is_loopback("[::1]")
+        assert not is_loopback("0.0.0.0")
+        assert not is_loopback("192.168.1.2")
+        assert not is_loopback("example.com")
+
+    def test_no_path(self) -> None:
+        assert find_socket_path("localhost") is None
+        assert find_socket_path("music.db") is None
+
+
+class TestServer:
+    def start(self, address: str) -> typing.Any:
+        server = create_server(
+            address, TargetResolver(helper.get_job(target="/target"))
+        )
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        return server
+
+    def stop(self, server: typing.Any) -> None:
+        server.shutdown()
+        server.server_close()
+
+    def post(self, connection: http.client.HTTPConnection, body: str) -> typing.Any:
+        connection.request("POST", "/", body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_tcp(self) -> None:
+        server = self.start("127.0.0.1:0")
+        try:
+            connection = http.client.HTTPConnection(*server.server_address[:2])
+            status, answer = self.post(
+                connection,
+                json.dumps([{"path": helper.get_testfile("files", "album.mp3")}]),
+            )
+            assert status == 200
+            assert answer == [
+                {"target": "/target" + helper.path_album, "template": "default"}
+            ]
+            status, answer = self.post(connection, "{")
+            assert status == 400
+            connection.close()
+        finally:
+            self.stop(server)
+
+    def test_unix_socket(self) -> None:
+        if not hasattr(socket, "AF_UNIX"):
+            pytest.skip("Unix sockets are not available")
+        path = os.path.join(tempfile.mkdtemp(), "audiorename.sock")
+        server = self.start(path)
+
+        class Connection(http.client.HTTPConnection):
+            def connect(self) -> None:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(path)
+
+        try:
+            status, answer = self.post(
+                Connection("localhost"),
+                json.dumps({"path": helper.get_testfile("files", "album.mp3")}),
+            )
+            assert status == 200
+            assert answer["target"] == "/target" + helper.path_album
+        finally:
+            self.stop(server)
+
+    def test_regular_file_survives(self) -> None:
+        path = os.path.join(tempfile.mkdtemp(), "music.db")
+        with open(path, "w") as database:
+            database.write("data")
+        with pytest.raises(Exception, match="not a socket"):
+            self.start(path)
+        with open(path) as database:
+            assert database.read() == "data"
+
+    def test_invalid_address(self) -> None:
+        with pytest.raises(Exception, match="Invalid address"):
+            self.start("music.db")
+
+    def test_remote_host(self) -> None:
+        with pytest.raises(Exception, match="loopback"):
+            self.start("0.0.0.0:0")
+        with pytest.raises(Exception, match="loopback"):
+            self.start("example.com:0")
@@ -0,0 +1,140 @@
+"""Test the submodule “state.py”."""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import audiorename
+from audiorename.state import IncrementalState
+from tests import helper
+
+
+def get_state(path: str = "", dry_run: bool = False) -> IncrementalState:
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "state.sqlite")
+    return IncrementalState(path, dry_run)
+
+
+class TestIncrementalState:
+    def setup_method(self) -> None:
+        self.state = get_state()
+        self.audio_file = helper.copy_to_tmp("files", "album.mp3")
+
+    def test_not_recorded(self) -> None:
+        assert self.state.is_unchanged(self.audio_file) is False
+
+    def test_record(self) -> None:
+        self.state.record(self.audio_file)
+        assert self.state.is_unchanged(self.audio_file) is True
+
+    def test_changed_mtime(self) -> None:
+        self.state.record(self.audio_file)
+        stat = os.stat(self.audio_file)
+        os.utime(self.audio_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        assert self.state.is_unchanged(self.audio_file) is False
+
+    def test_changed_size(self) -> None:
+        self.state.record(self.audio_file)
+        with open(self.audio_file, "ab") as f:
+            f.write(b"\0")
+        assert self.state.is_unchanged(self.audio_file) is False
+
+    def test_missing_file_not_recorded(self) -> None:
+        os.remove(self.audio_file)
+        self.state.record(self.audio_file)
+        assert self.state.entries(os.path.dirname(self.audio_file)) == []
+
+    def test_separate_dry_run(self) -> None:
+        self.state.record(self.audio_file)
+        self.state.commit()
+        dry_run = get_state(self.state.path, dry_run=True)
+        assert dry_run.is_unchanged(self.audio_file) is False
+        dry_run.record(self.audio_file)
+        assert dry_run.is_unchanged(self.audio_file) is True
+
+    def test_persistent(self) -> None:
+        self.state.record(self.audio_file)
+        self.state.close()
+        assert get_state(self.state.path).is_unchanged(self.audio_file) is True
+
+    def test_entries(self) -> None:
+        self.state.record(self.audio_file)
+        entries = self.state.entries(os.path.dirname(self.audio_file))
+        assert len(entries) == 1
+        assert entries[0].path == self.audio_file
+        assert entries[0].size == os.path.getsize(self.audio_file)
+
+    def test_entries_prefix(self) -> None:
+        self.state.record(self.audio_file)
+        assert self.state.entries(os.path.dirname(self.audio_file) + "x") == []
+
+    def test_reset(self) -> None:
+        other = helper.copy_to_tmp("files", "compilation.mp3")
+        self.state.record(self.audio_file)
+        self.state.record(other)
+        assert self.state.reset(os.path.dirname(self.audio_file)) == 1
+        assert self.state.is_unchanged(self.audio_file) is False
+        assert self.state.is_unchanged(other) is True
+
+
+class TestOption:
+    def setup_method(self) -> None:
+        self.state_path = os.path.join(tempfile.mkdtemp(), "state.sqlite")
+        self.source = helper.get_testfile("files")
+
+    def execute(self, *args: str) -> str:
+        with helper.Capturing(clean_ansi=True) as output:
+            audiorename.execute(
+                "--dry-run", "--incremental", "--state", self.state_path, *args
+            )
+        return helper.join(output)
+
+    def test_second_run_skips(self) -> None:
+        first = self.execute("--stats", self.source)
+        assert "Dry run" in first
+        assert "unchanged" not in first
+        second = self.execute("--stats", self.source)
+        assert "Counter: unchanged=38" in second
+
+    def test_no_tags_parsed(self) -> None:
+        self.execute(self.source)
+        with mock.patch.object(
+            audiorename.audiofile.AudioFile,
+            "preload_meta",
+            autospec=True,
+            side_effect=audiorename.audiofile.AudioFile.preload_meta,
+        ) as preload_meta:
+            output = self.execute(self.source)
+        preload_meta.assert_not_called()
+        assert output == "Dry run"
+
+    def test_album_filter_sees_unchanged_tracks(self) -> None:
+        source = tempfile.mkdtemp()
+        folder = helper.get_testfile("files", "album_complete")
+        names = sorted(os.listdir(folder))
+        for name in names[1:]:
+            shutil.copyfile(os.path.join(folder, name), os.path.join(source, name))
+        self.execute(source)
+        shutil.copyfile(os.path.join(folder, names[0]), os.path.join(source, names[0]))
+        output = self.execute("--stats", "--album-min", "5", source)
+        assert "unchanged=10" in output
+        assert "move=1" in output
+
+    def test_real_run_separate(self) -> None:
+        self.execute(self.source)
+        state = IncrementalState(self.state_path)
+        assert state.entries(self.source) == []
+        assert len(IncrementalState(self.state_path, True).entries(self.source)) == 38
+
+    def test_reset_state(self) -> None:
+        self.execute(self.source)
+        output = self.execute("--reset-state", self.source)
+        assert output != "Dry run"
+
+    def test_show_state(self) -> None:
+        self.execute(self.source)
+        output = self.execute("--show-state", self.source)
+        assert "Files: 38" in output
+        assert "Mode: dry run" in output
+        assert os.path.join(self.source, "album.mp3") in output
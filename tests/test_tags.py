@@ -0,0 +1,135 @@
+"""Test the module “tags.py”."""
+
+import csv
+import json
+import os
+import tempfile
+import typing
+
+import pytest
+
+import audiorename
+from audiorename.audiofile import AudioFile, find_desired_target, render_tags
+from audiorename.meta import Meta
+from audiorename.scan import scan
+from tests import helper
+
+
+def dump(path: str) -> typing.Dict[str, typing.Any]:
+    """Dump the raw tags of an audio file like a catalogue database."""
+    meta = Meta(path)
+    tags = {field: getattr(meta, field) for field in Meta.fields_phrydy()}
+    tags["ar_performer_raw"] = meta.ar_performer_raw
+    return tags
+
+
+def audio_files() -> typing.List[str]:
+    paths: typing.List[str] = []
+    for folder in ("files", "classical", "soundtrack", "performers"):
+        paths += scan(helper.get_testfile(folder), (".flac", ".m4a", ".mp3", ".ogg"))
+    return paths
+
+
+class TestRenderTags:
+    @pytest.mark.parametrize("path", audio_files())
+    def test_same_as_audio_file(self, path: str) -> None:
+        job = helper.get_job(target="/target", dry_run=True)
+        source = AudioFile(path, job=job, file_type="source")
+        if source.fields is None:
+            pytest.skip("broken file")
+        with helper.Capturing():
+            expected = find_desired_target(source, job)
+        _, target = render_tags(dump(path), job, source.extension)
+        assert target == expected
+
+    def test_template(self) -> None:
+        job = helper.get_job(target="/target")
+        tags = dump(helper.get_testfile("files", "compilation.mp3"))
+        template, target = render_tags(tags, job, "mp3")
+        assert template == "compilation"
+        assert target == "/target" + helper.path_compilation
+
+
+class TestFromTags:
+    def setup_method(self) -> None:
+        self.directory = tempfile.mkdtemp()
+
+    def execute(self, path: str, *args: str) -> typing.List[typing.Dict[str, str]]:
+        with helper.Capturing() as output:
+            audiorename.execute("--target", "/target", "--from-tags", path, *args, ".")
+        return [json.loads(line) for line in output if line.strip()]
+
+    def test_csv(self) -> None:
+        path = os.path.join(self.directory, "tags.csv")
+        with open(path, "w", newline="") as tag_file:
+            writer = csv.writer(tag_file)
+            writer.writerow(["path", "albumartist", "album", "title", "track", "comp"])
+            writer.writerow(["/a.flac", "a-ha", "Hunting", "Take on Me", "4", "0"])
+            writer.writerow(["/b.mp3", "Various", "Hits", "Song", "12", "1"])
+        assert self.execute(path) == [
+            {
+                "target": "/target/a/a-ha/Hunting/04_Take on Me.flac",
+                "template": "default",
+            },
+            {
+                "target": "/target/_compilations/h/Hits/12_Song.mp3",
+                "template": "compilation",
+            },
+        ]
+
+    def test_jsonl(self) -> None:
+        path = os.path.join(self.directory, "tags.jsonl")
+        with open(path, "w") as tag_file:
+            tag_file.write(
+                json.dumps(
+                    {
+                        "artist": "a-ha",
+                        "album": "Hunting",
+                        "title": "Take on Me",
+                        "track": 4,
+                    }
+                )
+                + "\n\n"
+            )
+            tag_file.write(json.dumps({"title": "Song", "extension": ".OGG"}) + "\n")
+        answers = self.execute(path)
+        assert answers[0] == {
+            "target": "/target/a/a-ha/Hunting/04_Take on Me",
+            "template": "default",
+        }
+        assert answers[1]["target"].endswith(".ogg")
+
+    def test_malformed_json_line(self) -> None:
+        path = os.path.join(self.directory, "tags.jsonl")
+        with open(path, "w") as tag_file:
+            tag_file.write(json.dumps({"title": "One"}) + "\n")
+            tag_file.write('{"title": \n')
+            tag_file.write("[1, 2]\n")
+            tag_file.write(json.dumps({"title": "Two"}) + "\n")
+        answers = self.execute(path)
+        assert len(answers) == 4
+        assert answers[1]["line"] == 2
+        assert answers[1]["error"].startswith("JSONDecodeError")
+        assert answers[2]["line"] == 3
+        assert answers[3]["target"].endswith("Two")
+
+    def test_malformed_csv_row(self) -> None:
+        path = os.path.join(self.directory, "tags.csv")
+        with open(path, "w", newline="") as tag_file:
+            tag_file.write("title,track\n")
+            tag_file.write("One,1\n")
+            tag_file.write("{},2\n".format("x" * (csv.field_size_limit() + 1)))
+            tag_file.write("Two,3\n")
+        answers = self.execute(path)
+        assert len(answers) == 3
+        assert answers[1]["line"] == 3
+        assert answers[1]["error"].startswith("Error")
+        assert "Two" in answers[2]["target"]
+
+    def test_stats(self) -> None:
+        path = os.path.join(self.directory, "tags.jsonl")
+        with open(path, "w") as tag_file:
+            tag_file.write(json.dumps({"title": "Song"}) + "\n")
+        with helper.Capturing() as output:
+            audiorename.execute("--stats", "--from-tags", path, ".")
+        assert "rendered=1" in helper.join(output)
@@ -0,0 +1,274 @@
+"""Test the module “transfer.py”."""
+
+import errno
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import typing
+
+import pytest
+
+import audiorename
+from audiorename import transfer
+from audiorename.state import IncrementalState
+from tests import helper
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class TestCopyFile:
+    def setup_method(self) -> None:
+        self.source = helper.copy_to_tmp("files", "album.mp3")
+        self.target = os.path.join(tempfile.mkdtemp(), "album.mp3")
+        os.utime(self.source, ns=(1_000_000_000, 2_000_000_000))
+
+    def assert_copied(self) -> None:
+        assert read(self.source) == read(self.target)
+        assert os.stat(self.target).st_mtime_ns == 2_000_000_000
+
+    def test_copy(self) -> None:
+        assert transfer.copy_file(self.source, self.target) in (
+            "reflink",
+            "copy_file_range",
+            "copy",
+        )
+        self.assert_copied()
+
+    def test_copy_file_range(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        if not hasattr(os, "copy_file_range"):
+            pytest.skip("os.copy_file_range is not available")
+        monkeypatch.setattr(transfer, "reflink", lambda source, target: False)
+        assert transfer.copy_file(self.source, self.target) == "copy_file_range"
+        self.assert_copied()
+
+    def test_copy_file_range_short(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        if not hasattr(os, "copy_file_range"):
+            pytest.skip("os.copy_file_range is not available")
+        copy_file_range = os.copy_file_range
+
+        def stop_early(source: int, target: int, count: int) -> int:
+            # Copy a single chunk, then report the end of the source.
+            if os.fstat(target).st_size:
+                return 0
+            return copy_file_range(source, target, min(count, 1000))
+
+        monkeypatch.setattr(transfer, "reflink", lambda source, target: False)
+        monkeypatch.setattr(os, "copy_file_range", stop_early)
+        assert transfer.copy_file(self.source, self.target) == "copy"
+        self.assert_copied()
+
+    def test_fallback(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(transfer, "reflink", lambda source, target: False)
+        monkeypatch.setattr(transfer, "copy_file_range", lambda source, target: False)
+        assert transfer.copy_file(self.source, self.target) == "copy"
+        self.assert_copied()
+
+    def test_error_removes_target(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def fail(source: str, target: str) -> None:
+            # Write a part of the file, then fail.
+            with open(target, "wb") as f:
+                f.write(b"partial")
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+        monkeypatch.setattr(transfer, "reflink", lambda source, target: False)
+        monkeypatch.setattr(transfer, "copy_file_range", lambda source, target: False)
+        monkeypatch.setattr(shutil, "copyfile", fail)
+        with pytest.raises(OSError):
+            transfer.copy_file(self.source, self.target)
+        assert not os.path.exists(self.target)
+        assert os.path.exists(self.source)
+
+
+class TestMoveFile:
+    def setup_method(self) -> None:
+        self.source = helper.copy_to_tmp("files", "album.mp3")
+        self.content = read(self.source)
+        self.target = os.path.join(tempfile.mkdtemp(), "album.mp3")
+
+    def test_same_device(self) -> None:
+        assert transfer.same_device(self.source, self.target)
+        assert transfer.move_file(self.source, self.target) == "rename"
+        assert not os.path.exists(self.source)
+        assert read(self.target) == self.content
+
+    def test_other_device(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(transfer, "same_device", lambda source, target: False)
+        assert transfer.move_file(self.source, self.target) != "rename"
+        assert not os.path.exists(self.source)
+        assert read(self.target) == self.content
+
+    def test_incomplete_copy(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def truncate(source: str, target: str) -> transfer.Strategy:
+            with open(target, "wb") as target_file:
+                target_file.write(self.content[:1000])
+            return "copy"
+
+        monkeypatch.setattr(transfer, "same_device", lambda source, target: False)
+        monkeypatch.setattr(transfer, "copy_file", truncate)
+        with pytest.raises(Exception, match="incomplete"):
+            transfer.move_file(self.source, self.target)
+        assert read(self.source) == self.content
+        assert not os.path.exists(self.target)
+
+    def test_missing_target_directory(self) -> None:
+        assert not transfer.same_device(
+            self.source, os.path.join(self.target, "missing", "album.mp3")
+        )
+
+
+class TestStats:
+    def execute(self, *args: str) -> str:
+        with helper.Capturing() as output:
+            audiorename.execute("--stats", "--target", tempfile.mkdtemp(), *args)
+        return helper.join(output)
+
+    def test_move(self) -> None:
+        output = self.execute(helper.copy_to_tmp("files", "album.mp3"))
+        assert "via_rename=1" in output
+
+    def test_copy(self) -> None:
+        output = self.execute("--copy", helper.copy_to_tmp("files", "album.mp3"))
+        assert "copy=1" in output
+        assert "via_" in output
+
+
+class TestExecutor:
+    def test_order_per_directory(self) -> None:
+        executor = transfer.Executor(8)
+        results: typing.Dict[str, typing.List[int]] = {"a": [], "b": []}
+
+        def append(directory: str, number: int) -> typing.Callable[[], None]:
+            def operation() -> None:
+                time.sleep(random.random() / 1000)
+                results[directory].append(number)
+
+            return operation
+
+        for number in range(100):
+            for directory in ("a", "b"):
+                executor.submit("append", [directory], append(directory, number))
+        executor.wait()
+        assert results == {"a": list(range(100)), "b": list(range(100))}
+
+    def test_failures(self) -> None:
+        executor = transfer.Executor(2)
+        executed: typing.List[int] = []
+
+        def fail() -> None:
+            raise OSError("broken")
+
+        executor.submit("move", ["a"], fail)
+        executor.submit("copy", ["a"], lambda: executed.append(1))
+        executor.wait()
+        failures = executor.failures()
+        assert [(name, str(error)) for name, error in failures] == [("move", "broken")]
+        # The failure of an operation doesn’t cancel the next operations.
+        assert executed == [1]
+        assert executor.failures() == []
+
+    def test_skip_after_failure(self) -> None:
+        executor = transfer.Executor(2)
+        executed: typing.List[str] = []
+
+        def fail() -> None:
+            raise OSError("broken")
+
+        executor.submit("backup", ["a", "b"], fail, ["a/target", "b/target"])
+        executor.submit("move", ["a"], lambda: executed.append("move"), ["a/target"])
+        executor.submit("record", ["a"], lambda: executed.append("a"), ["a/source"])
+        executor.wait()
+        assert executed == ["a"]
+        assert len(executor.failures()) == 1
+        # The failures are forgotten after waiting.
+        executor.submit("move", ["a"], lambda: executed.append("move"), ["a/target"])
+        executor.wait()
+        assert executed == ["a", "move"]
+
+    def test_skipped_operation_propagates(self) -> None:
+        executor = transfer.Executor(2)
+        executed: typing.List[str] = []
+
+        def fail() -> None:
+            raise OSError("broken")
+
+        executor.submit("backup", ["t"], fail, ["t/target"])
+        executor.submit("move", ["s", "t"], lambda: None, ["s/source", "t/target"])
+        executor.submit("record", ["s"], lambda: executed.append("s"), ["s/source"])
+        executor.wait()
+        assert executed == []
+
+    def test_bounded(self) -> None:
+        executor = transfer.Executor(1, capacity=2)
+        release = threading.Event()
+        submitted: typing.List[int] = []
+
+        def submit() -> None:
+            for number in range(4):
+                executor.submit("wait", [str(number)], release.wait)
+                submitted.append(number)
+
+        thread = threading.Thread(target=submit)
+        thread.start()
+        time.sleep(0.1)
+        assert submitted == [0, 1]
+        release.set()
+        thread.join()
+        executor.wait()
+        assert submitted == [0, 1, 2, 3]
+
+
+class TestIoThreads:
+    def setup_method(self) -> None:
+        self.source = tempfile.mkdtemp()
+        folder = helper.get_testfile("files", "album_complete")
+        for name in sorted(os.listdir(folder)):
+            shutil.copyfile(os.path.join(folder, name), os.path.join(self.source, name))
+
+    def execute(self, *args: str) -> str:
+        target = tempfile.mkdtemp()
+        with helper.Capturing() as output:
+            audiorename.execute("--stats", "--target", target, *args, self.source)
+        return helper.join(output)
+
+    def test_move(self) -> None:
+        output = self.execute("--io-threads", "4")
+        assert "move=11" in output
+        assert "via_rename=11" in output
+        assert os.listdir(self.source) == []
+
+    def test_same_output(self) -> None:
+        synchronous = self.execute("--copy")
+        background = self.execute("--copy", "--io-threads", "4")
+        assert (
+            synchronous.split("Execution time")[0]
+            == background.split("Execution time")[0]
+        )
+
+    def test_failure(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        move_file = transfer.move_file
+
+        def failing(source: str, target: str) -> transfer.Strategy:
+            if source.endswith("04.mp3"):
+                raise OSError("No space left on device")
+            return move_file(source, target)
+
+        monkeypatch.setattr(audiorename.audiofile, "move_file", failing)
+        output = self.execute("--io-threads", "4")
+        assert "Move failed: No space left on device" in output
+        assert "move_failed=1" in output
+        assert os.listdir(self.source) == ["04.mp3"]
+
+    def test_failure_not_recorded(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def failing(source: str, target: str) -> transfer.Strategy:
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(audiorename.audiofile, "move_file", failing)
+        state = os.path.join(tempfile.mkdtemp(), "state.sqlite")
+        self.execute("--io-threads", "4", "--incremental", "--state", state)
+        assert IncrementalState(state).entries(self.source) == []
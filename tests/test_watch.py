@@ -0,0 +1,197 @@
+"""Test the module “watch.py”."""
+
+import os
+import shutil
+import tempfile
+import time
+import typing
+
+import pytest
+
+from audiorename import audiofile, batch, musicbrainz
+from audiorename.audiofile import AudioFile
+from audiorename.job import Job
+from audiorename.watch import Inotify, Poller, Watcher, create_waiter
+from tests import helper
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestWatcher:
+    def setup_method(self) -> None:
+        self.source = tempfile.mkdtemp()
+        self.target = tempfile.mkdtemp()
+        self.clock = Clock()
+
+    def watcher(self, **arguments: typing.Any) -> Watcher:
+        job = helper.get_job(
+            source=self.source, target=self.target, watch_settle=5, **arguments
+        )
+        return Watcher(job, waiter=Poller(), clock=self.clock)
+
+    def add(self, name: str, *path_segments: str) -> str:
+        path = os.path.join(self.source, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(helper.get_testfile(*path_segments), path)
+        return path
+
+    def step(self, watcher: Watcher, now: float) -> typing.List[str]:
+        self.clock.now = now
+        with helper.Capturing():
+            return watcher.step()
+
+    def test_settle(self) -> None:
+        watcher = self.watcher()
+        path = self.add("a.mp3", "files", "album.mp3")
+        assert self.step(watcher, 0) == []
+        assert self.step(watcher, 4) == []
+        assert os.path.exists(path)
+        assert self.step(watcher, 5) == [self.source]
+        assert not os.path.exists(path)
+        assert helper.is_file(self.target + helper.path_album)
+
+    def test_file_still_written(self) -> None:
+        watcher = self.watcher()
+        path = self.add("a.mp3", "files", "album.mp3")
+        self.step(watcher, 0)
+        with open(path, "ab") as f:
+            f.write(b"\0")
+        assert self.step(watcher, 3) == []
+        assert self.step(watcher, 6) == []
+        assert self.step(watcher, 8) == [self.source]
+
+    def test_directory_waits_for_all_files(self) -> None:
+        watcher = self.watcher(move_action="copy")
+        self.add("album/01.mp3", "files", "album_complete", "01.mp3")
+        self.step(watcher, 0)
+        self.add("album/02.mp3", "files", "album_complete", "02.mp3")
+        assert self.step(watcher, 4) == []
+        assert self.step(watcher, 6) == []
+        assert self.step(watcher, 9) == [os.path.join(self.source, "album")]
+
+    def test_processed_once(self) -> None:
+        watcher = self.watcher(move_action="copy")
+        self.add("a.mp3", "files", "album.mp3")
+        self.step(watcher, 0)
+        assert self.step(watcher, 5) == [self.source]
+        assert self.step(watcher, 10) == []
+        assert watcher.pending == {}
+
+    def test_album_complete(self) -> None:
+        watcher = self.watcher(album_complete=True)
+        folder = helper.get_testfile("files", "album_complete")
+        names = sorted(os.listdir(folder))
+        for name in names[1:]:
+            self.add(os.path.join("album", name), "files", "album_complete", name)
+        self.step(watcher, 0)
+        self.step(watcher, 5)
+        # The album is incomplete, so the files stay in the inbox.
+        assert len(os.listdir(os.path.join(self.source, "album"))) == 10
+        self.add(os.path.join("album", names[0]), "files", "album_complete", names[0])
+        self.step(watcher, 6)
+        self.step(watcher, 11)
+        assert os.listdir(os.path.join(self.source, "album")) == []
+
+    def test_same_job(self) -> None:
+        watcher = self.watcher()
+        self.add("a/a.mp3", "files", "album.mp3")
+        self.step(watcher, 0)
+        self.step(watcher, 5)
+        template = watcher.job.path_templates
+        self.add("b/b.mp3", "files", "compilation.mp3")
+        self.step(watcher, 6)
+        assert self.step(watcher, 11) == [os.path.join(self.source, "b")]
+        assert watcher.job.path_templates is template
+
+    def test_memo_cleared_per_batch(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        memo = musicbrainz.Memo()
+        monkeypatch.setattr(musicbrainz, "memo", memo)
+        watcher = self.watcher()
+        memo.get("key", lambda: "value")
+        self.add("a.mp3", "files", "album.mp3")
+        self.step(watcher, 0)
+        self.step(watcher, 5)
+        assert len(memo) == 0
+
+    def test_error_in_file(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        rename_to_target = audiofile.rename_to_target
+
+        def fail(source: AudioFile, target: str, job: Job) -> None:
+            if source.abspath.endswith("a.mp3"):
+                raise OSError("Permission denied")
+            rename_to_target(source, target, job)
+
+        monkeypatch.setattr(audiofile, "rename_to_target", fail)
+        watcher = self.watcher()
+        path = self.add("a.mp3", "files", "album.mp3")
+        self.add("b.mp3", "files", "compilation.mp3")
+        self.step(watcher, 0)
+        self.clock.now = 5
+        with helper.Capturing(clean_ansi=True) as output:
+            assert watcher.step() == [self.source]
+        assert "Error: Permission denied" in helper.join(output)
+        assert os.listdir(self.source) == ["a.mp3"]
+        assert path in watcher.processed
+
+    def test_error_in_batch(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def fail(self: batch.Batch) -> None:
+            raise Exception("broken")
+
+        monkeypatch.setattr(batch.Batch, "execute", fail)
+        watcher = self.watcher()
+        self.add("a/a.mp3", "files", "album.mp3")
+        self.step(watcher, 0)
+        self.clock.now = 5
+        with helper.Capturing() as output:
+            assert watcher.step() == [os.path.join(self.source, "a")]
+        assert "broken" in helper.join(output)
+        assert watcher.pending == {}
+
+    def test_timeout(self) -> None:
+        watcher = self.watcher(watch_interval=3)
+        assert watcher.timeout() == 3
+        self.add("a.mp3", "files", "album.mp3")
+        self.step(watcher, 0)
+        self.clock.now = 4
+        assert watcher.timeout() == 1
+
+    def test_run(self) -> None:
+        job = helper.get_job(source=self.source, target=self.target, watch_settle=0)
+        self.add("a.mp3", "files", "album.mp3")
+        with helper.Capturing():
+            Watcher(job, waiter=Poller()).run(iterations=1)
+        assert helper.is_file(self.target + helper.path_album)
+
+    def test_run_single_file(self) -> None:
+        path = self.add("a.mp3", "files", "album.mp3")
+        job = helper.get_job(source=path)
+        with pytest.raises(Exception, match="source directory"):
+            Watcher(job, waiter=Poller()).run(iterations=1)
+
+
+class TestInotify:
+    def test_wake_up(self) -> None:
+        waiter = create_waiter()
+        if not isinstance(waiter, Inotify):
+            pytest.skip("inotify is not available")
+        directory = tempfile.mkdtemp()
+        waiter.watch(directory)
+        open(os.path.join(directory, "a.mp3"), "w").close()
+        start = time.monotonic()
+        waiter.wait(10)
+        assert time.monotonic() - start < 5
+        waiter.close()
+
+    def test_timeout(self) -> None:
+        waiter = create_waiter()
+        waiter.watch(tempfile.mkdtemp())
+        start = time.monotonic()
+        waiter.wait(0.1)
+        assert time.monotonic() - start >= 0.1
+        waiter.close()